@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
-from .models import Courses, CourseTeachersThrough, CourseStudentsThrough, Themes, Posts, QuestionOptions, CoursePostThrough, Answers, AnswerOptionsThrough, AttachData, Comments
+from .models import AnswerResetJobs, Courses, CourseMembers, CourseTeachersThrough, CourseStudentsThrough, Themes, Posts, QuestionOptions, CoursePostThrough, Answers, AnswerOptionsThrough, AttachData, Comments
 
 # Inline for Teachers
 class CourseTeachersThroughInline(admin.TabularInline):
@@ -40,10 +40,10 @@ class CoursePostThroughInline(admin.TabularInline):
 
 @admin.register(Courses)
 class CoursesAdmin(admin.ModelAdmin):
-    list_display = ('id', 'title', 'section', 'room_number', 'creator', 'config_permission', 'delete_permission', 'is_archive', 'created_at')
+    list_display = ('id', 'title', 'section', 'room_number', 'creator', 'students_count', 'teachers_count', 'pending_invites_count', 'posts_count', 'is_archive', 'created_at')
     list_filter = ('is_archive', 'config_permission', 'delete_permission', 'created_at')
     search_fields = ('id', 'title', 'section', 'room_number', 'theme', 'inv_code', 'creator__username')
-    readonly_fields = ('id', 'created_at', 'inv_code')
+    readonly_fields = ('id', 'created_at', 'inv_code', 'students_count', 'teachers_count', 'pending_invites_count', 'posts_count')
     fieldsets = (
         (None, {
             'fields': ('id', 'title', 'description', 'section', 'room_number', 'theme', 'image')
@@ -54,11 +54,14 @@ class CoursesAdmin(admin.ModelAdmin):
         (_('Metadata'), {
             'fields': ('creator', 'inv_code', 'created_at', 'is_archive')
         }),
+        (_('Counters'), {
+            'fields': ('students_count', 'teachers_count', 'pending_invites_count', 'posts_count')
+        }),
     )
     inlines = [CourseTeachersThroughInline, CourseStudentsThroughInline, CoursePostThroughInline]
 
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('creator').prefetch_related('teachers', 'students', 'course_connections')
+        return super().get_queryset(request).select_related('creator')
 
 @admin.register(CourseTeachersThrough)
 class CourseTeachersThroughAdmin(admin.ModelAdmin):
@@ -96,6 +99,16 @@ class CourseStudentsThroughAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('course', 'student')
 
+@admin.register(CourseMembers)
+class CourseMembersAdmin(admin.ModelAdmin):
+    list_display = ('course', 'user', 'role', 'joined_at')
+    list_filter = ('role', 'joined_at')
+    search_fields = ('course__title', 'user__email')
+    readonly_fields = ('course', 'user', 'role', 'joined_at')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('course', 'user')
+
 @admin.register(Themes)
 class ThemesAdmin(admin.ModelAdmin):
     list_display = ('name', 'course', 'created_at')
@@ -119,16 +132,16 @@ class PostsAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'post_type', 'theme', 'author', 'is_published', 'created_at')
     list_filter = ('post_type', 'is_published', 'created_at')
     search_fields = ('id', 'name', 'description', 'theme__name', 'author__username')
-    readonly_fields = ('id', 'created_at', 'updated_at')
+    readonly_fields = ('id', 'source', 'created_at', 'updated_at')
     fieldsets = (
         (None, {
             'fields': ('id', 'name', 'description', 'post_type', 'theme', 'author')
         }),
         (_('Settings'), {
-            'fields': ('is_published', 'max_score', 'deadline', 'question_type', 'can_change', 'can_comment')
+            'fields': ('is_published', 'max_score', 'deadline', 'publish_at', 'question_type', 'can_change', 'can_comment')
         }),
         (_('Metadata'), {
-            'fields': ('created_at', 'updated_at')
+            'fields': ('source', 'created_at', 'updated_at')
         }),
     )
 
@@ -137,13 +150,13 @@ class PostsAdmin(admin.ModelAdmin):
 
 @admin.register(QuestionOptions)
 class QuestionOptionsAdmin(admin.ModelAdmin):
-    list_display = ('post', 'title', 'is_right', 'created_at')
+    list_display = ('post', 'title', 'is_right', 'votes_count', 'created_at')
     list_filter = ('created_at',)
     search_fields = ('post__name', 'title')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('votes_count', 'created_at', 'updated_at')
     fieldsets = (
         (None, {
-            'fields': ('post', 'title', 'is_right')
+            'fields': ('post', 'title', 'is_right', 'votes_count')
         }),
         (_('Metadata'), {
             'fields': ('created_at', 'updated_at')
@@ -155,13 +168,13 @@ class QuestionOptionsAdmin(admin.ModelAdmin):
 
 @admin.register(CoursePostThrough)
 class CoursePostThroughAdmin(admin.ModelAdmin):
-    list_display = ('post', 'course', 'created_at')
+    list_display = ('post', 'course', 'ungraded_count', 'created_at')
     list_filter = ('created_at',)
     search_fields = ('post__name', 'course__title')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('ungraded_count', 'created_at', 'updated_at')
     fieldsets = (
         (None, {
-            'fields': ('post', 'course')
+            'fields': ('post', 'course', 'ungraded_count')
         }),
         (_('Metadata'), {
             'fields': ('created_at', 'updated_at')
@@ -189,6 +202,16 @@ class AnswersAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('student', 'task__post', 'task__course')
 
+@admin.register(AnswerResetJobs)
+class AnswerResetJobsAdmin(admin.ModelAdmin):
+    list_display = ('post', 'status', 'processed', 'total', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('post__name',)
+    readonly_fields = ('post', 'task_ids', 'status', 'total', 'processed', 'last_answer_id', 'created_at', 'finished_at')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('post')
+
 @admin.register(AnswerOptionsThrough)
 class AnswerOptionsThroughAdmin(admin.ModelAdmin):
     list_display = ('answer', 'option', 'text', 'created_at')
@@ -1,35 +1,68 @@
+import string
+import time
+
 from django.db import models
 from django.core.validators import MinLengthValidator
 
-from apps.utils import generate_random_string
+from apps.utils import generate_random_string, generate_random_strings
 
 
 class SymbolIdField(models.CharField):
+    """Символьный первичный ключ, упорядоченный по времени создания.
+
+    Первые TIME_LENGTH символов - время в миллисекундах в base62 (алфавит
+    упорядочен как в ASCII, поэтому id сортируются по времени и вставки в индекс
+    идут в его конец), остальные - случайные. Id назначается при создании
+    экземпляра, без проверочного SELECT, поэтому объекты можно сразу отдавать в
+    bulk_create. Уникальность гарантирует ограничение PK, повтор при коллизии
+    выполняет SymbolIdMixin.save.
+    """
     MIN_LENGTH = 16
-    MAX_ATTEMPTS = 5
+    TIME_LENGTH = 8
+    TIME_ALPHABET = string.digits + string.ascii_uppercase + string.ascii_lowercase
 
     def __init__(self, *args, **kwargs):
         kwargs["primary_key"] = True
         kwargs.setdefault("max_length", self.MIN_LENGTH)
-        kwargs.setdefault("validators", []).append(
-            MinLengthValidator(self.MIN_LENGTH)
-        )
+        kwargs["default"] = self.generate_id
+        kwargs.setdefault("editable", False)
+        validators = list(kwargs.get("validators", []))
+        if MinLengthValidator(self.MIN_LENGTH) not in validators:
+            validators.append(MinLengthValidator(self.MIN_LENGTH))
+        kwargs["validators"] = validators
         super().__init__(*args, **kwargs)
 
-    def pre_save(self, model_instance, add):
-        if add: # Выполняется только при СОЗДАНИИ нового объекта
-            model_cls = model_instance.__class__
-            new_id = None
-            for _ in range(self.MAX_ATTEMPTS):
-                new_id = self._generate_id(model_instance)
-                if not model_cls.objects.filter(pk=new_id).exists():
-                    setattr(model_instance, self.attname, new_id)
-                    break
-            if new_id is None:
-                raise ValueError("Something went wrong, please try again.")
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs.pop("default", None)
+        # В миграцию попадают только валидаторы, переданные явно
+        validators = [
+            validator for validator in kwargs.pop("validators", [])
+            if validator != MinLengthValidator(self.MIN_LENGTH)
+        ]
+        if validators:
+            kwargs["validators"] = validators
+        return name, path, args, kwargs
 
+    def pre_save(self, model_instance, add):
+        if add and not getattr(model_instance, self.attname):
+            setattr(model_instance, self.attname, self.generate_id())
         return super().pre_save(model_instance, add)
 
-    def _generate_id(self, model_instance):
-        current_length = model_instance._meta.get_field(self.attname).max_length
-        return generate_random_string(length=current_length)
+    @classmethod
+    def _time_prefix(cls):
+        value = time.time_ns() // 1_000_000
+        base = len(cls.TIME_ALPHABET)
+        chars = []
+        for _ in range(cls.TIME_LENGTH):
+            value, remainder = divmod(value, base)
+            chars.append(cls.TIME_ALPHABET[remainder])
+        return "".join(reversed(chars))
+
+    def generate_id(self):
+        return self._time_prefix() + generate_random_string(self.max_length - self.TIME_LENGTH)
+
+    def generate_ids(self, count):
+        """Пачка id для предварительного назначения перед bulk_create"""
+        prefix = self._time_prefix()
+        return [prefix + suffix for suffix in generate_random_strings(count, self.max_length - self.TIME_LENGTH)]
@@ -0,0 +1,169 @@
+"""Журнал оценок курса: матрица студенты x задания.
+
+Строится тремя запросами (студенты, задания, ответы через values_list) и
+сворачивается в плотную матрицу в памяти. Результат хранится в кэше, пока
+не изменятся ответы, задания или студенты курса: одиночные сохранения
+сбрасывают его сигналами, массовые операции (bulk_create/update) вызывают
+invalidate_gradebook явно. Переименование поста или смена max_score
+попадают в журнал по истечении GRADEBOOK_CACHE_TIMEOUT.
+
+Выгрузка (gradebook_export) строится потоково в обход кэша.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.enums import MemberRoles, PostTypes, TaskStatuses
+
+from .models import Answers, CourseMembers, CoursePostThrough
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # выгрузка в XLSX доступна только с openpyxl
+    Workbook = None
+
+XLSX_SUPPORTED = Workbook is not None
+
+
+GRADED_POST_TYPES = (PostTypes.QUESTION, PostTypes.EXERCISE)
+COMPLETED_STATUSES = (TaskStatuses.SUBMITTED, TaskStatuses.GRADED)
+
+
+def _cache_key(course_id):
+    return f"course:gradebook:{course_id}"
+
+
+def _cache_timeout():
+    # 0 отключает кэширование журнала
+    return getattr(settings, "GRADEBOOK_CACHE_TIMEOUT", 300)
+
+
+def invalidate_gradebook(course_ids):
+    if isinstance(course_ids, (str, int)):
+        course_ids = [course_ids]
+    cache.delete_many([_cache_key(course_id) for course_id in course_ids])
+
+
+def _columns(rows, names):
+    """Список кортежей -> {name: [значения]}"""
+    columns = list(zip(*rows)) or [()] * len(names)
+    return {name: list(values) for name, values in zip(names, columns)}
+
+
+def _mean(values):
+    values = [value for value in values if value is not None]
+    return round(sum(values) / len(values), 2) if values else None
+
+
+def build_gradebook(course_id):
+    """Журнал в колоночном формате: строки матриц scores/statuses - студенты
+    (в порядке students), столбцы - задания (в порядке tasks)
+    """
+    students = list(
+        CourseMembers.objects.filter(course_id=course_id, role=MemberRoles.STUDENT)
+        .order_by("user__last_name", "user__first_name", "user_id")
+        .values_list("user_id", "user__first_name", "user__second_name", "user__last_name")
+    )
+    tasks = list(
+        CoursePostThrough.objects.filter(course_id=course_id, post__post_type__in=GRADED_POST_TYPES)
+        .order_by("created_at", "id")
+        .values_list("id", "post_id", "post__name", "post__max_score")
+    )
+
+    student_index = {row[0]: i for i, row in enumerate(students)}
+    task_index = {row[0]: j for j, row in enumerate(tasks)}
+    scores = [[None] * len(tasks) for _ in students]
+    statuses = [[None] * len(tasks) for _ in students]
+
+    answers = Answers.objects.filter(task__course_id=course_id)\
+        .values_list("student_id", "task_id", "score", "status")
+    for student_id, task_id, score, status in answers.iterator(chunk_size=5000):
+        i = student_index.get(student_id)
+        j = task_index.get(task_id)
+        if i is None or j is None:
+            # Ответы студентов, покинувших курс, в журнал не попадают
+            continue
+        scores[i][j] = score
+        statuses[i][j] = status
+
+    task_columns = list(zip(*scores)) if students else [()] * len(tasks)
+    status_columns = list(zip(*statuses)) if students else [()] * len(tasks)
+    return {
+        "course": course_id,
+        "students": _columns(students, ("id", "first_name", "second_name", "last_name")),
+        "tasks": _columns(tasks, ("id", "post", "name", "max_score")),
+        "scores": scores,
+        "statuses": statuses,
+        "student_totals": [sum(score for score in row if score is not None) for row in scores],
+        "task_averages": [_mean(column) for column in task_columns],
+        "completion_rates": [
+            round(sum(status in COMPLETED_STATUSES for status in column) / len(students), 4) if students else None
+            for column in status_columns
+        ],
+    }
+
+
+def get_gradebook(course_id):
+    timeout = _cache_timeout()
+    if not timeout:
+        return build_gradebook(course_id)
+
+    key = _cache_key(course_id)
+    gradebook = cache.get(key)
+    if gradebook is None:
+        gradebook = build_gradebook(course_id)
+        cache.set(key, gradebook, timeout)
+    return gradebook
+
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_STUDENT_COLUMNS = ("student_id", "email", "first_name", "second_name", "last_name")
+
+
+def gradebook_export(course_id):
+    """Журнал для выгрузки: (заголовок, генератор строк) - строка на студента,
+    столбец баллов на задание и итог.
+
+    Студенты и ответы читаются двумя итераторами, упорядоченными по id
+    студента, и сливаются на лету, поэтому в памяти держится только список
+    заданий и текущая строка.
+    """
+    tasks = list(
+        CoursePostThrough.objects.filter(course_id=course_id, post__post_type__in=GRADED_POST_TYPES)
+        .order_by("created_at", "id")
+        .values_list("id", "post__name")
+    )
+    header = [*EXPORT_STUDENT_COLUMNS, *(name for _, name in tasks), "total"]
+    return header, _gradebook_export_rows(course_id, {task_id: j for j, (task_id, _) in enumerate(tasks)})
+
+
+def _gradebook_export_rows(course_id, task_index):
+    students = CourseMembers.objects.filter(course_id=course_id, role=MemberRoles.STUDENT).order_by("user_id")\
+        .values_list("user_id", "user__email", "user__first_name", "user__second_name", "user__last_name")
+    answers = Answers.objects.filter(task__course_id=course_id, score__isnull=False).order_by("student_id")\
+        .values_list("student_id", "task_id", "score")
+
+    answers = answers.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    answer = next(answers, None)
+    for student in students.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        student_id = student[0]
+        scores = [None] * len(task_index)
+        # Пропускаем ответы студентов, покинувших курс
+        while answer is not None and answer[0] < student_id:
+            answer = next(answers, None)
+        while answer is not None and answer[0] == student_id:
+            j = task_index.get(answer[1])
+            if j is not None:
+                scores[j] = answer[2]
+            answer = next(answers, None)
+        yield (*student, *scores, sum(score for score in scores if score is not None))
+
+
+def write_gradebook_xlsx(header, rows, stream):
+    """Записывает выгрузку в XLSX через write-only книгу openpyxl (строки не копятся в памяти)"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Gradebook")
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(stream)
+
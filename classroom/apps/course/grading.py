@@ -0,0 +1,162 @@
+"""Проверка ответов: автоматическая для вопросов с выбором вариантов и
+массовое выставление баллов преподавателем.
+
+Выбор студента хранится как битовая маска по вариантам вопроса (бит i -
+i-й вариант в порядке id), поэтому оценка каждого ответа сводится к паре
+побитовых операций и подсчету единиц. Все выборы задания читаются одним
+запросом. Баллы в обоих случаях записываются пачками UPDATE по значению
+балла (write_scores), число запросов не зависит от числа ответов.
+"""
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from apps.enums import GradingStrategies, QuestionTypes, TaskStatuses
+
+from .gradebook import invalidate_gradebook
+from .item_analysis import invalidate_item_analysis
+from .models import Answers, AnswerOptionsThrough, CoursePostThrough, QuestionOptions
+from .services import chunked
+
+
+AUTO_GRADED_TYPES = (QuestionTypes.ONE_CHOICE, QuestionTypes.MULTI_CHOICE)
+
+
+def _all_or_nothing(selected, right, options_count):
+    return float(selected == right)
+
+
+def _partial(selected, right, options_count):
+    """Доля верно выбранных вариантов со штрафом за каждый неверный"""
+    hits = (selected & right).bit_count()
+    misses = (selected & ~right).bit_count()
+    return max(hits - misses, 0) / right.bit_count() if right else float(not selected)
+
+
+def _per_option(selected, right, options_count):
+    """Доля вариантов, отмеченных (или не отмеченных) верно"""
+    return (options_count - (selected ^ right).bit_count()) / options_count
+
+
+STRATEGIES = {
+    GradingStrategies.ALL_OR_NOTHING: _all_or_nothing,
+    GradingStrategies.PARTIAL: _partial,
+    GradingStrategies.PER_OPTION: _per_option,
+}
+
+
+def option_masks(post):
+    """Номера битов вариантов поста и маска верных вариантов"""
+    bits = {}
+    right = 0
+    for bit, (option_id, is_right) in enumerate(
+        QuestionOptions.objects.filter(post=post).order_by("id").values_list("id", "is_right")
+    ):
+        bits[option_id] = 1 << bit
+        if is_right:
+            right |= bits[option_id]
+    return bits, right
+
+
+def selection_masks(task, bits, statuses=None):
+    """Маски выбора для всех ответов задания одним запросом"""
+    selections = AnswerOptionsThrough.objects.filter(answer__task=task, option__isnull=False)
+    if statuses is not None:
+        selections = selections.filter(answer__status__in=statuses)
+
+    masks = {}
+    for answer_id, option_id in selections.values_list("answer_id", "option_id").iterator(chunk_size=5000):
+        masks[answer_id] = masks.get(answer_id, 0) | bits.get(option_id, 0)
+    return masks
+
+
+def score_masks(masks, right, options_count, max_score, strategy=GradingStrategies.ALL_OR_NOTHING):
+    """{answer_id: маска} -> {answer_id: балл от 0 до max_score}"""
+    rate = STRATEGIES[strategy]
+    return {
+        answer_id: round(rate(selected, right, options_count) * max_score)
+        for answer_id, selected in masks.items()
+    }
+
+
+def write_scores(task, scores, batch_size=1000):
+    """Записывает {answer_id: score} ответов задания и переводит их в GRADED.
+
+    Различных баллов не больше max_score + 1, поэтому вместо bulk_update (CASE WHEN
+    по каждой строке) ответы с одинаковым баллом обновляются одним UPDATE ... WHERE id IN.
+    """
+    by_score = {}
+    for answer_id, score in scores.items():
+        by_score.setdefault(score, []).append(answer_id)
+
+    now = timezone.now()
+    with transaction.atomic():
+        for score, ids in by_score.items():
+            for chunk in chunked(ids, batch_size):
+                Answers.objects.filter(pk__in=chunk).update(
+                    score=score, graded_at=now, updated_at=now, status=TaskStatuses.GRADED
+                )
+        if scores:
+            # Прежние статусы ответов не загружались - счетчик пересчитывается по частичному индексу
+            CoursePostThrough.rebuild_ungraded(CoursePostThrough.objects.filter(pk=task.pk))
+    if scores:
+        invalidate_gradebook(task.course_id)
+        invalidate_item_analysis(task.course_id)
+
+
+def auto_grade(task, strategy=GradingStrategies.ALL_OR_NOTHING, statuses=(TaskStatuses.SUBMITTED,),
+               batch_size=1000):
+    """Оценивает ответы задания (CoursePostThrough) в статусах statuses.
+
+    Ответы без выбранных вариантов получают 0. Возвращает {answer_id: score}.
+    Запросов: пост, варианты, ответы, выборы и UPDATE на каждый различный балл
+    (и каждые batch_size ответов с ним).
+    """
+    post = task.post
+    if not post.is_question or post.question_type not in AUTO_GRADED_TYPES:
+        raise ValidationError({"task": "Only choice questions can be graded automatically."})
+    if strategy not in STRATEGIES:
+        raise ValidationError({"strategy": f"Expected one of: {', '.join(STRATEGIES)}"})
+
+    bits, right = option_masks(post)
+    answer_ids = list(Answers.objects.filter(task=task, status__in=statuses).values_list("id", flat=True))
+    if not answer_ids or not bits:
+        return {}
+
+    selected = selection_masks(task, bits, statuses)
+    masks = {answer_id: selected.get(answer_id, 0) for answer_id in answer_ids}
+    scores = score_masks(masks, right, len(bits), post.max_score, strategy)
+
+    write_scores(task, scores, batch_size)
+    return scores
+
+
+def bulk_grade(task, grades, batch_size=1000):
+    """Выставляет баллы вручную: grades - пары (student_id, score).
+
+    Баллы проверяются по max_score в памяти, ответы ищутся одним запросом.
+    Возвращает список {"student", "status"} в порядке входных данных (повтор
+    студента заменяет его предыдущий балл), где status - graded, not_found
+    (у студента нет ответа на задание) или invalid_score.
+    """
+    max_score = task.post.max_score
+    grades = dict(grades)
+    answers = dict(
+        Answers.objects.filter(task=task, student_id__in=grades).values_list("student_id", "id")
+    )
+
+    results = []
+    scores = {}
+    for student_id, score in grades.items():
+        if student_id not in answers:
+            status = "not_found"
+        elif max_score is None or not 0 <= score <= max_score:
+            status = "invalid_score"
+        else:
+            status = "graded"
+            scores[answers[student_id]] = score
+        results.append({"student": student_id, "status": status})
+
+    write_scores(task, scores, batch_size)
+    return results
+
@@ -0,0 +1,128 @@
+"""Анализ заданий-вопросов курса (item analysis).
+
+Для каждого вопроса курса считаются:
+- difficulty - средняя доля набранного балла (для вопросов "все или ничего" -
+  доля верных ответов);
+- discrimination - точечно-бисериальная корреляция балла за вопрос с
+  суммой баллов студента за остальные задания курса;
+- доли выбора каждого варианта ответа (в том числе неверных - дистракторов).
+
+Задания, ответы, выборы и варианты всего курса загружаются четырьмя
+запросами. Discrimination зависит от баллов за все задания курса, поэтому
+статистика кэшируется одним ключом на курс до следующей сдачи или оценки
+любого ответа в нем.
+"""
+import statistics
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from apps.enums import PostTypes, TaskStatuses
+
+from .models import Answers, AnswerOptionsThrough, CoursePostThrough, QuestionOptions
+
+
+ANSWERED_STATUSES = (TaskStatuses.SUBMITTED, TaskStatuses.GRADED)
+# Меньше ответов - корреляция не считается
+MIN_DISCRIMINATION_SAMPLE = 3
+CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def _cache_key(course_id):
+    return f"course:item-analysis:{course_id}"
+
+
+def invalidate_item_analysis(course_ids):
+    if isinstance(course_ids, (str, int)):
+        course_ids = [course_ids]
+    cache.delete_many([_cache_key(course_id) for course_id in course_ids])
+
+
+def _rate(part, total):
+    return round(part / total, 4) if total else None
+
+
+def _discrimination(item_scores, rest_scores):
+    if len(item_scores) < MIN_DISCRIMINATION_SAMPLE:
+        return None
+    try:
+        return round(statistics.correlation(item_scores, rest_scores), 4)
+    except statistics.StatisticsError:
+        # Все ответы одинаковы - вопрос не различает студентов
+        return None
+
+
+def compute_item_analysis(course_id):
+    """Статистика всех заданий-вопросов курса: {task_id: {...}}"""
+    tasks = {
+        task_id: (post_id, name, max_score)
+        for task_id, post_id, name, max_score in CoursePostThrough.objects
+        .filter(course_id=course_id, post__post_type=PostTypes.QUESTION)
+        .values_list("id", "post_id", "post__name", "post__max_score")
+    }
+
+    answered = dict.fromkeys(tasks, 0)
+    item_scores = {task_id: {} for task_id in tasks}
+    totals = {}
+    answers = Answers.objects.filter(task__course_id=course_id)\
+        .values_list("student_id", "task_id", "score", "status")
+    for student_id, task_id, score, status in answers.iterator(chunk_size=5000):
+        if score is not None:
+            totals[student_id] = totals.get(student_id, 0) + score
+        if task_id in tasks:
+            answered[task_id] += status in ANSWERED_STATUSES
+            if score is not None:
+                item_scores[task_id][student_id] = score
+
+    selections = dict(
+        AnswerOptionsThrough.objects
+        .filter(answer__task_id__in=list(tasks), answer__status__in=ANSWERED_STATUSES, option__isnull=False)
+        .order_by()
+        .values("option").annotate(total=Count("pk")).values_list("option", "total")
+    )
+    options = {}
+    for option_id, post_id, title, is_right in QuestionOptions.objects\
+            .filter(post_id__in={post_id for post_id, _, _ in tasks.values()})\
+            .order_by("id").values_list("id", "post_id", "title", "is_right"):
+        options.setdefault(post_id, []).append((option_id, title, is_right))
+
+    results = {}
+    for task_id, (post_id, name, max_score) in tasks.items():
+        scores = item_scores[task_id]
+        fractions = [score / max_score for score in scores.values()] if max_score else []
+        # Остаточный балл без самого вопроса, иначе корреляция завышается
+        rest = [totals[student_id] - score for student_id, score in scores.items()]
+
+        results[task_id] = {
+            "post": post_id,
+            "task": task_id,
+            "name": name,
+            "answered": answered[task_id],
+            "graded": len(scores),
+            "difficulty": round(statistics.fmean(fractions), 4) if fractions else None,
+            "discrimination": _discrimination(fractions, rest),
+            "options": [
+                {
+                    "id": option_id,
+                    "title": title,
+                    "is_right": is_right,
+                    "selection_rate": _rate(selections.get(option_id, 0), answered[task_id]),
+                }
+                for option_id, title, is_right in options.get(post_id, [])
+            ],
+        }
+    return results
+
+
+def get_item_analysis(course_id):
+    """Статистика вопросов курса из кэша; вопрос, которого нет в кэше, пересчитывает курс целиком"""
+    # Ключ - задание: один пост может быть привязан к курсу дважды
+    task_ids = list(
+        CoursePostThrough.objects.filter(course_id=course_id, post__post_type=PostTypes.QUESTION)
+        .order_by("created_at", "id").values_list("id", flat=True)
+    )
+    results = cache.get(_cache_key(course_id))
+    if results is None or not set(task_ids) <= results.keys():
+        results = compute_item_analysis(course_id)
+        cache.set(_cache_key(course_id), results, CACHE_TIMEOUT)
+    return [results[task_id] for task_id in task_ids if task_id in results]
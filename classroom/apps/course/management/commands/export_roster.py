@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.course.serializers import RosterExportSerializer
+from apps.course.services import ROSTER_EXPORT_COLUMNS, roster_export_rows, stream_csv, stream_ndjson
+
+
+class Command(BaseCommand):
+    help = "Потоковая выгрузка приглашений на курсы (студенты/преподаватели) в CSV или NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--course", action="append", default=[], help="id курса, можно указать несколько раз")
+        parser.add_argument("--role", default="all", help="all, student или teacher")
+        parser.add_argument("--status", action="append", default=[], help="pending, accepted или rejected")
+        parser.add_argument("--invited-after", help="ISO дата/время, включительно")
+        parser.add_argument("--invited-before", help="ISO дата/время, не включительно")
+        parser.add_argument("--output", default="csv", help="csv или ndjson")
+        parser.add_argument("--file", help="путь к файлу; по умолчанию stdout")
+
+    def handle(self, *args, **options):
+        data = {
+            "course": options["course"],
+            "role": options["role"],
+            "status": options["status"],
+            "output": options["output"],
+        }
+        for name in ("invited_after", "invited_before"):
+            if options[name]:
+                data[name] = options[name]
+
+        serializer = RosterExportSerializer(data=data)
+        if not serializer.is_valid():
+            raise CommandError(json.dumps(serializer.errors, ensure_ascii=False))
+        params = serializer.validated_data
+        output = params.pop("output")
+
+        rows = roster_export_rows(**params)
+        if output == "ndjson":
+            lines = stream_ndjson(dict(zip(ROSTER_EXPORT_COLUMNS, row)) for row in rows)
+        else:
+            lines = stream_csv(ROSTER_EXPORT_COLUMNS, rows)
+
+        if options["file"]:
+            with open(options["file"], "w", encoding="utf-8", newline="") as stream:
+                stream.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from apps.course.models import AnswerResetJobs
+from apps.enums import JobStatuses
+
+
+class Command(BaseCommand):
+    help = "Выполняет отложенный сброс ответов после смены типа вопроса (AnswerResetJobs)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="ответов в одной транзакции")
+
+    def handle(self, *args, **options):
+        # RUNNING тоже берем: задача, прерванная на середине, продолжается с last_answer_id
+        jobs = AnswerResetJobs.objects.filter(status__in=[JobStatuses.PENDING, JobStatuses.RUNNING])\
+            .order_by("created_at")
+
+        for job in jobs.iterator():
+            try:
+                job.run(chunk_size=options["chunk_size"])
+            except Exception as error:
+                job.status = JobStatuses.FAILED
+                job.save(update_fields=["status"])
+                self.stderr.write(f"Job {job.pk} failed: {error}")
+            else:
+                self.stdout.write(f"Job {job.pk}: {job.processed} answer(s) reset")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.course.similarity import rebuild_signatures
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает MinHash сигнатуры текстовых ответов для поиска похожих ответов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("post_ids", nargs="*", help="id постов; по умолчанию все текстовые вопросы")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        stored = rebuild_signatures(options["post_ids"], chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Signatures stored for {stored} answer(s)"))
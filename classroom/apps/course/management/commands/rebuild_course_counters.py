@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from apps.course.models import Courses, CoursePostThrough
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает денормализованные счетчики курсов (участники, приглашения, посты) и их заданий"
+
+    def add_arguments(self, parser):
+        parser.add_argument("course_ids", nargs="*", help="id курсов; по умолчанию все курсы")
+
+    def handle(self, *args, **options):
+        queryset = Courses.objects.all()
+        tasks = CoursePostThrough.objects.all()
+        if options["course_ids"]:
+            queryset = queryset.filter(pk__in=options["course_ids"])
+            tasks = tasks.filter(course_id__in=options["course_ids"])
+
+        updated = Courses.rebuild_counters(queryset)
+        tasks_updated = CoursePostThrough.rebuild_ungraded(tasks)
+        self.stdout.write(self.style.SUCCESS(
+            f"Counters rebuilt for {updated} course(s) and {tasks_updated} task(s)"
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.course.search import install_search_index, is_supported, rebuild_search_index
+from apps.enums import SearchKinds
+
+
+class Command(BaseCommand):
+    help = "Переиндексирует полнотекстовый поиск по курсам, постам и комментариям порциями"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--kind", action="append", choices=SearchKinds.values, help="вид объектов (можно несколько); по умолчанию все"
+        )
+        parser.add_argument("--chunk-size", type=int, default=1000, help="объектов в одной транзакции")
+
+    def handle(self, *args, **options):
+        if not is_supported():
+            raise CommandError("Full-text search requires SQLite with FTS5")
+
+        install_search_index()
+        indexed = rebuild_search_index(chunk_size=options["chunk_size"], kinds=options["kind"] or SearchKinds.values)
+        for kind, count in indexed.items():
+            self.stdout.write(f"{kind}: {count} row(s) indexed")
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt"))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from apps.course.models import QuestionOptions
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счетчики голосов вариантов ответа (опросы и вопросы) по выборам студентов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("post_ids", nargs="*", help="id постов; по умолчанию все варианты")
+
+    def handle(self, *args, **options):
+        queryset = QuestionOptions.objects.all()
+        if options["post_ids"]:
+            queryset = queryset.filter(post_id__in=options["post_ids"])
+
+        updated = QuestionOptions.rebuild_votes(queryset)
+        self.stdout.write(self.style.SUCCESS(f"Votes reconciled for {updated} option(s)"))
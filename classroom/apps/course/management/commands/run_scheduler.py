@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.course.scheduler import PostScheduler
+
+
+class Command(BaseCommand):
+    help = "Публикует отложенные посты (publish_at) и помечает просроченные ответы (deadline)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="выполнить наступившие события и выйти")
+        parser.add_argument("--horizon", type=int, default=3600, help="на сколько секунд вперед загружать события")
+        parser.add_argument("--reload", type=int, default=60, help="интервал перезагрузки событий из БД, секунд")
+
+    def handle(self, *args, **options):
+        scheduler = PostScheduler(horizon=timedelta(seconds=options["horizon"]))
+
+        if not options["once"]:
+            self.stdout.write("Scheduler started")
+            scheduler.run_forever(reload_interval=options["reload"])
+            return
+
+        scheduler.load()
+        published, overdue = scheduler.run_pending()
+        self.stdout.write(f"Published {published} post(s), marked {overdue} answer(s) overdue")
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:05
+
+import apps.course.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0003_alter_attachdata_unique_together_attachdata_file_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='courses',
+            name='course_id_base',
+        ),
+        migrations.AlterField(
+            model_name='attachdata',
+            name='id',
+            field=apps.course.fields.SymbolIdField(max_length=16, primary_key=True, serialize=False, verbose_name='symbol id'),
+        ),
+        migrations.AlterField(
+            model_name='courses',
+            name='id',
+            field=apps.course.fields.SymbolIdField(max_length=16, primary_key=True, serialize=False, verbose_name='symbol id'),
+        ),
+        migrations.AlterField(
+            model_name='posts',
+            name='id',
+            field=apps.course.fields.SymbolIdField(max_length=16, primary_key=True, serialize=False, verbose_name='symbol id'),
+        ),
+    ]
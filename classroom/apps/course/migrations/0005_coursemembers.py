@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_course_members(apps, schema_editor):
+    Courses = apps.get_model('course', 'Courses')
+    CourseMembers = apps.get_model('course', 'CourseMembers')
+    CourseTeachersThrough = apps.get_model('course', 'CourseTeachersThrough')
+    CourseStudentsThrough = apps.get_model('course', 'CourseStudentsThrough')
+
+    # Порядок важен: при конфликте остается роль, добавленная первой (creator > teacher > student)
+    members = {}
+    for course_id, user_id in Courses.objects.values_list('pk', 'creator_id').iterator():
+        members.setdefault((course_id, user_id), 'creator')
+    for course_id, user_id in CourseTeachersThrough.objects.filter(status='accepted')\
+            .values_list('course_id', 'teacher_id').iterator():
+        members.setdefault((course_id, user_id), 'teacher')
+    for course_id, user_id in CourseStudentsThrough.objects.filter(status='accepted')\
+            .values_list('course_id', 'student_id').iterator():
+        members.setdefault((course_id, user_id), 'student')
+
+    CourseMembers.objects.bulk_create(
+        [CourseMembers(course_id=course_id, user_id=user_id, role=role)
+         for (course_id, user_id), role in members.items()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0004_remove_courses_course_id_base_alter_attachdata_id_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseMembers',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('creator', 'Creator'), ('teacher', 'Teacher'), ('student', 'Student')], max_length=20, verbose_name='role')),
+                ('joined_at', models.DateTimeField(auto_now_add=True, verbose_name='joined at')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='members', to='course.courses', verbose_name='course')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_memberships', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'Course Member',
+                'verbose_name_plural': 'Course Members',
+                'indexes': [models.Index(fields=['user', 'role', 'course'], name='course_member_user_role_idx')],
+                'unique_together': {('course', 'user')},
+            },
+        ),
+        migrations.RunPython(fill_course_members, migrations.RunPython.noop),
+    ]
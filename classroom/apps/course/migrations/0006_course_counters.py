@@ -0,0 +1,55 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:08
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_course_counters(apps, schema_editor):
+    Courses = apps.get_model('course', 'Courses')
+
+    def count_of(model_name, **filters):
+        rows = apps.get_model('course', model_name).objects\
+            .filter(course=models.OuterRef('pk'), **filters).order_by()\
+            .values('course').annotate(total=models.Count('pk')).values('total')
+        return Coalesce(models.Subquery(rows), 0)
+
+    Courses.objects.update(
+        students_count=count_of('CourseStudentsThrough', status='accepted'),
+        teachers_count=count_of('CourseTeachersThrough', status='accepted'),
+        pending_invites_count=(
+            count_of('CourseStudentsThrough', status='pending') +
+            count_of('CourseTeachersThrough', status='pending')
+        ),
+        posts_count=count_of('CoursePostThrough', post__is_published=True),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0005_coursemembers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='courses',
+            name='pending_invites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='pending invites count'),
+        ),
+        migrations.AddField(
+            model_name='courses',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='published posts count'),
+        ),
+        migrations.AddField(
+            model_name='courses',
+            name='students_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='students count'),
+        ),
+        migrations.AddField(
+            model_name='courses',
+            name='teachers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='teachers count'),
+        ),
+        migrations.RunPython(fill_course_counters, migrations.RunPython.noop),
+    ]
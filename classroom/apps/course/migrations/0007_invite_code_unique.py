@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:10
+
+from django.db import migrations, models
+
+from apps.utils import generate_random_strings
+
+
+def fill_invite_codes(apps, schema_editor):
+    # Старый save не заполнял inv_code у курсов с символьным pk
+    Courses = apps.get_model('course', 'Courses')
+    length = Courses._meta.get_field('inv_code').max_length
+    used = set(Courses.objects.exclude(inv_code__isnull=True).values_list('inv_code', flat=True))
+    courses = list(Courses.objects.filter(inv_code__isnull=True).only('id'))
+    for course in courses:
+        code = None
+        while code is None or code in used:
+            code = generate_random_strings(1, length, use_upper_case=False)[0]
+        used.add(code)
+        course.inv_code = code
+    Courses.objects.bulk_update(courses, ['inv_code'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0006_course_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_invite_codes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='courses',
+            name='inv_code',
+            field=models.CharField(blank=True, max_length=8, null=True, unique=True, verbose_name='invite code'),
+        ),
+        migrations.AlterField(
+            model_name='courseteachersthrough',
+            name='accepted_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='accepted_at'),
+        ),
+    ]
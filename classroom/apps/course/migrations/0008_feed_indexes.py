@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0007_invite_code_unique'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attachdata',
+            index=models.Index(fields=['subject_type', 'subject_id'], name='attach_subject_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comments',
+            index=models.Index(fields=['subject_type', 'subject_id'], name='comment_subject_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coursepostthrough',
+            index=models.Index(fields=['course', 'created_at'], name='course_post_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0008_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerResetJobs',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_ids', models.JSONField(default=list, verbose_name='task ids')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20, verbose_name='status')),
+                ('total', models.PositiveIntegerField(blank=True, null=True, verbose_name='total')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='processed')),
+                ('last_answer_id', models.BigIntegerField(default=0, verbose_name='last answer id')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='finished at')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_reset_jobs', to='course.posts', verbose_name='post')),
+            ],
+            options={
+                'verbose_name': 'Answer Reset Job',
+                'verbose_name_plural': 'Answer Reset Jobs',
+                'indexes': [models.Index(fields=['status', 'created_at'], name='answer_reset_job_status_idx')],
+            },
+        ),
+    ]
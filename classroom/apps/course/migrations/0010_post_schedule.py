@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0009_answerresetjobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='posts',
+            name='publish_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='publish at'),
+        ),
+        migrations.AlterField(
+            model_name='answers',
+            name='status',
+            field=models.CharField(choices=[('not_started', 'Not Started'), ('in_progress', 'In Progress'), ('submitted', 'Submitted'), ('graded', 'Graded'), ('returned', 'Returned'), ('overdue', 'Overdue')], default='not_started', max_length=20, verbose_name='status'),
+        ),
+        migrations.AlterField(
+            model_name='posts',
+            name='deadline',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='deadline'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def drop_search_index(apps, schema_editor):
+    # FTS5 таблица и триггеры создаются в post_migrate (apps.course.signals)
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS course_search_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0010_post_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('course', 'Course'), ('post', 'Post'), ('comment', 'Comment')], max_length=10, verbose_name='kind')),
+                ('object_id', models.CharField(max_length=20, verbose_name='object id')),
+                ('is_hidden', models.BooleanField(default=False, verbose_name='is hidden')),
+                ('title', models.TextField(blank=True, default='', verbose_name='title')),
+                ('body', models.TextField(blank=True, default='', verbose_name='body')),
+                ('course', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='course.courses', verbose_name='course')),
+                ('task', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='course.coursepostthrough', verbose_name='task')),
+            ],
+            options={
+                'verbose_name': 'Search Entry',
+                'verbose_name_plural': 'Search Entries',
+                'indexes': [models.Index(fields=['kind', 'object_id'], name='search_entry_object_idx')],
+            },
+        ),
+        migrations.RunPython(migrations.RunPython.noop, drop_search_index),
+    ]
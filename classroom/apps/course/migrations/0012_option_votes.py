@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:29
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_option_votes(apps, schema_editor):
+    QuestionOptions = apps.get_model('course', 'QuestionOptions')
+    AnswerOptionsThrough = apps.get_model('course', 'AnswerOptionsThrough')
+
+    votes = AnswerOptionsThrough.objects.filter(option=models.OuterRef('pk')).order_by()\
+        .values('option').annotate(total=models.Count('pk')).values('total')
+    QuestionOptions.objects.update(votes_count=Coalesce(models.Subquery(votes), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0011_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionoptions',
+            name='votes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='votes count'),
+        ),
+        migrations.RunPython(fill_option_votes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_answer_signatures(apps, schema_editor):
+    from apps.course.similarity import text_signature
+
+    AnswerOptionsThrough = apps.get_model('course', 'AnswerOptionsThrough')
+    AnswerSignatures = apps.get_model('course', 'AnswerSignatures')
+
+    rows = AnswerOptionsThrough.objects.filter(
+        text__isnull=False, answer__task__post__post_type='question', answer__task__post__question_type='text'
+    ).values_list('answer_id', 'answer__task__post_id', 'text')
+    signatures = []
+    for answer_id, post_id, text in rows.iterator(chunk_size=1000):
+        signature = text_signature(text)
+        if signature is not None:
+            signatures.append(AnswerSignatures(answer_id=answer_id, source_post_id=post_id, signature=signature))
+    AnswerSignatures.objects.bulk_create(signatures, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0012_option_votes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='posts',
+            name='source',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='course.posts', verbose_name='source'),
+        ),
+        migrations.CreateModel(
+            name='AnswerSignatures',
+            fields=[
+                ('answer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='course.answers', verbose_name='answer')),
+                ('signature', models.BinaryField(verbose_name='signature')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+                ('source_post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='course.posts', verbose_name='source post')),
+            ],
+            options={
+                'verbose_name': 'Answer Signature',
+                'verbose_name_plural': 'Answer Signatures',
+            },
+        ),
+        migrations.RunPython(fill_answer_signatures, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0013_answer_signatures'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='coursepostthrough',
+            index=models.Index(fields=['course', 'post'], name='course_post_task_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coursestudentsthrough',
+            index=models.Index(fields=['student', 'status', 'course'], name='course_student_status_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:38
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_ungraded_counts(apps, schema_editor):
+    CoursePostThrough = apps.get_model('course', 'CoursePostThrough')
+    Answers = apps.get_model('course', 'Answers')
+
+    pending = Answers.objects.filter(task=models.OuterRef('pk'), status='submitted').order_by()\
+        .values('task').annotate(total=models.Count('pk')).values('total')
+    CoursePostThrough.objects.update(ungraded_count=Coalesce(models.Subquery(pending), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0014_deadline_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coursepostthrough',
+            name='ungraded_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='ungraded count'),
+        ),
+        migrations.AddIndex(
+            model_name='answers',
+            index=models.Index(condition=models.Q(('status', 'submitted')), fields=['task', 'submitted_at', 'id'], name='answer_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coursepostthrough',
+            index=models.Index(condition=models.Q(('ungraded_count__gt', 0)), fields=['course'], name='course_post_ungraded_idx'),
+        ),
+        migrations.RunPython(fill_ungraded_counts, migrations.RunPython.noop),
+    ]
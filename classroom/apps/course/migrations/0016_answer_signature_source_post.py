@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0015_grading_queue'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='answersignatures',
+            name='source_post',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='course.posts', verbose_name='source post'),
+        ),
+    ]
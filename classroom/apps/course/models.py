@@ -1,7 +1,8 @@
 from functools import partial
 
 from django.core.files.storage import default_storage
-from django.db import models, transaction
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
@@ -10,21 +11,53 @@ from django.core.exceptions import ValidationError
 
 from apps.utils import generate_random_string, file_upload_path, get_upload_path
 from apps.enums import ConfigPermissions, DeletePermissions, InviteStatuses, \
-    Roles, PostTypes, QuestionTypes, TaskStatuses, AttachmentTypes, SubjectTypes
+    Roles, PostTypes, QuestionTypes, TaskStatuses, AttachmentTypes, SubjectTypes, MemberRoles, JobStatuses, \
+    SearchKinds
 
 from classroom.settings import AUTH_USER_MODEL
 
 from . import fields as _fields
 
 
-class Courses(models.Model):
+class SymbolIdMixin:
+    """Повторяет вставку с новым id, если сгенерированный SymbolIdField уже занят.
+
+    Проверочный SELECT выполняется только после IntegrityError, обычная
+    вставка обходится одним INSERT.
+    """
+    MAX_ID_ATTEMPTS = 5
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+
+        for attempt in range(self.MAX_ID_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                is_last = attempt == self.MAX_ID_ATTEMPTS - 1
+                if is_last or not self.__class__._default_manager.filter(pk=self.pk).exists():
+                    raise
+                self.pk = self._meta.pk.generate_id()
+
+    @classmethod
+    def assign_ids(cls, objs):
+        """Назначает id объектам без него, чтобы передать их в bulk_create"""
+        objs = [obj for obj in objs if not obj.pk]
+        for obj, new_id in zip(objs, cls._meta.pk.generate_ids(len(objs))):
+            obj.pk = new_id
+        return objs
+
+
+class Courses(SymbolIdMixin, models.Model):
     id = _fields.SymbolIdField(_("symbol id"))
     title = models.CharField(_("title"), max_length=100)
     description = models.TextField(_("description"), blank=True, null=True)
     section = models.CharField(_("section"), max_length=50, blank=True, null=True)
     room_number = models.CharField(_("room"), max_length=20, blank=True, null=True)
     theme = models.CharField(_("theme"), max_length=25, blank=True, null=True)
-    inv_code = models.CharField(_("invite code"), max_length=8, blank=True, null=True)
+    inv_code = models.CharField(_("invite code"), max_length=8, blank=True, null=True, unique=True)
     config_permission = models.PositiveSmallIntegerField(
         _("config perm"),
         choices=ConfigPermissions,
@@ -51,6 +84,12 @@ class Courses(models.Model):
     created_at = models.DateTimeField(_("created_at"), auto_now_add=True)
     is_archive = models.BooleanField(_("archive"), default=False)
 
+    # Денормализованные счетчики, обновляются сигналами через F() (см. signals.py)
+    students_count = models.PositiveIntegerField(_("students count"), default=0, editable=False)
+    teachers_count = models.PositiveIntegerField(_("teachers count"), default=0, editable=False)
+    pending_invites_count = models.PositiveIntegerField(_("pending invites count"), default=0, editable=False)
+    posts_count = models.PositiveIntegerField(_("published posts count"), default=0, editable=False)
+
     teachers = models.ManyToManyField(
         AUTH_USER_MODEL,
         through="CourseTeachersThrough",  # изменено
@@ -64,13 +103,40 @@ class Courses(models.Model):
         related_name="enrolled_courses"
     )
 
+    def get_member_role(self, user):
+        """Возвращает роль пользователя на курсе (MemberRoles или None).
+
+        Результат кешируется на экземпляре курса, поэтому все проверки прав
+        в рамках одного запроса обходятся одним обращением к БД.
+        """
+        roles = self.__dict__.setdefault("_member_roles", {})
+        if user.pk not in roles:
+            roles[user.pk] = self._resolve_member_role(user)
+        return roles[user.pk]
+
+    @classmethod
+    def with_member_role(cls, user, queryset=None):
+        """Курсы с уже известной ролью пользователя: одна выборка вместо запроса на каждый курс"""
+        queryset = cls.objects.all() if queryset is None else queryset
+        role = CourseMembers.objects.filter(course=models.OuterRef("pk"), user_id=user.pk).values("role")[:1]
+        courses = list(queryset.annotate(member_role=models.Subquery(role)))
+        for course in courses:
+            course._member_roles = {user.pk: course.member_role}
+        return courses
+
+    def _resolve_member_role(self, user):
+        if self.creator_id == user.pk:
+            return MemberRoles.CREATOR
+        return CourseMembers.objects.filter(course_id=self.pk, user_id=user.pk)\
+            .values_list("role", flat=True).first()
+
+    def is_user_teacher(self, user):
+        return user.is_teacher and self.get_member_role(user) in (MemberRoles.CREATOR, MemberRoles.TEACHER)
+
     def has_user_on_course(self, user):
-        if user.is_admin or self.creator_id == user.pk:
+        if user.is_admin:
             return True
-        return (
-                self.teacher_invites.filter(teacher=user, status='accepted').exists() or
-                self.student_invites.filter(student=user, status='accepted').exists()
-        )
+        return self.get_member_role(user) is not None
 
     def can_user_delete(self, user):
         if user.is_admin:
@@ -79,7 +145,7 @@ class Courses(models.Model):
         if self.delete_permission == DeletePermissions.CREATOR_ONLY:
             return user.pk == self.creator_id
         elif self.delete_permission == DeletePermissions.ALL_TEACHERS:
-            return user.is_teacher and self.teachers.filter(pk=user.pk).exists()
+            return self.is_user_teacher(user)
         elif self.delete_permission == DeletePermissions.NOT_DELETE:
             return False
 
@@ -92,7 +158,7 @@ class Courses(models.Model):
         elif self.config_permission == ConfigPermissions.STUDENTS_ONLY_COMMENTS:
             return True
         elif self.config_permission == ConfigPermissions.TEACHERS_ONLY_PUBLISHED:
-            return user.is_teacher and self.teachers.filter(pk=user.pk).exists()
+            return self.is_user_teacher(user)
 
     def can_user_publish(self, user):
         if user.is_admin:
@@ -101,13 +167,41 @@ class Courses(models.Model):
         if self.config_permission == ConfigPermissions.ALL:
             return True
         elif self.config_permission == ConfigPermissions.STUDENTS_ONLY_COMMENTS:
-            return user.is_teacher and self.teachers.filter(pk=user.pk).exists()
+            return self.is_user_teacher(user)
         elif self.config_permission == ConfigPermissions.TEACHERS_ONLY_PUBLISHED:
-            return user.is_teacher and self.teachers.filter(pk=user.pk).exists()
+            return self.is_user_teacher(user)
+
+    @classmethod
+    def shift_counters(cls, course_ids, **deltas):
+        """Атомарно изменяет счетчики курсов: shift_counters(ids, students_count=1, ...)"""
+        if not isinstance(course_ids, (list, tuple, set)):
+            course_ids = [course_ids]
+        changes = {name: models.F(name) + delta for name, delta in deltas.items() if delta}
+        if changes and course_ids:
+            cls.objects.filter(pk__in=course_ids).update(**changes)
+
+    @classmethod
+    def rebuild_counters(cls, queryset=None):
+        """Пересчитывает все счетчики одним UPDATE с коррелированными подзапросами"""
+        def count_of(model, **filters):
+            rows = model.objects.filter(course=models.OuterRef("pk"), **filters).order_by()\
+                .values("course").annotate(total=models.Count("pk")).values("total")
+            return Coalesce(models.Subquery(rows), 0)
+
+        queryset = cls.objects.all() if queryset is None else queryset
+        return queryset.update(
+            students_count=count_of(CourseStudentsThrough, status=InviteStatuses.ACCEPTED),
+            teachers_count=count_of(CourseTeachersThrough, status=InviteStatuses.ACCEPTED),
+            pending_invites_count=(
+                count_of(CourseStudentsThrough, status=InviteStatuses.PENDING) +
+                count_of(CourseTeachersThrough, status=InviteStatuses.PENDING)
+            ),
+            posts_count=count_of(CoursePostThrough, post__is_published=True),
+        )
 
     def save(self, *args, **kwargs):
-        # Генерируем поля только для новых объектов
-        if self.pk is None:
+        # Генерируем поля только для новых объектов (pk символьный и до сохранения равен "")
+        if self._state.adding:
             # Генерируем inv_code только если он не указан
             if not self.inv_code:
                 self.inv_code = generate_random_string(
@@ -120,6 +214,11 @@ class Courses(models.Model):
 
 class ActionMixin:
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Статус на момент загрузки из БД, нужен сигналам для пересчета счетчиков курса
+        self._current_status = self.status if self.pk is not None else None
+
     def accept(self):
         self.accepted_at = timezone.now()
         self.status = InviteStatuses.ACCEPTED
@@ -146,7 +245,7 @@ class CourseTeachersThrough(ActionMixin, models.Model):
     )
 
     invited_at = models.DateTimeField(_("invited_at"), auto_now_add=True)
-    accepted_at = models.DateTimeField(_("accepted_at"), default=None)
+    accepted_at = models.DateTimeField(_("accepted_at"), null=True, blank=True)
     status = models.CharField(
         _("status"),
         max_length=20,
@@ -185,10 +284,66 @@ class CourseStudentsThrough(ActionMixin, models.Model):
 
     class Meta:
         unique_together = ("student", "course")
+        indexes = [
+            # Принятые курсы студента без обращения к таблице (календарь дедлайнов)
+            models.Index(fields=["student", "status", "course"], name="course_student_status_idx"),
+        ]
         verbose_name = _("Course Student")
         verbose_name_plural = _("Course Students")
 
 
+class CourseMembers(models.Model):
+    """Денормализованный индекс участников курса (user, course, role).
+
+    Строится из принятых приглашений и создателя курса и поддерживается
+    сигналами (см. signals.py). Списки курсов пользователя читаются отсюда
+    одним индексным запросом вместо JOIN по таблицам приглашений.
+    """
+    ROLE_PRIORITY = {MemberRoles.STUDENT: 0, MemberRoles.TEACHER: 1, MemberRoles.CREATOR: 2}
+
+    user = models.ForeignKey(
+        AUTH_USER_MODEL,
+        related_name="course_memberships",
+        verbose_name=_("user"),
+        on_delete=models.CASCADE
+    )
+    course = models.ForeignKey(
+        "Courses",
+        related_name="members",
+        verbose_name=_("course"),
+        on_delete=models.CASCADE
+    )
+    role = models.CharField(_("role"), max_length=20, choices=MemberRoles.choices)
+    joined_at = models.DateTimeField(_("joined at"), auto_now_add=True)
+
+    class Meta:
+        unique_together = ("course", "user")
+        indexes = [
+            models.Index(fields=["user", "role", "course"], name="course_member_user_role_idx"),
+        ]
+        verbose_name = _("Course Member")
+        verbose_name_plural = _("Course Members")
+
+    def __str__(self):
+        return f"{self.user} - {self.course_id} ({self.role})"
+
+    @classmethod
+    def grant(cls, course_id, user_id, role):
+        """Добавляет участника; более высокая роль (creator > teacher > student) не понижается"""
+        member, created = cls.objects.get_or_create(
+            course_id=course_id, user_id=user_id, defaults={"role": role}
+        )
+        if not created and cls.ROLE_PRIORITY[role] > cls.ROLE_PRIORITY[member.role]:
+            member.role = role
+            member.save(update_fields=["role"])
+        return member
+
+    @classmethod
+    def revoke(cls, course_id, user_id, role):
+        """Удаляет участника, только если он состоит на курсе именно в этой роли"""
+        cls.objects.filter(course_id=course_id, user_id=user_id, role=role).delete()
+
+
 class Themes(models.Model):
     name = models.CharField(_("name"), max_length=50)
     course = models.ForeignKey(
@@ -204,7 +359,7 @@ class Themes(models.Model):
         verbose_name_plural = _("Themes")
 
 
-class Posts(models.Model):
+class Posts(SymbolIdMixin, models.Model):
     id = _fields.SymbolIdField(_("symbol id"))
     name = models.CharField(_("name"), max_length=100)
     description = models.TextField(_("description"), blank=True, null=True)
@@ -213,7 +368,8 @@ class Posts(models.Model):
     author = models.ForeignKey(AUTH_USER_MODEL, verbose_name=_("author"), on_delete=models.SET_NULL, null=True)
     is_published = models.BooleanField(_("is published"), default=False)
     max_score = models.IntegerField(_("max score"), null=True, blank=True, validators=[MinValueValidator(0)])
-    deadline = models.DateTimeField(_("deadline"), null=True, blank=True)
+    deadline = models.DateTimeField(_("deadline"), null=True, blank=True, db_index=True)
+    publish_at = models.DateTimeField(_("publish at"), null=True, blank=True, db_index=True)
     question_type = models.CharField(
         _("question type"),
         max_length=20,
@@ -223,6 +379,15 @@ class Posts(models.Model):
     )
     can_change = models.BooleanField(_("can change"), default=False)
     can_comment = models.BooleanField(_("can comment"), default=False)
+    # Исходный пост копии, сделанной при клонировании курса (всегда корень цепочки копий)
+    source = models.ForeignKey(
+        "self",
+        verbose_name=_("source"),
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+"
+    )
     created_at = models.DateTimeField(_("created at"), auto_now_add=True)
     updated_at = models.DateTimeField(_("updated at"), auto_now=True)
 
@@ -232,9 +397,16 @@ class Posts(models.Model):
         related_name="posts"
     )
 
+    # Поля, которые проверяет clean()
+    CLEAN_FIELDS = {
+        "post_type", "description", "theme", "theme_id", "author", "author_id", "is_published",
+        "max_score", "deadline", "publish_at", "question_type", "can_change", "can_comment",
+    }
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._current_question_type = self.question_type
+        self._current_is_published = self.is_published
 
     @property
     def is_question(self):
@@ -310,6 +482,9 @@ class Posts(models.Model):
             if self.deadline is not None:
                 errors['deadline'] = 'Students cannot set deadline.'
 
+            if self.publish_at is not None:
+                errors['publish_at'] = 'Students cannot set publish_at.'
+
             if self.question_type is not None:
                 errors['question_type'] = 'Students cannot set question_type.'
 
@@ -322,28 +497,41 @@ class Posts(models.Model):
             if errors:
                 raise ValidationError(errors)
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
+    def _validate(self, update_fields=None):
+        """full_clean без лишних запросов.
+
+        Уникальность PK не проверяется SELECT'ом (ее гарантирует БД), а при
+        save(update_fields=...) проверяются только обновляемые поля и clean()
+        вызывается, только если среди них есть поля, которые он проверяет.
+        """
+        if update_fields is None:
+            self.full_clean(validate_unique=False)
+            return
+
+        update_fields = set(update_fields)
+        exclude = [field.name for field in self._meta.concrete_fields
+                   if field.name not in update_fields and field.attname not in update_fields]
+        self.clean_fields(exclude=exclude)
+        if update_fields & self.CLEAN_FIELDS:
+            self.clean()
+
+    def has_compatible_question_type(self):
         old_question_type = self._current_question_type
+        return old_question_type == self.question_type or \
+            (old_question_type == QuestionTypes.ONE_CHOICE and self.question_type == QuestionTypes.MULTI_CHOICE)
 
-        if old_question_type == self.question_type or \
-            (old_question_type == QuestionTypes.ONE_CHOICE and
-                self.question_type == QuestionTypes.MULTI_CHOICE):
+    def save(self, *args, **kwargs):
+        self._validate(kwargs.get("update_fields"))
 
+        if self._state.adding or self.has_compatible_question_type():
             super().save(*args, **kwargs)
             self._current_question_type = self.question_type
             return
 
+        # Сброс ответов выполняется позже и порциями (AnswerResetJobs), сохранение поста не ждет его
         with transaction.atomic():
-            answer_options_through_qs = AnswerOptionsThrough.objects.filter(
-                answer__task__post=self
-            ).select_related('answer', 'option')
-            answer_options_through_qs.delete()
-            Answers.objects.select_related('answer', 'option')\
-                .filter(task__post=self).update(score=None, status=TaskStatuses.RETURNED)
-
-            # Сохраняем объект Posts после обработки изменений
             super().save(*args, **kwargs)
+            self.answer_reset_job = AnswerResetJobs.schedule(self)
 
         # Обновляем _current_question_type после сохранения
         self._current_question_type = self.question_type
@@ -358,6 +546,8 @@ class QuestionOptions(models.Model):
     )
     title = models.TextField(_("title"))
     is_right = models.BooleanField(_("is right"), blank=True, null=True) # если null, то расмматриватькак ответ на опрос
+    # Денормализованное число выборов варианта (AnswerOptionsThrough), см. shift_votes
+    votes_count = models.PositiveIntegerField(_("votes count"), default=0, editable=False)
     created_at = models.DateTimeField(_("created at"), auto_now_add=True)
     updated_at = models.DateTimeField(_("updated at"), auto_now=True)
 
@@ -365,12 +555,30 @@ class QuestionOptions(models.Model):
         verbose_name = _("Question Option")
         verbose_name_plural = _("Question Options")
 
+    @classmethod
+    def shift_votes(cls, deltas):
+        """Атомарно изменяет счетчики голосов: {option_id: delta}, один UPDATE на каждое значение delta"""
+        by_delta = {}
+        for option_id, delta in deltas.items():
+            if option_id is not None and delta:
+                by_delta.setdefault(delta, []).append(option_id)
+        for delta, option_ids in by_delta.items():
+            cls.objects.filter(pk__in=option_ids).update(votes_count=models.F("votes_count") + delta)
+
+    @classmethod
+    def rebuild_votes(cls, queryset=None):
+        """Пересчитывает счетчики голосов одним UPDATE с подзапросом GROUP BY"""
+        votes = AnswerOptionsThrough.objects.filter(option=models.OuterRef("pk")).order_by()\
+            .values("option").annotate(total=models.Count("pk")).values("total")
+        queryset = cls.objects.all() if queryset is None else queryset
+        return queryset.update(votes_count=Coalesce(models.Subquery(votes), 0))
+
     def clean(self):
         if self.post is None:
             raise ValidationError(
                 "Question options can attach to null post"
             )
-        if not (self.post.is_question or self.is_quiz):
+        if not (self.post.is_question or self.post.is_quiz):
             raise ValidationError(
                 "Question options can only be added to QUESTION ot QUIZ type of post"
             )
@@ -401,16 +609,40 @@ class CoursePostThrough(models.Model):
         on_delete=models.CASCADE,
         related_name="course_connections"
     )
+    # Денормализованное число ответов в статусе SUBMITTED (ждут оценки), см. shift_ungraded
+    ungraded_count = models.PositiveIntegerField(_("ungraded count"), default=0, editable=False)
     created_at = models.DateTimeField(_("created at"), auto_now_add=True)
     updated_at = models.DateTimeField(_("updated at"), auto_now=True, null=True, blank=True)
 
     class Meta:
+        indexes = [
+            models.Index(fields=["course", "created_at"], name="course_post_feed_idx"),
+            models.Index(fields=["course", "post"], name="course_post_task_idx"),
+            # Очередь проверки: только задания с ответами, ждущими оценки
+            models.Index(
+                fields=["course"], condition=models.Q(ungraded_count__gt=0), name="course_post_ungraded_idx"
+            ),
+        ]
         verbose_name = _("Course Post Connection")
         verbose_name_plural = _("Course Post Connections")
 
     def __str__(self):
         return f"{self.course.title} - {self.post.name}"
 
+    @classmethod
+    def shift_ungraded(cls, task_id, delta):
+        """Атомарно изменяет счетчик ответов, ждущих оценки"""
+        if delta:
+            cls.objects.filter(pk=task_id).update(ungraded_count=models.F("ungraded_count") + delta)
+
+    @classmethod
+    def rebuild_ungraded(cls, queryset=None):
+        """Пересчитывает счетчики одним UPDATE; подзапрос читает частичный индекс answer_pending_idx"""
+        pending = Answers.objects.filter(task=models.OuterRef("pk"), status=TaskStatuses.SUBMITTED).order_by()\
+            .values("task").annotate(total=models.Count("pk")).values("total")
+        queryset = cls.objects.all() if queryset is None else queryset
+        return queryset.update(ungraded_count=Coalesce(models.Subquery(pending), 0))
+
 
 class Answers(models.Model):
     student = models.ForeignKey(
@@ -452,15 +684,28 @@ class Answers(models.Model):
 
     class Meta:
         unique_together = ("student", "task")
+        indexes = [
+            # Сданные ответы, ждущие оценки, в порядке сдачи (очередь проверки)
+            models.Index(
+                fields=["task", "submitted_at", "id"],
+                condition=models.Q(status=TaskStatuses.SUBMITTED),
+                name="answer_pending_idx",
+            ),
+        ]
         verbose_name = _("Student Answer")
         verbose_name_plural = _("Student Answers")
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Статус на момент загрузки из БД, нужен сигналам для счетчика ungraded_count задания
+        self._current_status = self.status if self.pk is not None else None
+
     def __str__(self):
         return f"Answer by {self.student} for <{self.task}> (Status: {self.status})"
 
     def save(self, *args, **kwargs):
         post = self.task.post
-        if not (post.is_question or post.is_exercise):
+        if not (post.is_question or post.is_exercise or post.is_quiz):
             raise ValidationError(f"Student can`t give the answer on {post.post_type}")
         super().save(*args, **kwargs)
 
@@ -506,6 +751,22 @@ class AnswerOptionsThrough(models.Model):
         verbose_name = _("Student Answer Option")
         verbose_name_plural = _("Student Answer Options")
 
+    @classmethod
+    def delete_selections(cls, queryset):
+        """Удаляет выборы одним DELETE без загрузки строк и рассылки сигналов.
+
+        Единственное место, где используется приватный QuerySet._raw_delete
+        (delete() загружает строки ради сигналов). Поддерживаемые сигналами
+        счетчики голосов и сигнатуры текстовых ответов обновляются здесь же.
+        """
+        votes = queryset.filter(option__isnull=False).order_by().values("option")\
+            .annotate(total=models.Count("pk")).values_list("option", "total")
+        QuestionOptions.shift_votes({option_id: -total for option_id, total in votes})
+        AnswerSignatures.objects.filter(
+            answer_id__in=queryset.filter(text__isnull=False).values("answer_id")
+        ).delete()
+        queryset._raw_delete(queryset.db)
+
     def clean(self):
         """Проверка что заполнено только одно поле: либо option, либо answer_text"""
         if not (self.option is None) ^ (self.text is None):
@@ -513,6 +774,10 @@ class AnswerOptionsThrough(models.Model):
                 "Either option or text must be set, but not both."
             )
         post = self.answer.task.post
+        if post.is_quiz:
+            if self.option is None:
+                raise ValidationError("Quiz answer must select an option")
+            return
         if not post.is_question:
             raise ValidationError(f"Optional answer is only available for question, not {post.post_type}")
         if self.option and post.question_type == QuestionTypes.TEXT:
@@ -535,7 +800,103 @@ class AnswerOptionsThrough(models.Model):
             return f"Text answer for answer {self.answer_id}"
 
 
-class AttachData(models.Model):
+class AnswerResetJobs(models.Model):
+    """Отложенный сброс ответов на вопрос после несовместимой смены question_type.
+
+    Удаляет выбранные варианты и возвращает ответы (score=None, status=RETURNED)
+    для заданий (CoursePostThrough) поста порциями по id ответа, каждая порция в
+    своей короткой транзакции. Не трогаются только ответы, сданные заново после
+    создания задачи (их выборы новее задачи): оценка или просрочка ответа
+    старые выборы не заменяет. Выполняется командой process_answer_reset_jobs.
+    """
+    post = models.ForeignKey(
+        'Posts',
+        verbose_name=_("post"),
+        on_delete=models.CASCADE,
+        related_name="answer_reset_jobs"
+    )
+    task_ids = models.JSONField(_("task ids"), default=list)
+    status = models.CharField(
+        _("status"),
+        max_length=20,
+        choices=JobStatuses.choices,
+        default=JobStatuses.PENDING
+    )
+    total = models.PositiveIntegerField(_("total"), null=True, blank=True)
+    processed = models.PositiveIntegerField(_("processed"), default=0)
+    last_answer_id = models.BigIntegerField(_("last answer id"), default=0)
+    created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+    finished_at = models.DateTimeField(_("finished at"), null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="answer_reset_job_status_idx"),
+        ]
+        verbose_name = _("Answer Reset Job")
+        verbose_name_plural = _("Answer Reset Jobs")
+
+    def __str__(self):
+        return f"Reset answers for post {self.post_id} ({self.status}, {self.processed}/{self.total})"
+
+    @classmethod
+    def schedule(cls, post):
+        task_ids = list(CoursePostThrough.objects.filter(post=post).values_list("id", flat=True))
+        return cls.objects.create(post=post, task_ids=task_ids)
+
+    @property
+    def progress(self):
+        if self.status == JobStatuses.DONE:
+            return 1.0
+        if not self.total:
+            return 0.0
+        return self.processed / self.total
+
+    def _pending_answers(self):
+        resubmitted = AnswerOptionsThrough.objects.filter(answer=models.OuterRef("pk"), created_at__gt=self.created_at)
+        return Answers.objects.filter(task_id__in=self.task_ids).exclude(models.Exists(resubmitted))
+
+    def run(self, chunk_size=1000):
+        """Выполняет задачу до конца; прерванная задача продолжается с last_answer_id"""
+        if self.total is None:
+            self.total = self._pending_answers().filter(pk__gt=self.last_answer_id).count() + self.processed
+        self.status = JobStatuses.RUNNING
+        self.save(update_fields=["status", "total"])
+
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    self._pending_answers().filter(pk__gt=self.last_answer_id)
+                    .order_by("pk").values_list("pk", "task_id")[:chunk_size]
+                )
+                if not rows:
+                    break
+                answer_ids = [answer_id for answer_id, _ in rows]
+
+                AnswerOptionsThrough.delete_selections(AnswerOptionsThrough.objects.filter(
+                    answer_id__in=answer_ids, created_at__lte=self.created_at
+                ))
+                Answers.objects.filter(pk__in=answer_ids).update(score=None, status=TaskStatuses.RETURNED)
+                # Пересчитываются только задания, ответы которых попали в порцию
+                CoursePostThrough.rebuild_ungraded(
+                    CoursePostThrough.objects.filter(pk__in={task_id for _, task_id in rows})
+                )
+
+                self.last_answer_id = answer_ids[-1]
+                self.processed += len(answer_ids)
+                self.save(update_fields=["last_answer_id", "processed"])
+
+        from .gradebook import invalidate_gradebook
+        from .item_analysis import invalidate_item_analysis
+        course_ids = list(CoursePostThrough.objects.filter(pk__in=self.task_ids).values_list("course_id", flat=True))
+        invalidate_gradebook(course_ids)
+        invalidate_item_analysis(course_ids)
+
+        self.status = JobStatuses.DONE
+        self.finished_at = timezone.now()
+        self.save(update_fields=["status", "finished_at"])
+
+
+class AttachData(SymbolIdMixin, models.Model):
     MAX_FILE_SIZE = 2 * (1024 ** 3) # 2 ГБ
     id = _fields.SymbolIdField(_("symbol id"))
     link = models.TextField(_("link"), max_length=250)
@@ -561,6 +922,9 @@ class AttachData(models.Model):
     created_at = models.DateTimeField(_("created at"), auto_now_add=True)
 
     class Meta:
+        indexes = [
+            models.Index(fields=["subject_type", "subject_id"], name="attach_subject_idx"),
+        ]
         verbose_name = _("Attachment")
         verbose_name_plural = _("Attachments")
 
@@ -621,6 +985,9 @@ class Comments(models.Model):
     updated_at = models.DateTimeField(_("updated at"), auto_now=True)
 
     class Meta:
+        indexes = [
+            models.Index(fields=["subject_type", "subject_id"], name="comment_subject_idx"),
+        ]
         verbose_name = _("Comment")
         verbose_name_plural = _("Comments")
 
@@ -644,3 +1011,80 @@ class Comments(models.Model):
     def can_delete(self, user):
         """Проверяет, может ли пользователь удалить комментарий"""
         return user == self.author or user.is_admin
+
+
+class SearchEntries(models.Model):
+    """Строки полнотекстового индекса (курсы, посты и комментарии к ним).
+
+    Таблица и FTS5 индекс course_search_fts поверх нее поддерживаются
+    триггерами SQLite (миграция 0011_search_index), поэтому в синхронизации
+    участвуют и bulk_create/update, минующие сигналы. Пост индексируется по
+    строке на каждое подключение к курсу (task), course денормализован для
+    ограничения поиска курсами пользователя.
+    """
+    kind = models.CharField(_("kind"), max_length=10, choices=SearchKinds.choices)
+    object_id = models.CharField(_("object id"), max_length=20)
+    course = models.ForeignKey(
+        'Courses',
+        verbose_name=_("course"),
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+"
+    )
+    task = models.ForeignKey(
+        'CoursePostThrough',
+        verbose_name=_("task"),
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="+"
+    )
+    is_hidden = models.BooleanField(_("is hidden"), default=False)
+    title = models.TextField(_("title"), blank=True, default="")
+    body = models.TextField(_("body"), blank=True, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["kind", "object_id"], name="search_entry_object_idx"),
+        ]
+        verbose_name = _("Search Entry")
+        verbose_name_plural = _("Search Entries")
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.object_id} in course {self.course_id}"
+
+
+
+class AnswerSignatures(models.Model):
+    """MinHash сигнатура текстового ответа для поиска похожих ответов.
+
+    Сигнатура хранится одной строкой на ответ - упакованным массивом
+    uint32 (apps.course.similarity). source_post - корень цепочки копий
+    поста, по нему сравниваются ответы на один вопрос в разных потоках курса.
+    Удаление корня не удаляет сигнатуры копий: они переводятся на сами копии
+    (см. signals.repoint_clone_signatures), поэтому ограничения в БД нет.
+    """
+    answer = models.OneToOneField(
+        'Answers',
+        verbose_name=_("answer"),
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="signature"
+    )
+    source_post = models.ForeignKey(
+        'Posts',
+        verbose_name=_("source post"),
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+"
+    )
+    signature = models.BinaryField(_("signature"))
+    updated_at = models.DateTimeField(_("updated at"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Answer Signature")
+        verbose_name_plural = _("Answer Signatures")
+
+    def __str__(self):
+        return f"Signature of answer {self.answer_id}"
@@ -0,0 +1,161 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Keyset (cursor) пагинация по составному ключу.
+
+    Вместо OFFSET каждая страница фильтруется по значениям ключа последней
+    записи предыдущей страницы, поэтому время ответа не зависит от глубины.
+    Поля ``ordering`` должны однозначно упорядочивать выборку (последним
+    обычно идет первичный ключ).
+    """
+    ordering = ("-created_at", "-id")
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    include_count = True
+
+    mode_query_param = "pagination"
+    mode_query_value = "cursor"
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    count_query_param = "count"
+
+    invalid_cursor_message = "Invalid cursor"
+
+    @classmethod
+    def is_requested(cls, request):
+        """Клиент включает keyset режим параметром ?pagination=cursor или передачей курсора"""
+        params = request.query_params
+        return params.get(cls.mode_query_param) == cls.mode_query_value or cls.cursor_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.count = queryset.count() if self.get_include_count(request) else None
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position))
+
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+        self.next_position = self.get_position(page[-1]) if self.has_next else None
+        return page
+
+    def get_paginated_response(self, data):
+        response = {"next": self.get_next_link(), "results": data}
+        if self.count is not None:
+            response = {"count": self.count, **response}
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        properties = {
+            "count": {"type": "integer", "example": 123},
+            "next": {"type": "string", "nullable": True, "format": "uri"},
+            "results": schema,
+        }
+        return {"type": "object", "required": ["next", "results"], "properties": properties}
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_include_count(self, request):
+        value = request.query_params.get(self.count_query_param)
+        if value is None:
+            return self.include_count
+        return value.lower() not in ("0", "false", "no", "off")
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    @staticmethod
+    def _field_name(ordering_field):
+        return ordering_field.lstrip("-")
+
+    def get_position(self, instance):
+        """Значения ключа сортировки для записи (объекта или словаря из values())"""
+        if isinstance(instance, dict):
+            return [instance[self._field_name(field)] for field in self.ordering]
+        return [getattr(instance, self._field_name(field)) for field in self.ordering]
+
+    def get_position_filter(self, position):
+        """Условие "строго после позиции" для составного ключа:
+        (a < x) OR (a = x AND b < y) OR ...
+        """
+        condition = Q()
+        equal = Q()
+        for ordering_field, value in zip(self.ordering, position):
+            name = self._field_name(ordering_field)
+            lookup = "lt" if ordering_field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def get_cursor_field(self, model, name):
+        """Поле модели, приводящее значение ключа из курсора к типу Python"""
+        return model._meta.get_field(name)
+
+    def encode_cursor(self, position):
+        values = [value.isoformat() if hasattr(value, "isoformat") else value for value in position]
+        payload = json.dumps(values, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(payload).decode()
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                self.get_cursor_field(model, self._field_name(field)).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, binascii.Error, ValidationError, FieldDoesNotExist):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class RosterPagination(KeysetPagination):
+    ordering = ("invited_at", "id")
+    max_page_size = 500
+
+
+class DeadlinePagination(KeysetPagination):
+    """Задания по возрастанию дедлайна; deadline - аннотация из Posts"""
+    ordering = ("deadline", "id")
+    include_count = False
+
+    def get_cursor_field(self, model, name):
+        if name == "deadline":
+            return model._meta.get_field("post").related_model._meta.get_field("deadline")
+        return super().get_cursor_field(model, name)
+
+
+class PendingAnswersPagination(KeysetPagination):
+    """Очередь проверки задания: сданные ответы в порядке сдачи"""
+    ordering = ("submitted_at", "id")
+    include_count = False
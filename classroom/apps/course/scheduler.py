@@ -0,0 +1,125 @@
+import heapq
+import logging
+import time
+from datetime import timedelta
+
+from django.db import close_old_connections, models, transaction
+from django.utils import timezone
+
+from apps.enums import TaskStatuses
+
+from .gradebook import invalidate_gradebook
+from .models import Answers, Courses, CoursePostThrough, Posts
+
+
+logger = logging.getLogger(__name__)
+
+
+class PostScheduler:
+    """Планировщик отложенной публикации постов и дедлайнов заданий.
+
+    Ближайшие события (publish_at и deadline в пределах horizon) хранятся в
+    min-heap и выполняются пачками UPDATE в момент наступления. Состояние
+    восстанавливается из БД индексными выборками при каждом reload, поэтому
+    перезапуск ничего не теряет: пропущенные за время простоя события
+    выполняются сразу после загрузки.
+    """
+    PUBLISH = "publish"
+    DEADLINE = "deadline"
+    PENDING_ANSWER_STATUSES = (TaskStatuses.NOT_STARTED, TaskStatuses.IN_PROGRESS)
+
+    def __init__(self, horizon=timedelta(hours=1), clock=timezone.now):
+        self.horizon = horizon
+        self.clock = clock
+        self._heap = []
+        self._scheduled = set()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, kind, when, post_id):
+        key = (kind, post_id, when)
+        if key not in self._scheduled:
+            self._scheduled.add(key)
+            heapq.heappush(self._heap, (when, kind, post_id))
+
+    def next_event_at(self):
+        return self._heap[0][0] if self._heap else None
+
+    def load(self):
+        """Загружает из БД события до now + horizon, включая просроченные"""
+        until = self.clock() + self.horizon
+
+        to_publish = Posts.objects.filter(is_published=False, publish_at__lte=until)\
+            .values_list("id", "publish_at")
+        for post_id, when in to_publish:
+            self.schedule(self.PUBLISH, when, post_id)
+
+        pending_answers = Answers.objects.filter(
+            task__post=models.OuterRef("pk"), status__in=self.PENDING_ANSWER_STATUSES
+        )
+        with_deadline = Posts.objects.filter(deadline__lte=until)\
+            .filter(models.Exists(pending_answers)).values_list("id", "deadline")
+        for post_id, when in with_deadline:
+            self.schedule(self.DEADLINE, when, post_id)
+
+    def run_pending(self):
+        """Выполняет наступившие события; возвращает (опубликовано постов, просрочено ответов)"""
+        now = self.clock()
+        due = {self.PUBLISH: set(), self.DEADLINE: set()}
+        while self._heap and self._heap[0][0] <= now:
+            when, kind, post_id = heapq.heappop(self._heap)
+            self._scheduled.discard((kind, post_id, when))
+            due[kind].add(post_id)
+
+        published = self.publish(due[self.PUBLISH], now) if due[self.PUBLISH] else 0
+        overdue = self.mark_overdue(due[self.DEADLINE], now) if due[self.DEADLINE] else 0
+        return published, overdue
+
+    @staticmethod
+    def publish(post_ids, now):
+        # Время публикации могло измениться после загрузки, поэтому условие повторяется в UPDATE
+        with transaction.atomic():
+            posts = Posts.objects.filter(pk__in=post_ids, is_published=False, publish_at__lte=now)
+            post_ids = list(posts.values_list("id", flat=True))
+            # publish_at сбрасывается, иначе снятый с публикации пост опубликуется снова
+            published = Posts.objects.filter(pk__in=post_ids).update(
+                is_published=True, publish_at=None, updated_at=now
+            )
+            # UPDATE минует сигналы, поэтому счетчики затронутых курсов пересчитываются явно
+            course_ids = CoursePostThrough.objects.filter(post_id__in=post_ids).values("course_id")
+            Courses.rebuild_counters(Courses.objects.filter(pk__in=course_ids))
+        return published
+
+    @classmethod
+    def mark_overdue(cls, post_ids, now):
+        overdue = Answers.objects.filter(
+            task__post_id__in=post_ids,
+            task__post__deadline__lte=now,
+            status__in=cls.PENDING_ANSWER_STATUSES,
+        ).update(status=TaskStatuses.OVERDUE, updated_at=now)
+        if overdue:
+            course_ids = CoursePostThrough.objects.filter(post_id__in=post_ids).values_list("course_id", flat=True)
+            invalidate_gradebook(course_ids)
+        return overdue
+
+    def run_forever(self, reload_interval=60, sleep=time.sleep):
+        """Спит до ближайшего события, но не дольше reload_interval, после чего подгружает новые.
+
+        Ошибка итерации (например, разрыв соединения с БД) только логируется:
+        невыполненные события остаются в БД и подгрузятся следующим load().
+        """
+        while True:
+            # Как между запросами: закрывает соединения, истекшие или сломанные
+            close_old_connections()
+            try:
+                self.load()
+                self.run_pending()
+            except Exception:
+                logger.exception("Scheduler iteration failed")
+
+            next_at = self.next_event_at()
+            wait = reload_interval
+            if next_at is not None:
+                wait = min(wait, max((next_at - self.clock()).total_seconds(), 0))
+            sleep(wait)
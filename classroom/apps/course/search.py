@@ -0,0 +1,298 @@
+"""Полнотекстовый поиск по курсам, постам и комментариям (SQLite FTS5).
+
+Строки индекса хранятся в SearchEntries, поверх них построен external content
+FTS5 индекс FTS_TABLE. Обе таблицы поддерживаются триггерами на исходных
+таблицах, поэтому индекс не расходится с данными и при bulk_create/update.
+SQLite проверяет триггеры при пересоздании связанных таблиц в миграциях,
+поэтому на время migrate они удаляются (pre_migrate) и создаются заново
+install_search_index после него (post_migrate). Изменения данных миграциями
+в индекс не попадают - после таких миграций нужен rebuild_search_index.
+"""
+import re
+
+from django.db import connection, transaction
+
+from apps.enums import MemberRoles, SearchKinds, SubjectTypes
+
+from .models import Comments, CourseMembers, CoursePostThrough, Courses, Posts, SearchEntries
+
+
+FTS_TABLE = "course_search_fts"
+ENTRIES_TABLE = SearchEntries._meta.db_table
+COURSES_TABLE = Courses._meta.db_table
+POSTS_TABLE = Posts._meta.db_table
+TASKS_TABLE = CoursePostThrough._meta.db_table
+COMMENTS_TABLE = Comments._meta.db_table
+MEMBERS_TABLE = CourseMembers._meta.db_table
+ENTRY_COLUMNS = "kind, object_id, course_id, task_id, is_hidden, title, body"
+
+MAX_QUERY_TERMS = 10
+# Веса bm25 для колонок (title, body)
+RANK_WEIGHTS = (4.0, 1.0)
+
+# SELECT строк индекса для каждого вида объектов, {where} ограничивает выборку
+ENTRY_SELECTS = {
+    SearchKinds.COURSE: f"""
+        SELECT 'course', c.id, c.id, NULL, 0, c.title,
+               trim(coalesce(c.description, '') || ' ' || coalesce(c.section, '') || ' ' || coalesce(c.theme, ''))
+        FROM {COURSES_TABLE} c
+        WHERE {{where}}
+    """,
+    SearchKinds.POST: f"""
+        SELECT 'post', p.id, t.course_id, t.id, NOT p.is_published, p.name, coalesce(p.description, '')
+        FROM {TASKS_TABLE} t
+        JOIN {POSTS_TABLE} p ON p.id = t.post_id
+        WHERE {{where}}
+    """,
+    SearchKinds.COMMENT: f"""
+        SELECT 'comment', CAST(m.id AS TEXT), t.course_id, t.id, NOT p.is_published, '', m.content
+        FROM {COMMENTS_TABLE} m
+        JOIN {TASKS_TABLE} t ON t.id = m.subject_id
+        JOIN {POSTS_TABLE} p ON p.id = t.post_id
+        WHERE m.subject_type = '{SubjectTypes.COURSE_POST}' AND {{where}}
+    """,
+}
+# Модель-источник и ее псевдоним в ENTRY_SELECTS
+SOURCES = {
+    SearchKinds.COURSE: (Courses, "c"),
+    SearchKinds.POST: (Posts, "p"),
+    SearchKinds.COMMENT: (Comments, "m"),
+}
+
+
+def insert_entries_sql(kind, where):
+    return f"INSERT INTO {ENTRIES_TABLE} ({ENTRY_COLUMNS}) " + ENTRY_SELECTS[kind].format(where=where)
+
+
+def _delete_entries_sql(kind, object_id):
+    return f"DELETE FROM {ENTRIES_TABLE} WHERE kind = '{kind}' AND object_id = {object_id}"
+
+
+TRIGGERS = {
+    # SearchEntries -> FTS5 (external content: индекс обновляется только явно)
+    "search_entry_ai": f"""
+        AFTER INSERT ON {ENTRIES_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE} (rowid, title, body) VALUES (new.id, new.title, new.body);
+        END
+    """,
+    "search_entry_ad": f"""
+        AFTER DELETE ON {ENTRIES_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+        END
+    """,
+    "search_entry_au": f"""
+        AFTER UPDATE OF title, body ON {ENTRIES_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+            INSERT INTO {FTS_TABLE} (rowid, title, body) VALUES (new.id, new.title, new.body);
+        END
+    """,
+
+    # Исходные таблицы -> SearchEntries
+    "search_course_ai": f"""
+        AFTER INSERT ON {COURSES_TABLE} BEGIN
+            {insert_entries_sql(SearchKinds.COURSE, "c.id = new.id")};
+        END
+    """,
+    "search_course_au": f"""
+        AFTER UPDATE OF title, description, section, theme ON {COURSES_TABLE}
+        WHEN new.title IS NOT old.title OR new.description IS NOT old.description
+            OR new.section IS NOT old.section OR new.theme IS NOT old.theme BEGIN
+            {_delete_entries_sql(SearchKinds.COURSE, "new.id")};
+            {insert_entries_sql(SearchKinds.COURSE, "c.id = new.id")};
+        END
+    """,
+    "search_course_ad": f"""
+        AFTER DELETE ON {COURSES_TABLE} BEGIN
+            DELETE FROM {ENTRIES_TABLE} WHERE course_id = old.id;
+        END
+    """,
+    "search_task_ai": f"""
+        AFTER INSERT ON {TASKS_TABLE} BEGIN
+            {insert_entries_sql(SearchKinds.POST, "t.id = new.id")};
+        END
+    """,
+    "search_task_ad": f"""
+        AFTER DELETE ON {TASKS_TABLE} BEGIN
+            DELETE FROM {ENTRIES_TABLE} WHERE task_id = old.id;
+        END
+    """,
+    "search_post_au": f"""
+        AFTER UPDATE OF name, description ON {POSTS_TABLE}
+        WHEN new.name IS NOT old.name OR new.description IS NOT old.description BEGIN
+            {_delete_entries_sql(SearchKinds.POST, "new.id")};
+            {insert_entries_sql(SearchKinds.POST, "p.id = new.id")};
+        END
+    """,
+    "search_post_published_au": f"""
+        AFTER UPDATE OF is_published ON {POSTS_TABLE}
+        WHEN new.is_published IS NOT old.is_published BEGIN
+            UPDATE {ENTRIES_TABLE} SET is_hidden = NOT new.is_published
+            WHERE task_id IN (SELECT id FROM {TASKS_TABLE} WHERE post_id = new.id);
+        END
+    """,
+    "search_post_ad": f"""
+        AFTER DELETE ON {POSTS_TABLE} BEGIN
+            {_delete_entries_sql(SearchKinds.POST, "old.id")};
+        END
+    """,
+    "search_comment_ai": f"""
+        AFTER INSERT ON {COMMENTS_TABLE}
+        WHEN new.subject_type = '{SubjectTypes.COURSE_POST}' BEGIN
+            {insert_entries_sql(SearchKinds.COMMENT, "m.id = new.id")};
+        END
+    """,
+    "search_comment_au": f"""
+        AFTER UPDATE OF content, subject_type, subject_id ON {COMMENTS_TABLE}
+        WHEN new.content IS NOT old.content OR new.subject_type IS NOT old.subject_type
+            OR new.subject_id IS NOT old.subject_id BEGIN
+            {_delete_entries_sql(SearchKinds.COMMENT, "CAST(new.id AS TEXT)")};
+            {insert_entries_sql(SearchKinds.COMMENT, "m.id = new.id")};
+        END
+    """,
+    "search_comment_ad": f"""
+        AFTER DELETE ON {COMMENTS_TABLE} BEGIN
+            {_delete_entries_sql(SearchKinds.COMMENT, "CAST(old.id AS TEXT)")};
+        END
+    """,
+}
+
+
+def is_supported(db_connection=connection):
+    return db_connection.vendor == "sqlite"
+
+
+def install_search_index(db_connection=connection):
+    """(Пере)создает триггеры синхронизации; новый FTS5 индекс сразу заполняется
+    по всем объектам. Возвращает True, если индекс был создан.
+    """
+    if not is_supported(db_connection):
+        return False
+    with db_connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        created = cursor.fetchone() is None
+        if created:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                f"title, body, content='{ENTRIES_TABLE}', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            cursor.execute(f"DELETE FROM {ENTRIES_TABLE}")
+            for kind in ENTRY_SELECTS:
+                cursor.execute(insert_entries_sql(kind, "1"))
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+        for name, body in TRIGGERS.items():
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"CREATE TRIGGER {name} {body}")
+    return created
+
+
+def drop_search_triggers(db_connection=connection):
+    """Удаляет триггеры; нужно перед пересозданием связанных таблиц в миграциях SQLite (pre_migrate)"""
+    if not is_supported(db_connection):
+        return
+    with db_connection.cursor() as cursor:
+        for name in TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def uninstall_search_index(db_connection=connection):
+    if not is_supported(db_connection):
+        return
+    drop_search_triggers(db_connection)
+    with db_connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def rebuild_search_index(chunk_size=1000, kinds=SearchKinds.values):
+    """Переиндексирует объекты порциями по первичному ключу, каждая порция в
+    своей транзакции, затем удаляет строки удаленных объектов и оптимизирует
+    индекс. Поиск при этом продолжает работать. Возвращает число строк индекса
+    по видам.
+    """
+    indexed = {}
+    for kind in kinds:
+        model, alias = SOURCES[kind]
+        indexed[kind] = 0
+        last_pk = None
+
+        while True:
+            queryset = model.objects.order_by("pk")
+            if last_pk is not None:
+                queryset = queryset.filter(pk__gt=last_pk)
+            pks = list(queryset.values_list("pk", flat=True)[:chunk_size])
+            if not pks:
+                break
+            last_pk = pks[-1]
+
+            placeholders = ", ".join(["%s"] * len(pks))
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {ENTRIES_TABLE} WHERE kind = %s AND object_id IN ({placeholders})",
+                    [kind, *map(str, pks)]
+                )
+                cursor.execute(insert_entries_sql(kind, f"{alias}.id IN ({placeholders})"), pks)
+                indexed[kind] += cursor.rowcount
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {ENTRIES_TABLE} WHERE kind = %s "
+                f"AND object_id NOT IN (SELECT CAST(id AS TEXT) FROM {model._meta.db_table})",
+                [kind]
+            )
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return indexed
+
+
+def build_match_query(text):
+    """Превращает ввод пользователя в безопасный запрос FTS5: все слова
+    обязательны, последнее ищется по префиксу (поиск по мере ввода)
+    """
+    terms = re.findall(r"\w+", text)[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def search_courses(user, text, kinds=None, course_id=None, limit=20):
+    """Ранжированный (bm25) поиск в курсах, участником которых является user.
+
+    Скрытые строки (неопубликованные посты и комментарии к ним) видят только
+    преподаватели и создатель курса. Возвращает список словарей с полями
+    kind, object_id, course_id, post_id, title, snippet, rank.
+    """
+    match = build_match_query(text)
+    if match is None:
+        return []
+
+    conditions = [f"{FTS_TABLE} MATCH %s", "(e.is_hidden = 0 OR m.role != %s)"]
+    params = [user.pk, match, MemberRoles.STUDENT]
+    if kinds:
+        conditions.append(f"e.kind IN ({', '.join(['%s'] * len(kinds))})")
+        params.extend(kinds)
+    if course_id is not None:
+        conditions.append("e.course_id = %s")
+        params.append(course_id)
+    params.append(limit)
+
+    title_weight, body_weight = RANK_WEIGHTS
+    sql = f"""
+        SELECT e.kind, e.object_id, e.course_id, t.post_id, e.title,
+               snippet({FTS_TABLE}, 1, '', '', '…', 16) AS snippet,
+               bm25({FTS_TABLE}, {title_weight}, {body_weight}) AS rank
+        FROM {FTS_TABLE}
+        JOIN {ENTRIES_TABLE} e ON e.id = {FTS_TABLE}.rowid
+        JOIN {MEMBERS_TABLE} m ON m.course_id = e.course_id AND m.user_id = %s
+        LEFT JOIN {TASKS_TABLE} t ON t.id = e.task_id
+        WHERE {" AND ".join(conditions)}
+        ORDER BY rank
+        LIMIT %s
+    """
+    # Порядок параметров совпадает с порядком %s в запросе: user в JOIN идет раньше WHERE
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
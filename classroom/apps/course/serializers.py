@@ -1,9 +1,12 @@
 from django.db import transaction
-from rest_framework.serializers import ModelSerializer
-from rest_framework.fields import SerializerMethodField, ReadOnlyField
+from rest_framework.serializers import Serializer, ModelSerializer
+from rest_framework.fields import SerializerMethodField, ReadOnlyField, BooleanField, CharField, \
+    ChoiceField, DateTimeField, EmailField, FloatField, IntegerField, ListField, MultipleChoiceField
 from rest_framework.exceptions import ValidationError, PermissionDenied
 
-from .models import Courses, CourseTeachersThrough
+from apps.enums import GradingStrategies, InviteStatuses, MemberRoles, PostTypes, SearchKinds, SimilarityScopes
+
+from .models import Courses, CourseTeachersThrough, CoursePostThrough, Posts, QuestionOptions, Themes, Answers
 from ..authorization.serializers import UserProfileSerializer
 
 
@@ -34,16 +37,22 @@ class CoursePreviewSerializer(CreatorSerializerMixin, ModelSerializer):
                    "config_permission", "delete_permission")
 
 
+class CourseSummarySerializer(ModelSerializer):
+    """Облегченный профиль курса: только размеры, без списков участников"""
+
+    class Meta:
+        model = Courses
+        fields = ("id", "title", "students_count", "teachers_count", "pending_invites_count", "posts_count")
+
+
 class CourseProfileSerializer(CreatorSerializerMixin, ModelSerializer):
     creator = SerializerMethodField()
     course_id_base = ReadOnlyField()
     user_perms = SerializerMethodField(read_only=True)
-    students = UserProfileSerializer(many=True, read_only=True, context={'exclude_fields': ['email']})
-    teachers = UserProfileSerializer(many=True, read_only=True, context={'exclude_fields': ['email']})
 
     class Meta:
         model = Courses
-        exclude = ("inv_code", "created_at",)
+        exclude = ("inv_code", "created_at", "teachers", "students")
 
     def get_user_perms(self, model_obj):
         request = self.context["request"]
@@ -53,6 +62,7 @@ class CourseProfileSerializer(CreatorSerializerMixin, ModelSerializer):
             "is_creator": user.pk == model_obj.creator_id,
             "is_teacher": user.is_teacher,
             "is_admin": user.is_admin,
+            "role": model_obj.get_member_role(user),
             "can_user_delete": model_obj.can_user_delete(user),
             "can_user_comment": model_obj.can_user_comment(user),
             "can_user_publish": model_obj.can_user_publish(user)
@@ -76,3 +86,199 @@ class CourseProfileSerializer(CreatorSerializerMixin, ModelSerializer):
             raise PermissionDenied()
         return super().update(instance, validated_data)
 
+
+
+class JoinCourseSerializer(Serializer):
+    code = CharField(max_length=8)
+
+
+class BulkEnrollSerializer(Serializer):
+    MAX_ITEMS = 10000
+
+    emails = ListField(child=EmailField(), required=False, max_length=MAX_ITEMS)
+    user_ids = ListField(child=IntegerField(min_value=1), required=False, max_length=MAX_ITEMS)
+    role = ChoiceField(choices=[MemberRoles.STUDENT, MemberRoles.TEACHER], default=MemberRoles.STUDENT)
+    accept = BooleanField(default=False)
+
+    def validate(self, attrs):
+        if bool(attrs.get("emails")) == bool(attrs.get("user_ids")):
+            raise ValidationError("Exactly one of 'emails' or 'user_ids' must be provided.")
+        return attrs
+
+
+class CloneCourseSerializer(Serializer):
+    title = CharField(max_length=100, required=False)
+    share_posts = BooleanField(default=False)
+
+
+class RosterExportSerializer(Serializer):
+    """Параметры выгрузки участников (query params API и аргументы export_roster)"""
+    OUTPUTS = ("csv", "ndjson")
+
+    role = ChoiceField(choices=["all", MemberRoles.STUDENT, MemberRoles.TEACHER], default="all")
+    status = MultipleChoiceField(choices=InviteStatuses.choices, required=False)
+    course = ListField(child=CharField(), required=False)
+    invited_after = DateTimeField(required=False)
+    invited_before = DateTimeField(required=False)
+    output = ChoiceField(choices=OUTPUTS, default="csv")
+
+    def validate(self, attrs):
+        role = attrs.pop("role")
+        attrs["roles"] = [MemberRoles.STUDENT, MemberRoles.TEACHER] if role == "all" else [role]
+        attrs["statuses"] = sorted(attrs.pop("status", []))
+        attrs["course_ids"] = attrs.pop("course", [])
+        return attrs
+
+
+class ThemeSerializer(ModelSerializer):
+
+    class Meta:
+        model = Themes
+        fields = ("id", "name")
+
+
+class FeedQuestionOptionSerializer(ModelSerializer):
+
+    class Meta:
+        model = QuestionOptions
+        fields = ("id", "title", "is_right")
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Правильные ответы видят только преподаватели курса
+        if not self.context.get("show_answers"):
+            data.pop("is_right")
+        return data
+
+
+class FeedPostSerializer(ModelSerializer):
+    author = UserProfileSerializer(read_only=True, context={'exclude_fields': ['email']})
+    theme = ThemeSerializer(read_only=True)
+    question_options = FeedQuestionOptionSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Posts
+        fields = ("id", "name", "description", "post_type", "question_type", "is_published", "max_score",
+                  "deadline", "publish_at", "can_change", "can_comment", "created_at", "updated_at",
+                  "theme", "author", "question_options")
+
+
+class CourseFeedSerializer(ModelSerializer):
+    post = FeedPostSerializer(read_only=True)
+    attachments_count = IntegerField(read_only=True)
+    comments_count = IntegerField(read_only=True)
+
+    class Meta:
+        model = CoursePostThrough
+        fields = ("id", "created_at", "post", "attachments_count", "comments_count")
+
+
+class CourseFeedFilterSerializer(Serializer):
+    theme = IntegerField(required=False)
+    type = ChoiceField(choices=PostTypes.choices, required=False)
+    published = BooleanField(required=False, allow_null=True, default=None)
+
+
+class DeadlinesFilterSerializer(Serializer):
+    after = DateTimeField(required=False)
+    before = DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if "after" in attrs and "before" in attrs and attrs["before"] <= attrs["after"]:
+            raise ValidationError({"before": "Must be later than after."})
+        return attrs
+
+
+class DeadlineSerializer(Serializer):
+    """Строка student_deadlines_queryset (словарь values())"""
+    task = IntegerField(source="id")
+    deadline = DateTimeField()
+    status = CharField(source="answer_status", allow_null=True)
+    course = CharField(source="course_id")
+    course_title = CharField(source="course__title")
+    post = CharField(source="post_id")
+    name = CharField(source="post__name")
+    post_type = CharField(source="post__post_type")
+    max_score = IntegerField(source="post__max_score", allow_null=True)
+
+
+class GradingQueueSerializer(Serializer):
+    """Строка grading_queue_queryset (словарь values())"""
+    task = IntegerField(source="id")
+    ungraded_count = IntegerField()
+    course = CharField(source="course_id")
+    course_title = CharField(source="course__title")
+    post = CharField(source="post_id")
+    name = CharField(source="post__name")
+    deadline = DateTimeField(source="post__deadline", allow_null=True)
+
+
+class PendingAnswerSerializer(Serializer):
+    """Сданный ответ в очереди проверки (словарь values())"""
+    answer = IntegerField(source="id")
+    student = IntegerField(source="student_id")
+    email = EmailField(source="student__email")
+    first_name = CharField(source="student__first_name")
+    last_name = CharField(source="student__last_name")
+    attempts = IntegerField()
+    submitted_at = DateTimeField()
+
+
+class SearchQuerySerializer(Serializer):
+    MAX_LIMIT = 100
+
+    q = CharField(max_length=200)
+    kind = MultipleChoiceField(choices=SearchKinds.choices, required=False)
+    course = CharField(required=False)
+    limit = IntegerField(min_value=1, max_value=MAX_LIMIT, default=20)
+
+
+class AutoGradeSerializer(Serializer):
+    strategy = ChoiceField(choices=GradingStrategies.choices, default=GradingStrategies.ALL_OR_NOTHING)
+    regrade = BooleanField(default=False)
+
+
+class SimilarityQuerySerializer(Serializer):
+    MAX_LIMIT = 500
+
+    threshold = FloatField(min_value=0, max_value=1, default=0.5)
+    scope = ChoiceField(choices=SimilarityScopes.choices, default=SimilarityScopes.TASK)
+    limit = IntegerField(min_value=1, max_value=MAX_LIMIT, default=100)
+
+
+class GradeRowSerializer(Serializer):
+    student = IntegerField()
+    score = IntegerField(min_value=0)
+
+
+class BulkGradeSerializer(Serializer):
+    MAX_GRADES = 5000
+
+    grades = GradeRowSerializer(many=True, allow_empty=False, max_length=MAX_GRADES)
+
+
+class SubmitAnswerSerializer(Serializer):
+    MAX_OPTIONS = 100
+
+    options = ListField(child=IntegerField(), max_length=MAX_OPTIONS, default=list)
+    text = CharField(required=False, allow_blank=False)
+
+
+class SubmittedAnswerSerializer(ModelSerializer):
+
+    class Meta:
+        model = Answers
+        fields = ("id", "task", "status", "attempts", "submitted_at")
+
+
+class GradebookExportSerializer(Serializer):
+    OUTPUTS = ("csv", "xlsx")
+
+    output = ChoiceField(choices=OUTPUTS, default="csv")
+
+
+class CrossPostSerializer(Serializer):
+    MAX_COURSES = 500
+
+    courses = ListField(child=CharField(), min_length=1, max_length=MAX_COURSES)
+    create_answers = BooleanField(default=False)
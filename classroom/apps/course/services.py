@@ -0,0 +1,433 @@
+import csv
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework.exceptions import PermissionDenied, ValidationError
+
+from apps.enums import InviteStatuses, MemberRoles, PostTypes, QuestionTypes, Roles, SubjectTypes, TaskStatuses
+
+from .gradebook import invalidate_gradebook
+from .item_analysis import invalidate_item_analysis
+from .similarity import is_text_question, source_post_id, store_signatures
+from .models import Courses, CourseMembers, CourseTeachersThrough, CourseStudentsThrough, CoursePostThrough, \
+    Posts, QuestionOptions, Themes, AttachData, Comments, Answers, AnswerOptionsThrough
+
+
+ROSTER_SOURCES = {
+    MemberRoles.TEACHER: (CourseTeachersThrough, "teacher"),
+    MemberRoles.STUDENT: (CourseStudentsThrough, "student"),
+}
+
+
+def roster_queryset(course_id, role, statuses=None):
+    """Плоский список приглашений курса (values()) с данными пользователя без загрузки моделей"""
+    model, user_field = ROSTER_SOURCES[role]
+    queryset = model.objects.filter(course_id=course_id)
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+
+    return queryset.values(
+        "id", "status", "invited_at", "accepted_at",
+        user_id=F(f"{user_field}_id"),
+        email=F(f"{user_field}__email"),
+        first_name=F(f"{user_field}__first_name"),
+        second_name=F(f"{user_field}__second_name"),
+        last_name=F(f"{user_field}__last_name"),
+        avatar=F(f"{user_field}__avatar"),
+    )
+
+
+def roster_rows(rows, exclude_fields=()):
+    """Приводит строки roster_queryset к формату API: ссылка на аватар, скрытые поля"""
+    storage = get_user_model()._meta.get_field("avatar").storage
+    for row in rows:
+        row["avatar"] = storage.url(row["avatar"]) if row["avatar"] else None
+        for field_name in exclude_fields:
+            row.pop(field_name, None)
+        yield row
+
+
+def stream_ndjson(rows):
+    """Генератор NDJSON строк для StreamingHttpResponse"""
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+class _Echo:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows):
+    """Генератор CSV строк для StreamingHttpResponse"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+ROSTER_EXPORT_COLUMNS = (
+    "course_id", "role", "user_id", "email", "first_name", "second_name", "last_name",
+    "status", "invited_at", "accepted_at",
+)
+EXPORT_CHUNK_SIZE = 2000
+
+
+def roster_export_rows(roles, course_ids=None, statuses=None, invited_after=None, invited_before=None):
+    """Строки выгрузки участников (кортежи в порядке ROSTER_EXPORT_COLUMNS).
+
+    Читаются через values_list().iterator(), поэтому память не растет с размером курса.
+    """
+    for role in roles:
+        model, user_field = ROSTER_SOURCES[role]
+        queryset = model.objects.all()
+        if course_ids:
+            queryset = queryset.filter(course_id__in=course_ids)
+        if statuses:
+            queryset = queryset.filter(status__in=statuses)
+        if invited_after:
+            queryset = queryset.filter(invited_at__gte=invited_after)
+        if invited_before:
+            queryset = queryset.filter(invited_at__lt=invited_before)
+
+        rows = queryset.order_by("course_id", "invited_at", "id").values_list(
+            "course_id", Value(str(role)), f"{user_field}_id", f"{user_field}__email",
+            f"{user_field}__first_name", f"{user_field}__second_name", f"{user_field}__last_name",
+            "status", "invited_at", "accepted_at",
+        )
+        yield from rows.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def _subject_count(model):
+    rows = model.objects.filter(subject_type=SubjectTypes.COURSE_POST, subject_id=OuterRef("pk")).order_by()\
+        .values("subject_id").annotate(total=Count("pk")).values("total")
+    return Coalesce(Subquery(rows), 0)
+
+
+def course_feed_queryset(course_id, theme_id=None, post_type=None, is_published=None):
+    """Лента курса: посты с авторами, темами, вариантами ответов и счетчиками
+    вложений/комментариев за фиксированное число запросов
+    """
+    queryset = CoursePostThrough.objects.filter(course_id=course_id)
+    if theme_id is not None:
+        queryset = queryset.filter(post__theme_id=theme_id)
+    if post_type is not None:
+        queryset = queryset.filter(post__post_type=post_type)
+    if is_published is not None:
+        queryset = queryset.filter(post__is_published=is_published)
+
+    return queryset.select_related("post__author", "post__theme")\
+        .prefetch_related("post__question_options")\
+        .annotate(attachments_count=_subject_count(AttachData), comments_count=_subject_count(Comments))
+
+
+ANSWERABLE_POST_TYPES = (PostTypes.QUESTION, PostTypes.EXERCISE, PostTypes.QUIZ)
+
+
+def student_deadlines_queryset(student, after, before=None):
+    """Несданные задания всех курсов студента с дедлайном в [after, before).
+
+    Один запрос: принятые приглашения -> задания курсов -> посты, сданные и
+    оцененные ответы отсекаются NOT EXISTS по уникальному индексу
+    (student, task). Строки - словари values() с аннотацией deadline.
+    """
+    answered = Answers.objects.filter(
+        task=OuterRef("pk"), student=student, status__in=(TaskStatuses.SUBMITTED, TaskStatuses.GRADED)
+    )
+    answer_status = Answers.objects.filter(task=OuterRef("pk"), student=student).values("status")[:1]
+
+    queryset = CoursePostThrough.objects.filter(
+        course__student_invites__student=student,
+        course__student_invites__status=InviteStatuses.ACCEPTED,
+        post__is_published=True,
+        post__post_type__in=ANSWERABLE_POST_TYPES,
+        post__deadline__gte=after,
+    )
+    if before is not None:
+        queryset = queryset.filter(post__deadline__lt=before)
+
+    return queryset.exclude(Exists(answered))\
+        .annotate(deadline=F("post__deadline"), answer_status=Subquery(answer_status))\
+        .values(
+            "id", "deadline", "answer_status", "course_id", "course__title",
+            "post_id", "post__name", "post__post_type", "post__max_score",
+        )
+
+
+def grading_queue_queryset(teacher):
+    """Задания курсов преподавателя с ответами, ждущими оценки.
+
+    Читает только счетчики ungraded_count (частичный индекс
+    course_post_ungraded_idx), сами ответы не сканируются.
+    """
+    return CoursePostThrough.objects.filter(
+        course__members__user=teacher,
+        course__members__role__in=(MemberRoles.CREATOR, MemberRoles.TEACHER),
+        ungraded_count__gt=0,
+    ).order_by("-ungraded_count", "id").values(
+        "id", "ungraded_count", "course_id", "course__title", "post_id", "post__name", "post__deadline",
+    )
+
+
+def pending_answers_queryset(task):
+    """Сданные ответы задания, ждущие оценки (частичный индекс answer_pending_idx)"""
+    return Answers.objects.filter(task=task, status=TaskStatuses.SUBMITTED).values(
+        "id", "student_id", "student__email", "student__first_name", "student__last_name",
+        "attempts", "submitted_at",
+    )
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def bulk_enroll(course, identifiers, role=MemberRoles.STUDENT, lookup="email", accept=False, chunk_size=1000):
+    """Массовое приглашение пользователей на курс по email или id.
+
+    Каждая пачка обрабатывается в своей транзакции: один запрос за пользователями,
+    один за уже существующими приглашениями и один bulk_create. Сигналы при
+    bulk_create не срабатывают, поэтому участники и счетчики курса обновляются здесь же.
+    Возвращает список {"value", "status"} в порядке входных данных, где status -
+    created, exists, not_found или invalid_role.
+    """
+    model, user_field = ROSTER_SOURCES[role]
+    expected_role = Roles.TEACHER if role == MemberRoles.TEACHER else Roles.STUDENT
+    invite_status = InviteStatuses.ACCEPTED if accept else InviteStatuses.PENDING
+    user_model = get_user_model()
+
+    results = []
+    for chunk in chunked(list(dict.fromkeys(identifiers)), chunk_size):
+        with transaction.atomic():
+            users = {
+                value: (user_id, role_id)
+                for value, user_id, role_id in user_model.objects
+                .filter(**{f"{lookup}__in": chunk}).values_list(lookup, "id", "role_id")
+            }
+            invited = set(
+                model.objects.filter(course=course, **{f"{user_field}_id__in": [u for u, _ in users.values()]})
+                .values_list(f"{user_field}_id", flat=True)
+            )
+
+            now = timezone.now()
+            new_user_ids = []
+            for value in chunk:
+                if value not in users:
+                    results.append({"value": value, "status": "not_found"})
+                    continue
+                user_id, role_id = users[value]
+                if role_id != expected_role:
+                    results.append({"value": value, "status": "invalid_role"})
+                elif user_id in invited:
+                    results.append({"value": value, "status": "exists"})
+                else:
+                    results.append({"value": value, "status": "created"})
+                    new_user_ids.append(user_id)
+
+            model.objects.bulk_create([
+                model(**{f"{user_field}_id": user_id}, course=course, status=invite_status,
+                      accepted_at=now if accept else None)
+                for user_id in new_user_ids
+            ], ignore_conflicts=True)
+
+            if accept:
+                CourseMembers.objects.bulk_create([
+                    CourseMembers(course=course, user_id=user_id, role=role) for user_id in new_user_ids
+                ], ignore_conflicts=True)
+                counter = "teachers_count" if role == MemberRoles.TEACHER else "students_count"
+                Courses.shift_counters(course.pk, **{counter: len(new_user_ids)})
+                invalidate_gradebook(course.pk)
+            else:
+                Courses.shift_counters(course.pk, pending_invites_count=len(new_user_ids))
+
+    return results
+
+
+CLONED_COURSE_FIELDS = (
+    "description", "section", "room_number", "theme", "image", "config_permission", "delete_permission",
+)
+CLONED_POST_FIELDS = (
+    "name", "description", "post_type", "max_score", "question_type", "can_change", "can_comment",
+)
+
+
+def clone_course(course, user, title=None, share_posts=False):
+    """Копирует структуру курса (темы, посты, варианты ответов) для нового потока.
+
+    Каждая модель копируется одним SELECT и одним bulk_create, внешние ключи
+    переназначаются в памяти, поэтому число запросов не зависит от размера курса.
+    Участники, ответы и посты студентов не копируются. Скопированные посты
+    снимаются с публикации и теряют дедлайн, source указывает на исходный
+    пост (для сравнения ответов разных потоков). С share_posts=True посты не
+    копируются, а подключаются к новому курсу через CoursePostThrough
+    (их темы остаются темами исходного курса).
+    """
+    with transaction.atomic():
+        new_course = Courses(
+            title=title or course.title,
+            creator=user,
+            **{name: getattr(course, name) for name in CLONED_COURSE_FIELDS}
+        )
+        new_course.save()
+        CourseTeachersThrough(teacher=user, course=new_course).accept()
+
+        themes = list(Themes.objects.filter(course=course).values_list("id", "name"))
+        new_themes = Themes.objects.bulk_create([Themes(name=name, course=new_course) for _, name in themes])
+        theme_map = {old_id: theme.pk for (old_id, _), theme in zip(themes, new_themes)}
+
+        posts = list(
+            Posts.objects.filter(post_connections__course=course)
+            .exclude(post_type=PostTypes.STUDENT_POST)
+            .order_by("post_connections__created_at")
+        )
+
+        if share_posts:
+            new_posts = posts
+        else:
+            new_posts = [
+                Posts(
+                    author=user,
+                    theme_id=theme_map.get(post.theme_id),
+                    source_id=post.source_id or post.pk,
+                    **{name: getattr(post, name) for name in CLONED_POST_FIELDS}
+                )
+                for post in posts
+            ]
+            post_map = {post.pk: new_post.pk for post, new_post in zip(posts, new_posts)}
+
+            options = QuestionOptions.objects.filter(post_id__in=post_map).values_list("post_id", "title", "is_right")
+            Posts.objects.bulk_create(new_posts)
+            QuestionOptions.objects.bulk_create([
+                QuestionOptions(post_id=post_map[post_id], title=option_title, is_right=is_right)
+                for post_id, option_title, is_right in options
+            ])
+
+        CoursePostThrough.objects.bulk_create([CoursePostThrough(post=post, course=new_course) for post in new_posts])
+        Courses.shift_counters(new_course.pk, posts_count=sum(post.is_published for post in new_posts))
+
+    return new_course
+
+
+def publish_to_courses(post, user, course_ids, create_answers=False):
+    """Публикует пост сразу в несколько курсов.
+
+    Права на публикацию проверяются для всех курсов одной выборкой, связи
+    создаются одним bulk_create. С create_answers для заданий (QUESTION,
+    EXERCISE) сразу заводятся пустые ответы всех студентов целевых курсов.
+    Возвращает (created, skipped, answers_created) или бросает PermissionDenied
+    со списками not_found/denied, ничего не создавая.
+    """
+    course_ids = list(dict.fromkeys(course_ids))
+    courses = Courses.with_member_role(user, Courses.objects.filter(pk__in=course_ids))
+
+    found = {course.pk for course in courses}
+    not_found = [course_id for course_id in course_ids if course_id not in found]
+    denied = [course.pk for course in courses
+              if not (course.has_user_on_course(user) and course.can_user_publish(user))]
+    if not_found or denied:
+        raise PermissionDenied({"not_found": not_found, "denied": denied})
+
+    with transaction.atomic():
+        connected = set(
+            CoursePostThrough.objects.filter(post=post, course_id__in=course_ids).values_list("course_id", flat=True)
+        )
+        created = [course_id for course_id in course_ids if course_id not in connected]
+        tasks = CoursePostThrough.objects.bulk_create(
+            [CoursePostThrough(post=post, course_id=course_id) for course_id in created]
+        )
+        if post.is_published:
+            Courses.shift_counters(created, posts_count=1)
+
+        answers_created = 0
+        if create_answers and (post.is_question or post.is_exercise) and tasks:
+            task_by_course = {task.course_id: task.pk for task in tasks}
+            students = CourseMembers.objects.filter(course_id__in=task_by_course, role=MemberRoles.STUDENT)\
+                .values_list("course_id", "user_id")
+            answers = Answers.objects.bulk_create([
+                Answers(student_id=student_id, task_id=task_by_course[course_id])
+                for course_id, student_id in students
+            ], batch_size=1000)
+            answers_created = len(answers)
+
+    # bulk_create минует count_course_post: журналы без нового столбца сбрасываются явно
+    invalidate_gradebook(created)
+    return created, sorted(connected), answers_created
+
+
+def submit_answer(task, student, option_ids=(), text=None):
+    """Сдача ответа на задание одним запросом API.
+
+    Пост и его варианты загружаются один раз, выбор проверяется в памяти,
+    строка ответа блокируется (select_for_update), прежние выборы заменяются
+    одним DELETE (AnswerOptionsThrough.delete_selections) и одним bulk_create,
+    попытка засчитывается атомарным UPDATE (attempts = attempts + 1). Счетчики
+    голосов вариантов сдвигаются на разницу выборов, для текстового ответа
+    пересчитывается MinHash сигнатура. Повторная сдача (с can_change)
+    сбрасывает оценку. Бросает ValidationError, ничего не меняя.
+    """
+    post = task.post
+    if not (post.is_question or post.is_exercise or post.is_quiz):
+        raise ValidationError({"task": f"Student can`t give the answer on {post.post_type}"})
+    if not post.is_published:
+        raise ValidationError({"task": "The task is not published."})
+
+    option_ids = list(dict.fromkeys(option_ids))
+    if post.is_exercise:
+        if option_ids or text:
+            raise ValidationError({"options": "Exercise answers cannot contain options or text."})
+    elif post.question_type == QuestionTypes.TEXT and not post.is_quiz:
+        if option_ids or not text:
+            raise ValidationError({"text": "Text question requires a text answer and no options."})
+    else:
+        if text:
+            raise ValidationError({
+                "text": f"The text answer is not available for {post.question_type} question type"
+            })
+        if post.question_type == QuestionTypes.ONE_CHOICE and len(option_ids) != 1:
+            raise ValidationError({"options": "Exactly one option must be selected."})
+        if not option_ids:
+            raise ValidationError({"options": "At least one option must be selected."})
+        unknown = set(option_ids) - set(post.question_options.values_list("id", flat=True))
+        if unknown:
+            raise ValidationError({"options": f"Unknown options: {sorted(unknown)}"})
+
+    with transaction.atomic():
+        # task передается объектом, поэтому Answers.save не загружает пост повторно
+        # Строка ответа блокируется до конца транзакции: параллельная сдача ждет и
+        # видит уже сданный ответ, поэтому проверка can_change и attempts не гоняются
+        answer, _ = Answers.objects.select_for_update().get_or_create(student=student, task=task)
+        if answer.status in (TaskStatuses.SUBMITTED, TaskStatuses.GRADED) and not post.can_change:
+            raise ValidationError({"task": "The answer has already been submitted and can't be changed."})
+
+        AnswerOptionsThrough.delete_selections(AnswerOptionsThrough.objects.filter(answer=answer))
+        # bulk_create минует сигналы: голоса новых выборов и сигнатура учитываются здесь
+        if text:
+            selections = [AnswerOptionsThrough(answer=answer, text=text)]
+        else:
+            selections = [AnswerOptionsThrough(answer=answer, option_id=option_id) for option_id in option_ids]
+        AnswerOptionsThrough.objects.bulk_create(selections)
+        if text and is_text_question(post):
+            store_signatures([(answer.pk, source_post_id(post), text)])
+        QuestionOptions.shift_votes(dict.fromkeys(option_ids, 1))
+
+        now = timezone.now()
+        Answers.objects.filter(pk=answer.pk).update(
+            attempts=F("attempts") + 1, status=TaskStatuses.SUBMITTED, submitted_at=now, updated_at=now,
+            score=None, graded_at=None,
+        )
+        # UPDATE минует сигналы: счетчик очереди проверки сдвигается здесь
+        CoursePostThrough.shift_ungraded(task.pk, answer.status != TaskStatuses.SUBMITTED)
+        answer.refresh_from_db(fields=["attempts", "status", "submitted_at", "score", "graded_at"])
+        answer._current_status = answer.status
+        invalidate_gradebook(task.course_id)
+        invalidate_item_analysis(task.course_id)
+
+    return answer
+
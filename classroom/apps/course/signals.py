@@ -0,0 +1,214 @@
+from django.db import connections
+from django.db.models import Count, OuterRef, QuerySet, Subquery
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete, pre_migrate
+from django.dispatch import receiver
+
+from apps.enums import InviteStatuses, MemberRoles, TaskStatuses
+
+from .gradebook import invalidate_gradebook
+from .item_analysis import invalidate_item_analysis
+from .models import Courses, CourseMembers, CourseStudentsThrough, CourseTeachersThrough, \
+    CoursePostThrough, Posts, SearchEntries, Answers, AnswerOptionsThrough, QuestionOptions, AnswerSignatures
+from .search import drop_search_triggers, install_search_index
+from .similarity import source_post_id, store_signatures
+
+
+def _invite_deltas(counter_name, old_status, new_status):
+    """Изменения счетчиков курса при переходе приглашения old_status -> new_status"""
+    return {
+        counter_name: (new_status == InviteStatuses.ACCEPTED) - (old_status == InviteStatuses.ACCEPTED),
+        "pending_invites_count": (new_status == InviteStatuses.PENDING) - (old_status == InviteStatuses.PENDING),
+    }
+
+
+def _deleted_with(origin, *models):
+    """Удаление пришло каскадом от объекта (или QuerySet) одной из моделей models"""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, models)
+
+
+@receiver(post_save, sender=Courses)
+def add_creator_member(sender, instance, created, **kwargs):
+    if created:
+        CourseMembers.grant(instance.pk, instance.creator_id, MemberRoles.CREATOR)
+
+
+@receiver(post_delete, sender=Courses)
+def reset_deleted_course_gradebook(sender, instance, **kwargs):
+    invalidate_gradebook(instance.pk)
+
+
+@receiver(post_save, sender=CourseTeachersThrough)
+def sync_teacher_member(sender, instance, **kwargs):
+    if instance.status == InviteStatuses.ACCEPTED:
+        CourseMembers.grant(instance.course_id, instance.teacher_id, MemberRoles.TEACHER)
+    else:
+        CourseMembers.revoke(instance.course_id, instance.teacher_id, MemberRoles.TEACHER)
+
+    Courses.shift_counters(
+        instance.course_id, **_invite_deltas("teachers_count", instance._current_status, instance.status)
+    )
+    instance._current_status = instance.status
+
+
+@receiver(post_delete, sender=CourseTeachersThrough)
+def remove_teacher_member(sender, instance, origin=None, **kwargs):
+    # Участники и счетчики удаляемого курса удаляются вместе с ним
+    if _deleted_with(origin, Courses):
+        return
+    CourseMembers.revoke(instance.course_id, instance.teacher_id, MemberRoles.TEACHER)
+    Courses.shift_counters(
+        instance.course_id, **_invite_deltas("teachers_count", instance._current_status, None)
+    )
+
+
+@receiver(post_save, sender=CourseStudentsThrough)
+def sync_student_member(sender, instance, **kwargs):
+    if instance.status == InviteStatuses.ACCEPTED:
+        CourseMembers.grant(instance.course_id, instance.student_id, MemberRoles.STUDENT)
+    else:
+        CourseMembers.revoke(instance.course_id, instance.student_id, MemberRoles.STUDENT)
+
+    Courses.shift_counters(
+        instance.course_id, **_invite_deltas("students_count", instance._current_status, instance.status)
+    )
+    if instance.status != instance._current_status:
+        invalidate_gradebook(instance.course_id)
+    instance._current_status = instance.status
+
+
+@receiver(post_delete, sender=CourseStudentsThrough)
+def remove_student_member(sender, instance, origin=None, **kwargs):
+    if _deleted_with(origin, Courses):
+        return
+    CourseMembers.revoke(instance.course_id, instance.student_id, MemberRoles.STUDENT)
+    Courses.shift_counters(
+        instance.course_id, **_invite_deltas("students_count", instance._current_status, None)
+    )
+    invalidate_gradebook(instance.course_id)
+
+
+@receiver(post_save, sender=CoursePostThrough)
+def count_course_post(sender, instance, created, **kwargs):
+    if created and instance.post.is_published:
+        Courses.shift_counters(instance.course_id, posts_count=1)
+    if created:
+        invalidate_gradebook(instance.course_id)
+
+
+@receiver(post_delete, sender=CoursePostThrough)
+def uncount_course_post(sender, instance, **kwargs):
+    if Posts.objects.filter(pk=instance.post_id, is_published=True).exists():
+        Courses.shift_counters(instance.course_id, posts_count=-1)
+    invalidate_gradebook(instance.course_id)
+
+
+@receiver(post_save, sender=Posts)
+def count_published_post(sender, instance, created, **kwargs):
+    delta = instance.is_published - instance._current_is_published
+    if delta and not created:
+        course_ids = list(instance.post_connections.values_list("course_id", flat=True))
+        Courses.shift_counters(course_ids, posts_count=delta)
+    instance._current_is_published = instance.is_published
+
+
+# Задание удаляется вместе со всеми ответами и выборами: их счетчики и кэши
+# уходят вместе с ним, голоса снимаются одним GROUP BY в uncount_task_votes,
+# поэтому построчные обработчики удаления такие строки пропускают
+TASK_ORIGINS = (Courses, Posts, CoursePostThrough)
+
+
+def _ungraded_delta(old_status, new_status):
+    return (new_status == TaskStatuses.SUBMITTED) - (old_status == TaskStatuses.SUBMITTED)
+
+
+@receiver(post_save, sender=Answers)
+def count_ungraded_answer(sender, instance, **kwargs):
+    CoursePostThrough.shift_ungraded(instance.task_id, _ungraded_delta(instance._current_status, instance.status))
+    instance._current_status = instance.status
+
+
+@receiver(post_delete, sender=Answers)
+def uncount_ungraded_answer(sender, instance, origin=None, **kwargs):
+    if not _deleted_with(origin, *TASK_ORIGINS):
+        CoursePostThrough.shift_ungraded(instance.task_id, _ungraded_delta(instance._current_status, None))
+
+
+@receiver(post_save, sender=Answers)
+def reset_answer_caches(sender, instance, **kwargs):
+    # task уже загружен в Answers.save
+    invalidate_gradebook(instance.task.course_id)
+    invalidate_item_analysis(instance.task.course_id)
+
+
+@receiver(post_delete, sender=Answers)
+def reset_deleted_answer_caches(sender, instance, origin=None, **kwargs):
+    # Журнал удаляемого задания сбрасывает uncount_course_post
+    if _deleted_with(origin, *TASK_ORIGINS):
+        return
+    course_id = CoursePostThrough.objects.filter(pk=instance.task_id).values_list("course_id", flat=True).first()
+    if course_id is not None:
+        invalidate_gradebook(course_id)
+        invalidate_item_analysis(course_id)
+
+
+@receiver(post_save, sender=AnswerOptionsThrough)
+def count_option_vote(sender, instance, created, **kwargs):
+    if created:
+        QuestionOptions.shift_votes({instance.option_id: 1})
+
+
+@receiver(pre_delete, sender=CoursePostThrough)
+def uncount_task_votes(sender, instance, origin=None, **kwargs):
+    if _deleted_with(origin, Posts):
+        # Варианты удаляются вместе с постом
+        return
+    votes = AnswerOptionsThrough.objects.filter(answer__task=instance, option__isnull=False).order_by()\
+        .values("option").annotate(total=Count("pk")).values_list("option", "total")
+    QuestionOptions.shift_votes({option_id: -total for option_id, total in votes})
+
+
+@receiver(post_delete, sender=AnswerOptionsThrough)
+def uncount_option_vote(sender, instance, origin=None, **kwargs):
+    if not _deleted_with(origin, *TASK_ORIGINS, QuestionOptions):
+        QuestionOptions.shift_votes({instance.option_id: -1})
+
+
+@receiver(post_save, sender=AnswerOptionsThrough)
+def update_answer_signature(sender, instance, **kwargs):
+    # submit_answer сохраняет выборы bulk_create и обновляет сигнатуру сам
+    if instance.text is not None:
+        store_signatures([(instance.answer_id, source_post_id(instance.answer.task.post), instance.text)])
+
+
+@receiver(post_delete, sender=AnswerOptionsThrough)
+def delete_answer_signature(sender, instance, origin=None, **kwargs):
+    # При удалении ответа сигнатура удаляется каскадом вместе с ним
+    if instance.text is not None and _deleted_with(origin, AnswerOptionsThrough):
+        AnswerSignatures.objects.filter(answer_id=instance.answer_id).delete()
+
+
+@receiver(pre_delete, sender=Posts)
+def repoint_clone_signatures(sender, instance, **kwargs):
+    # Копии теряют source (SET_NULL) и становятся корнями сами себе - сигнатуры
+    # их ответов переводятся на них, как при сдаче (source_post_id)
+    AnswerSignatures.objects.filter(source_post=instance).exclude(answer__task__post=instance).update(
+        source_post_id=Subquery(Answers.objects.filter(pk=OuterRef("answer_id")).values("task__post_id"))
+    )
+
+
+@receiver(pre_migrate)
+def drop_search_triggers_before_migrate(sender, using, **kwargs):
+    # SQLite проверяет триггеры при пересоздании таблиц курсов, постов и
+    # комментариев (ALTER в миграциях), поэтому на время migrate они удаляются
+    if sender.name == "apps.course":
+        drop_search_triggers(connections[using])
+
+
+@receiver(post_migrate)
+def reinstall_search_triggers(sender, using, **kwargs):
+    if sender.name != "apps.course":
+        return
+    connection = connections[using]
+    if SearchEntries._meta.db_table in connection.introspection.table_names():
+        install_search_index(connection)
@@ -0,0 +1,237 @@
+"""Поиск похожих текстовых ответов (MinHash + LSH).
+
+Текст ответа разбивается на шинглы из SHINGLE_SIZE слов, по ним считается
+MinHash сигнатура из NUM_PERM значений uint32. Сигнатура хранится одной
+строкой AnswerSignatures на ответ (массив, упакованный в little-endian
+байты) и пересчитывается при сдаче ответа.
+
+Кандидаты в похожие пары ищутся LSH: сигнатура режется на BANDS полос по
+ROWS значений, ответы с совпадающей полосой попадают в одну корзину. Ответы
+раскладываются по корзинам за один проход, сравниваются только пары внутри
+корзин, поэтому время почти линейно по числу ответов. При 32 x 4 пара с
+похожестью по Жаккару 0.5 становится кандидатом с вероятностью ~0.87,
+пара с 0.2 - ~0.05.
+
+Ответы с побайтово одинаковыми сигнатурами (списанные слово в слово)
+сворачиваются в один кластер, LSH работает по одному представителю
+кластера, а пары строятся только с ответами на запрошенное задание.
+"""
+import heapq
+import random
+import re
+import sys
+import zlib
+from array import array
+from collections import defaultdict
+from itertools import combinations
+
+from django.db.models import F
+from django.db.models.functions import Coalesce
+
+from apps.enums import MemberRoles, PostTypes, QuestionTypes, SimilarityScopes
+
+from .models import AnswerOptionsThrough, AnswerSignatures, CourseMembers
+
+
+SHINGLE_SIZE = 3
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+
+# Хэш-функции h(x) = (a * x + b) mod PRIME; коэффициенты фиксированы, иначе
+# сохраненные сигнатуры перестанут быть сравнимыми
+PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+_rng = random.Random(20241)
+PERMUTATIONS = [(_rng.randrange(1, PRIME), _rng.randrange(0, PRIME)) for _ in range(NUM_PERM)]
+
+WORD_RE = re.compile(r"\w+")
+
+
+def shingles(text):
+    """Множество хэшей (crc32) шинглов текста; короткий текст - один шингл"""
+    words = WORD_RE.findall((text or "").lower())
+    if not words:
+        return set()
+    size = min(SHINGLE_SIZE, len(words))
+    return {
+        zlib.crc32(" ".join(words[i:i + size]).encode())
+        for i in range(len(words) - size + 1)
+    }
+
+
+def minhash(hashes):
+    """Сигнатура множества хэшей: минимум каждой из NUM_PERM хэш-функций"""
+    return [min(((a * x + b) % PRIME) & MAX_HASH for x in hashes) for a, b in PERMUTATIONS]
+
+
+def pack(signature):
+    values = array("I", signature)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def unpack(data):
+    values = array("I")
+    values.frombytes(bytes(data))
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def text_signature(text):
+    """Упакованная сигнатура текста или None, если в тексте нет слов"""
+    hashes = shingles(text)
+    return pack(minhash(hashes)) if hashes else None
+
+
+def estimate_similarity(left, right):
+    """Оценка похожести по Жаккару - доля совпавших значений сигнатур"""
+    return sum(x == y for x, y in zip(left, right)) / NUM_PERM
+
+
+def store_signatures(rows):
+    """Сохраняет сигнатуры ответов: rows - [(answer_id, source_post_id, text)].
+
+    Один INSERT ... ON CONFLICT на все ответы; у ответов без слов сигнатура удаляется.
+    """
+    signatures, empty = [], []
+    for answer_id, source_post_id, text in rows:
+        signature = text_signature(text)
+        if signature is None:
+            empty.append(answer_id)
+        else:
+            signatures.append(
+                AnswerSignatures(answer_id=answer_id, source_post_id=source_post_id, signature=signature)
+            )
+    if empty:
+        AnswerSignatures.objects.filter(answer_id__in=empty).delete()
+    AnswerSignatures.objects.bulk_create(
+        signatures, update_conflicts=True, unique_fields=["answer"],
+        update_fields=["source_post", "signature", "updated_at"],
+    )
+    return len(signatures)
+
+
+def is_text_question(post):
+    return post.is_question and post.question_type == QuestionTypes.TEXT
+
+
+def source_post_id(post):
+    return post.source_id or post.pk
+
+
+def rebuild_signatures(post_ids=None, chunk_size=1000):
+    """Пересчитывает сигнатуры всех текстовых ответов (или ответов на посты post_ids) пачками"""
+    selections = AnswerOptionsThrough.objects.filter(
+        text__isnull=False,
+        answer__task__post__post_type=PostTypes.QUESTION,
+        answer__task__post__question_type=QuestionTypes.TEXT,
+    )
+    if post_ids:
+        selections = selections.filter(answer__task__post_id__in=post_ids)
+    rows = selections.order_by("answer_id").values_list(
+        "answer_id", Coalesce(F("answer__task__post__source_id"), F("answer__task__post_id")), "text"
+    )
+
+    stored, chunk = 0, []
+    for row in rows.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            stored += store_signatures(chunk)
+            chunk = []
+    return stored + store_signatures(chunk)
+
+
+def candidate_pairs(signatures, sources=None):
+    """Пары ответов, у которых совпала хотя бы одна полоса: {answer_id: bytes} -> {(a, b)}.
+
+    Если задан sources, строятся только пары хотя бы с одним ответом из sources.
+    """
+    width = ROWS * array("I").itemsize
+    buckets = defaultdict(list)
+    for answer_id, data in signatures.items():
+        for band in range(BANDS):
+            buckets[band, data[band * width:(band + 1) * width]].append(answer_id)
+
+    pairs = set()
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        if sources is None:
+            pairs.update(combinations(sorted(members), 2))
+            continue
+        for left in sources.intersection(members):
+            pairs.update((min(left, right), max(left, right)) for right in members if right != left)
+    return pairs
+
+
+def similar_pairs(signatures, threshold, sources=None, limit=None):
+    """Кандидаты LSH, оценка похожести которых не ниже threshold: [(similarity, a, b)] по убыванию.
+
+    С limit лучшие пары отбираются кучей, без сортировки всех кандидатов.
+    """
+    unpacked = {}
+
+    def scored():
+        for left, right in candidate_pairs(signatures, sources):
+            for answer_id in (left, right):
+                if answer_id not in unpacked:
+                    unpacked[answer_id] = unpack(signatures[answer_id])
+            similarity = estimate_similarity(unpacked[left], unpacked[right])
+            if similarity >= threshold:
+                yield round(similarity, 4), left, right
+
+    def order(row):
+        return row[0], -row[1], -row[2]
+
+    if limit is None:
+        return sorted(scored(), key=order, reverse=True)
+    return heapq.nlargest(limit, scored(), key=order)
+
+
+def similar_answers(task, user, threshold=0.5, scope=SimilarityScopes.TASK, limit=100):
+    """Похожие ответы на задание.
+
+    scope=task сравнивает ответы внутри задания, scope=source - с ответами
+    на тот же вопрос (и его копии) во всех курсах, где user преподает.
+    Результат - [{"similarity", "answers"}] по убыванию похожести: сначала
+    кластеры одинаковых ответов с ответом на task (similarity 1.0), затем
+    пары кластеров, хотя бы один из которых содержит ответ на task.
+    """
+    queryset = AnswerSignatures.objects.all()
+    if scope == SimilarityScopes.TASK:
+        queryset = queryset.filter(answer__task=task)
+    else:
+        queryset = queryset.filter(source_post_id=source_post_id(task.post))
+        if not user.is_admin:
+            queryset = queryset.filter(answer__task__course__in=CourseMembers.objects.filter(
+                user=user, role__in=(MemberRoles.CREATOR, MemberRoles.TEACHER)
+            ).values("course_id"))
+
+    answers, clusters = {}, defaultdict(list)
+    rows = queryset.order_by("answer_id").values_list(
+        "answer_id", "answer__student_id", "answer__task_id", "answer__task__course_id", "signature"
+    )
+    for answer_id, student_id, task_id, course_id, signature in rows.iterator(chunk_size=2000):
+        answers[answer_id] = {"answer": answer_id, "student": student_id, "task": task_id, "course": course_id}
+        clusters[bytes(signature)].append(answer_id)
+
+    def result(similarity, *members):
+        return {"similarity": similarity, "answers": [answers[answer_id] for answer_id in sorted(members)]}
+
+    # Кластер представлен первым (наименьшим) ответом
+    signatures, members, own = {}, {}, set()
+    for signature, answer_ids in clusters.items():
+        signatures[answer_ids[0]] = signature
+        members[answer_ids[0]] = answer_ids
+        if any(answers[answer_id]["task"] == task.pk for answer_id in answer_ids):
+            own.add(answer_ids[0])
+
+    results = [result(1.0, *members[first]) for first in sorted(own) if len(members[first]) > 1][:limit]
+    if len(results) == limit:
+        return results
+    for similarity, left, right in similar_pairs(signatures, threshold, own, limit - len(results)):
+        results.append(result(similarity, *members[left], *members[right]))
+    return results
@@ -1,9 +1,37 @@
 # apps/course/tests.py
+import csv
+import json
+import random
+import string
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.validators import RegexValidator
+from django.db import DatabaseError, connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Courses
+from apps.utils import generate_random_strings
+from apps.enums import ConfigPermissions, DeletePermissions, MemberRoles, PostTypes, QuestionTypes, \
+    SubjectTypes, JobStatuses, TaskStatuses, GradingStrategies
+from .models import Courses, CourseMembers, CourseTeachersThrough, CourseStudentsThrough, \
+    CoursePostThrough, Posts, QuestionOptions, Themes, Comments, Answers, AnswerOptionsThrough, \
+    AnswerResetJobs, SearchEntries, AnswerSignatures
+from .fields import SymbolIdField
+from .scheduler import PostScheduler
+from .search import install_search_index, uninstall_search_index
+from .grading import auto_grade, bulk_grade
+from .gradebook import XLSX_SUPPORTED, get_gradebook
+from .item_analysis import get_item_analysis
+from .services import clone_course, submit_answer
+from .similarity import candidate_pairs, text_signature
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -16,7 +44,8 @@ class PaginationTestCase(APITestCase):
             first_name='Test',
             second_name='User', 
             last_name='Testov',
-            role_id=1  
+            role_id=1,
+            is_verified=True
         )
         self.user.set_password('testpass123')
         self.user.save()
@@ -28,11 +57,10 @@ class PaginationTestCase(APITestCase):
                 title=f'Test Course {i}',
                 description=f'Description {i}',
                 section='Math',
-                room='101',
+                room_number='101',
                 theme='Algebra',
                 creator=self.user,
                 inv_code=f'inv{i}',
-                course_id_base=f'course{i}',
                 config_permission=3,
                 delete_permission=0
             )
@@ -62,4 +90,1535 @@ class PaginationTestCase(APITestCase):
         
         self.assertEqual(response.data['count'], 25)
 
-# python manage.py test apps.course.tests.PaginationTestCase - запуск теста
\ No newline at end of file
+    def test_course_list_keyset_pagination(self):
+        """Keyset режим обходит все курсы без повторов и без OFFSET"""
+        url = reverse('courses-list')
+        response = self.client.get(url, {'pagination': 'cursor', 'page_size': 10, 'count': 'false'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+
+        seen = [course['id'] for course in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen += [course['id'] for course in response.data['results']]
+
+        expected = list(Courses.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_own_courses_keyset_pagination(self):
+        url = reverse('courses-get-own-courses')
+        response = self.client.get(url, {'pagination': 'cursor'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('courses-list'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+# python manage.py test apps.course.tests.PaginationTestCase - запуск теста
+
+class MemberRoleTestCase(TestCase):
+
+    def setUp(self):
+        self.creator = User.objects.create(email='creator@example.com', role_id=1, is_verified=True)
+        self.teacher = User.objects.create(email='teacher@example.com', role_id=1, is_verified=True)
+        self.student = User.objects.create(email='student@example.com', role_id=0, is_verified=True)
+        self.stranger = User.objects.create(email='stranger@example.com', role_id=0, is_verified=True)
+
+        self.course = Courses.objects.create(
+            title='Roles', creator=self.creator, delete_permission=DeletePermissions.ALL_TEACHERS,
+            config_permission=ConfigPermissions.TEACHERS_ONLY_PUBLISHED
+        )
+        CourseTeachersThrough(teacher=self.teacher, course=self.course).accept()
+        CourseStudentsThrough(student=self.student, course=self.course).accept()
+
+    def test_roles(self):
+        self.assertEqual(self.course.get_member_role(self.creator), MemberRoles.CREATOR)
+        self.assertEqual(self.course.get_member_role(self.teacher), MemberRoles.TEACHER)
+        self.assertEqual(self.course.get_member_role(self.student), MemberRoles.STUDENT)
+        self.assertIsNone(self.course.get_member_role(self.stranger))
+
+    def test_pending_invite_is_not_membership(self):
+        CourseStudentsThrough.objects.create(student=self.stranger, course=self.course)
+        self.assertFalse(self.course.has_user_on_course(self.stranger))
+
+    def test_permission_checks_share_one_query(self):
+        course = Courses.objects.get(pk=self.course.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(course.has_user_on_course(self.teacher))
+            self.assertTrue(course.can_user_delete(self.teacher))
+            self.assertTrue(course.can_user_comment(self.teacher))
+            self.assertTrue(course.can_user_publish(self.teacher))
+        self.assertFalse(course.can_user_publish(self.student))
+
+
+class CourseMembersTestCase(TestCase):
+
+    def setUp(self):
+        self.creator = User.objects.create(email='creator@example.com', role_id=1, is_verified=True)
+        self.student = User.objects.create(email='student@example.com', role_id=0, is_verified=True)
+        self.course = Courses.objects.create(title='Members', creator=self.creator)
+
+    def test_creator_is_member(self):
+        self.assertEqual(
+            CourseMembers.objects.get(course=self.course, user=self.creator).role, MemberRoles.CREATOR
+        )
+
+    def test_creator_role_is_not_downgraded(self):
+        invite = CourseTeachersThrough(teacher=self.creator, course=self.course)
+        invite.accept()
+        invite.reject()
+        self.assertEqual(
+            CourseMembers.objects.get(course=self.course, user=self.creator).role, MemberRoles.CREATOR
+        )
+
+    def test_invite_lifecycle(self):
+        invite = CourseStudentsThrough.objects.create(student=self.student, course=self.course)
+        self.assertFalse(CourseMembers.objects.filter(user=self.student).exists())
+
+        invite.accept()
+        self.assertTrue(
+            CourseMembers.objects.filter(user=self.student, role=MemberRoles.STUDENT).exists()
+        )
+
+        invite.reject()
+        self.assertFalse(CourseMembers.objects.filter(user=self.student).exists())
+
+        invite.accept()
+        invite.delete()
+        self.assertFalse(CourseMembers.objects.filter(user=self.student).exists())
+
+    def test_course_list_uses_membership(self):
+        CourseStudentsThrough(student=self.student, course=self.course).accept()
+        Courses.objects.create(title='Other', creator=self.creator)
+
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('courses-list'))
+        self.assertEqual([course['id'] for course in response.json()['results']], [self.course.pk])
+
+
+class CourseCountersTestCase(TestCase):
+
+    def setUp(self):
+        self.creator = User.objects.create(email='creator@example.com', role_id=1, is_verified=True)
+        self.students = [
+            User.objects.create(email=f'student{i}@example.com', role_id=0, is_verified=True) for i in range(3)
+        ]
+        self.course = Courses.objects.create(title='Counters', creator=self.creator)
+
+    def assertCounters(self, **expected):
+        self.course.refresh_from_db()
+        for name, value in expected.items():
+            self.assertEqual(getattr(self.course, name), value, name)
+
+    def test_invite_counters(self):
+        invites = [CourseStudentsThrough.objects.create(student=s, course=self.course) for s in self.students]
+        self.assertCounters(students_count=0, pending_invites_count=3)
+
+        invites[0].accept()
+        invites[1].reject()
+        self.assertCounters(students_count=1, pending_invites_count=1)
+
+        CourseStudentsThrough.objects.get(pk=invites[0].pk).delete()
+        self.assertCounters(students_count=0, pending_invites_count=1)
+
+    def test_post_counters(self):
+        post = Posts.objects.create(name='Material', post_type=PostTypes.MATERIAL, author=self.creator)
+        CoursePostThrough.objects.create(post=post, course=self.course)
+        self.assertCounters(posts_count=0)
+
+        post.is_published = True
+        post.save()
+        self.assertCounters(posts_count=1)
+
+        CoursePostThrough.objects.filter(post=post).delete()
+        self.assertCounters(posts_count=0)
+
+    def test_course_delete_does_not_update_per_member(self):
+        for student in self.students:
+            CourseStudentsThrough(student=student, course=self.course).accept()
+        CourseTeachersThrough.objects.create(teacher=self.creator, course=self.course)
+        small = Courses.objects.create(title='Small', creator=self.creator)
+        CourseTeachersThrough.objects.create(teacher=self.creator, course=small)
+        CourseStudentsThrough(student=self.students[0], course=small).accept()
+
+        with CaptureQueriesContext(connection) as few:
+            small.delete()
+        with self.assertNumQueries(len(few)):
+            self.course.delete()
+        self.assertFalse(CourseMembers.objects.exists())
+
+    def test_rebuild_counters(self):
+        CourseTeachersThrough(teacher=self.creator, course=self.course).accept()
+        for student in self.students:
+            CourseStudentsThrough.objects.create(student=student, course=self.course)
+        Courses.objects.update(teachers_count=0, pending_invites_count=0)
+
+        call_command('rebuild_course_counters', stdout=StringIO())
+        self.assertCounters(teachers_count=1, students_count=0, pending_invites_count=3)
+
+
+class RandomStringTestCase(TestCase):
+
+    def test_generate_random_strings(self):
+        values = generate_random_strings(500, 12, use_upper_case=False)
+        self.assertEqual(len(values), 500)
+        self.assertEqual(len(set(values)), 500)
+        alphabet = set(string.ascii_lowercase + string.digits)
+        self.assertTrue(all(len(value) == 12 and set(value) <= alphabet for value in values))
+
+    def test_all_characters_are_used(self):
+        value = ''.join(generate_random_strings(200, 50))
+        self.assertEqual(set(value), set(string.ascii_letters + string.digits))
+
+
+class SymbolIdFieldTestCase(TestCase):
+
+    def setUp(self):
+        self.creator = User.objects.create(email='creator@example.com', role_id=1, is_verified=True)
+
+    def test_ids_are_time_ordered(self):
+        field = Courses._meta.pk
+        ids = [field.generate_id() for _ in range(3)]
+        time.sleep(0.002)
+        later = field.generate_id()
+
+        self.assertTrue(all(len(value) == 16 for value in ids + [later]))
+        self.assertTrue(all(value[:8] <= later[:8] for value in ids))
+
+    def test_deconstruct_keeps_custom_validators(self):
+        custom = RegexValidator(r'^[0-9A-Za-z]+$')
+        _, _, _, kwargs = SymbolIdField(validators=[custom]).deconstruct()
+        self.assertEqual(kwargs['validators'], [custom])
+        self.assertEqual(len(SymbolIdField(**kwargs).validators), 3)
+        self.assertNotIn('validators', Courses._meta.pk.deconstruct()[3])
+
+    def test_insert_does_not_select(self):
+        course = Courses(title='No select', creator=self.creator)
+        self.assertTrue(course.pk)
+        with CaptureQueriesContext(connection) as queries:
+            Courses.objects.bulk_create([Courses(title=f'Bulk {i}', creator=self.creator) for i in range(3)])
+        self.assertFalse([q for q in queries if q['sql'].startswith('SELECT')])
+
+    def test_retry_on_collision(self):
+        existing = Courses.objects.create(title='Existing', creator=self.creator)
+        course = Courses(id=existing.pk, title='Duplicate', creator=self.creator)
+        course.save()
+        self.assertNotEqual(course.pk, existing.pk)
+        self.assertEqual(Courses.objects.count(), 2)
+
+
+class CourseRosterTestCase(APITestCase):
+
+    def setUp(self):
+        self.creator = User.objects.create(email='creator@example.com', role_id=1, is_verified=True)
+        self.course = Courses.objects.create(title='Roster', creator=self.creator)
+        CourseTeachersThrough(teacher=self.creator, course=self.course).accept()
+
+        self.students = []
+        for i in range(5):
+            student = User.objects.create(email=f'student{i}@example.com', role_id=0, is_verified=True)
+            invite = CourseStudentsThrough.objects.create(student=student, course=self.course)
+            if i < 3:
+                invite.accept()
+            self.students.append(student)
+
+        self.url = reverse('courses-roster', args=[self.course.pk])
+
+    def test_roster_returns_accepted_students(self):
+        self.client.force_authenticate(self.creator)
+        response = self.client.get(self.url, {'page_size': 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        emails = [row['email'] for row in response.data['results']]
+        response = self.client.get(response.data['next'])
+        emails += [row['email'] for row in response.data['results']]
+        self.assertEqual(emails, [s.email for s in self.students[:3]])
+
+    def test_pending_roster_is_for_teachers_only(self):
+        self.client.force_authenticate(self.students[0])
+        response = self.client.get(self.url, {'status': 'pending'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('email', response.data['results'][0])
+
+    def test_roster_ndjson_stream(self):
+        self.client.force_authenticate(self.creator)
+        response = self.client.get(self.url, {'role': 'teacher', 'stream': 'ndjson'})
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['email'] for line in lines], [self.creator.email])
+
+    def test_summary(self):
+        self.client.force_authenticate(self.creator)
+        response = self.client.get(reverse('courses-summary', args=[self.course.pk]))
+        self.assertEqual(response.data['students_count'], 3)
+        self.assertEqual(response.data['pending_invites_count'], 2)
+
+
+class EnrollmentTestCase(APITestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create(email='teacher@example.com', role_id=1, is_verified=True)
+        self.course = Courses.objects.create(title='Enrollment', creator=self.teacher)
+        self.students = [
+            User.objects.create(email=f'student{i}@example.com', role_id=0, is_verified=True) for i in range(4)
+        ]
+
+    def test_join_by_code(self):
+        self.client.force_authenticate(self.students[0])
+        url = reverse('courses-join')
+
+        response = self.client.post(url, {'code': self.course.inv_code})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(url, {'code': self.course.inv_code})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.course.get_member_role(self.students[0]), MemberRoles.STUDENT)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.students_count, 1)
+
+        response = self.client.post(url, {'code': 'missing0'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_enroll(self):
+        CourseStudentsThrough.objects.create(student=self.students[0], course=self.course)
+        self.client.force_authenticate(self.teacher)
+
+        emails = [s.email for s in self.students] + ['nobody@example.com', self.teacher.email]
+        with self.assertNumQueries(8):
+            response = self.client.post(
+                reverse('courses-enroll', args=[self.course.pk]),
+                {'emails': emails, 'accept': True}, format='json'
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(
+            [row['status'] for row in response.data['results']],
+            ['exists', 'created', 'created', 'created', 'not_found', 'invalid_role']
+        )
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.students_count, 3)
+        self.assertEqual(self.course.pending_invites_count, 1)
+        self.assertEqual(CourseMembers.objects.filter(course=self.course, role=MemberRoles.STUDENT).count(), 3)
+
+    def test_bulk_enroll_requires_course_teacher(self):
+        CourseStudentsThrough(student=self.students[0], course=self.course).accept()
+        self.client.force_authenticate(self.students[0])
+        response = self.client.post(
+            reverse('courses-enroll', args=[self.course.pk]), {'user_ids': [self.students[1].pk]}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class CourseCloneTestCase(APITestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create(email='teacher@example.com', role_id=1, is_verified=True)
+        self.course = Courses.objects.create(title='Source', creator=self.teacher, section='Math')
+        CourseTeachersThrough(teacher=self.teacher, course=self.course).accept()
+        self.client.force_authenticate(self.teacher)
+
+    def fill_course(self, size):
+        theme = Themes.objects.create(name=f'Theme {size}', course=self.course)
+        for i in range(size):
+            post = Posts.objects.create(
+                name=f'Question {i}', post_type=PostTypes.QUESTION, author=self.teacher, theme=theme,
+                max_score=10, question_type=QuestionTypes.ONE_CHOICE, is_published=True
+            )
+            QuestionOptions.objects.create(post=post, title='Right', is_right=True)
+            QuestionOptions.objects.create(post=post, title='Wrong', is_right=False)
+            CoursePostThrough.objects.create(post=post, course=self.course)
+
+    def clone(self, **data):
+        response = self.client.post(reverse('courses-clone', args=[self.course.pk]), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Courses.objects.get(pk=response.data['id'])
+
+    def test_clone_copies_structure(self):
+        self.fill_course(3)
+        new_course = self.clone(title='Next semester')
+
+        self.assertEqual(new_course.title, 'Next semester')
+        self.assertEqual(new_course.section, 'Math')
+        self.assertEqual(new_course.get_member_role(self.teacher), MemberRoles.CREATOR)
+
+        new_posts = Posts.objects.filter(courses=new_course)
+        self.assertEqual(new_posts.count(), 3)
+        self.assertFalse(new_posts.filter(courses=self.course).exists())
+        self.assertFalse(new_posts.filter(is_published=True).exists())
+        self.assertEqual(set(new_posts.values_list('theme__course', flat=True)), {new_course.pk})
+        self.assertEqual(QuestionOptions.objects.filter(post__courses=new_course, is_right=True).count(), 3)
+
+    def test_clone_with_shared_posts(self):
+        self.fill_course(2)
+        new_course = self.clone(share_posts=True)
+
+        self.assertEqual(
+            set(Posts.objects.filter(courses=new_course).values_list('id', flat=True)),
+            set(Posts.objects.filter(courses=self.course).values_list('id', flat=True)),
+        )
+        new_course.refresh_from_db()
+        self.assertEqual(new_course.posts_count, 2)
+
+    def test_clone_query_count_does_not_grow(self):
+        self.fill_course(1)
+        with CaptureQueriesContext(connection) as small:
+            self.clone()
+        self.fill_course(10)
+        with CaptureQueriesContext(connection) as large:
+            self.clone()
+        self.assertEqual(len(small), len(large))
+
+
+class RosterExportTestCase(APITestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create(email='teacher@example.com', role_id=1, is_verified=True)
+        self.course = Courses.objects.create(title='Export', creator=self.teacher)
+        CourseTeachersThrough(teacher=self.teacher, course=self.course).accept()
+        for i in range(3):
+            student = User.objects.create(email=f'student{i}@example.com', role_id=0, is_verified=True)
+            invite = CourseStudentsThrough.objects.create(student=student, course=self.course)
+            if i:
+                invite.accept()
+        self.url = reverse('courses-export-roster', args=[self.course.pk])
+
+    def test_csv_export(self):
+        self.client.force_authenticate(self.teacher)
+        response = self.client.get(self.url, {'role': 'student', 'status': 'accepted'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0][:4], ['course_id', 'role', 'user_id', 'email'])
+        self.assertEqual([row[3] for row in rows[1:]], ['student1@example.com', 'student2@example.com'])
+
+    def test_ndjson_export(self):
+        self.client.force_authenticate(self.teacher)
+        response = self.client.get(self.url, {'output': 'ndjson'})
+
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 4)
+        self.assertEqual({row['role'] for row in rows}, {'student', 'teacher'})
+
+    def test_export_command(self):
+        stdout = StringIO()
+        call_command('export_roster', '--course', self.course.pk, '--status', 'pending', stdout=stdout)
+        rows = list(csv.reader(stdout.getvalue().splitlines()))
+        self.assertEqual([row[3] for row in rows[1:]], ['student0@example.com'])
+
+
+class CourseFeedTestCase(APITestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create(email='teacher@example.com', role_id=1, is_verified=True)
+        self.student = User.objects.create(email='student@example.com', role_id=0, is_verified=True)
+        self.course = Courses.objects.create(title='Feed', creator=self.teacher)
+        CourseTeachersThrough(teacher=self.teacher, course=self.course).accept()
+        CourseStudentsThrough(student=self.student, course=self.course).accept()
+        self.theme = Themes.objects.create(name='Week 1', course=self.course)
+        self.url = reverse('courses-feed', args=[self.course.pk])
+
+    def add_posts(self, count, **kwargs):
+        for i in range(count):
+            post = Posts.objects.create(
+                name=f'Question {i}', post_type=PostTypes.QUESTION, author=self.teacher, theme=self.theme,
+                max_score=5, question_type=QuestionTypes.ONE_CHOICE, **kwargs
+            )
+            QuestionOptions.objects.create(post=post, title='Right', is_right=True)
+            task = CoursePostThrough.objects.create(post=post, course=self.course)
+            Comments.objects.create(
+                content='?', author=self.student, subject_type=SubjectTypes.COURSE_POST, subject_id=task.pk
+            )
+
+    def test_feed_for_teacher(self):
+        self.add_posts(3, is_published=True)
+        self.add_posts(1)
+        self.client.force_authenticate(self.teacher)
+
+        response = self.client.get(self.url, {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 4)
+        first = response.data['results'][0]
+        self.assertEqual(first['comments_count'], 1)
+        self.assertEqual(first['post']['theme']['name'], 'Week 1')
+        self.assertTrue(first['post']['question_options'][0]['is_right'])
+
+        response = self.client.get(self.url, {'published': 'false'})
+        self.assertEqual(response.data['count'], 1)
+
+    def test_feed_for_student(self):
+        self.add_posts(2, is_published=True)
+        self.add_posts(2)
+        self.client.force_authenticate(self.student)
+
+        response = self.client.get(self.url, {'published': 'false'})
+        self.assertEqual(response.data['count'], 2)
+        self.assertNotIn('is_right', response.data['results'][0]['post']['question_options'][0])
+
+    def test_feed_query_count_does_not_grow(self):
+        self.client.force_authenticate(self.teacher)
+        self.add_posts(1, is_published=True)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url)
+        self.add_posts(10, is_published=True)
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(self.url)
+        self.assertEqual(len(small), len(large))
+
+
+class AnswerResetJobTestCase(TestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create(email='teacher@example.com', role_id=1, is_verified=True)
+        self.course = Courses.objects.create(title='Reset', creator=self.teacher)
+        self.post = Posts.objects.create(
+            name='Question', post_type=PostTypes.QUESTION, author=self.teacher,
+            max_score=5, question_type=QuestionTypes.ONE_CHOICE
+        )
+        self.option = QuestionOptions.objects.create(post=self.post, title='Right', is_right=True)
+        self.task = CoursePostThrough.objects.create(post=self.post, course=self.course)
+
+        self.answers = []
+        for i in range(5):
+            student = User.objects.create(email=f'student{i}@example.com', role_id=0, is_verified=True)
+            answer = Answers.objects.create(student=student, task=self.task)
+            AnswerOptionsThrough.objects.create(answer=answer, option=self.option)
+            answer.grade(5)
+            self.answers.append(answer)
+
+    def test_incompatible_change_is_deferred(self):
+        self.post.question_type = QuestionTypes.TEXT
+        self.post.save()
+
+        job = self.post.answer_reset_job
+        self.assertEqual(job.status, JobStatuses.PENDING)
+        self.assertEqual(job.task_ids, [self.task.pk])
+        self.assertEqual(AnswerOptionsThrough.objects.count(), 5)
+
+        job.run(chunk_size=2)
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatuses.DONE)
+        self.assertEqual((job.processed, job.total, job.progress), (5, 5, 1.0))
+        self.assertFalse(AnswerOptionsThrough.objects.exists())
+        self.assertFalse(Answers.objects.exclude(status=TaskStatuses.RETURNED).exists())
+        self.assertFalse(Answers.objects.filter(score__isnull=False).exists())
+
+    def test_answers_touched_after_change_are_reset(self):
+        self.post.question_type = QuestionTypes.TEXT
+        self.post.save()
+        # Оценка после смены типа обновляет updated_at, но выборы остаются старыми
+        self.answers[0].grade(3)
+        Answers.objects.filter(pk=self.answers[1].pk).update(status=TaskStatuses.OVERDUE, updated_at=timezone.now())
+        resubmitted = self.answers[2]
+        AnswerOptionsThrough.objects.filter(answer=resubmitted).delete()
+        AnswerOptionsThrough.objects.create(answer=resubmitted, text='New answer')
+        Answers.objects.filter(pk=resubmitted.pk).update(status=TaskStatuses.SUBMITTED)
+
+        self.post.answer_reset_job.run(chunk_size=2)
+        self.assertEqual(list(AnswerOptionsThrough.objects.values_list('answer_id', flat=True)), [resubmitted.pk])
+        self.assertEqual(
+            list(Answers.objects.exclude(status=TaskStatuses.RETURNED).values_list('pk', flat=True)), [resubmitted.pk]
+        )
+
+    def test_ungraded_counters_follow_chunks(self):
+        other_task = CoursePostThrough.objects.create(
+            post=self.post, course=Courses.objects.create(title='Reset 2', creator=self.teacher)
+        )
+        for answer in self.answers[:3]:
+            Answers.objects.create(student=answer.student, task=other_task, status=TaskStatuses.SUBMITTED)
+        self.assertEqual(CoursePostThrough.objects.get(pk=other_task.pk).ungraded_count, 3)
+
+        self.post.question_type = QuestionTypes.TEXT
+        self.post.save()
+        self.post.answer_reset_job.run(chunk_size=2)
+        self.assertEqual(
+            list(CoursePostThrough.objects.filter(post=self.post).values_list('ungraded_count', flat=True)), [0, 0]
+        )
+
+    def test_compatible_change_keeps_answers(self):
+        self.post.question_type = QuestionTypes.MULTI_CHOICE
+        self.post.save()
+        self.assertFalse(AnswerResetJobs.objects.exists())
+
+    def test_command_processes_pending_jobs(self):
+        self.post.question_type = QuestionTypes.TEXT
+        self.post.save()
+        call_command('process_answer_reset_jobs', stdout=StringIO())
+        self.assertFalse(AnswerOptionsThrough.objects.exists())
+
+    def test_save_with_unvalidated_fields_skips_queries(self):
+        post = Posts.objects.get(pk=self.post.pk)
+        post.name = 'Renamed'
+        with self.assertNumQueries(1):
+            post.save(update_fields=['name'])
+
+
+class CrossPostTestCase(APITestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create(email='teacher@example.com', role_id=1, is_verified=True)
+        self.other = User.objects.create(email='other@example.com', role_id=1, is_verified=True)
+        self.courses = [Courses.objects.create(title=f'Course {i}', creator=self.teacher) for i in range(3)]
+        self.foreign = Courses.objects.create(title='Foreign', creator=self.other)
+
+        for i, course in enumerate(self.courses):
+            student = User.objects.create(email=f'student{i}@example.com', role_id=0, is_verified=True)
+            CourseStudentsThrough(student=student, course=course).accept()
+
+        self.post = Posts.objects.create(
+            name='Exercise', post_type=PostTypes.EXERCISE, author=self.teacher, max_score=10, is_published=True
+        )
+        CoursePostThrough.objects.create(post=self.post, course=self.courses[0])
+        self.url = reverse('posts-cross-post', args=[self.post.pk])
+        self.client.force_authenticate(self.teacher)
+
+    def test_cross_post(self):
+        course_ids = [course.pk for course in self.courses]
+        response = self.client.post(self.url, {'courses': course_ids, 'create_answers': True}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], course_ids[1:])
+        self.assertEqual(response.data['skipped'], course_ids[:1])
+        self.assertEqual(response.data['answers_created'], 2)
+        self.assertEqual(CoursePostThrough.objects.filter(post=self.post).count(), 3)
+        self.assertEqual(list(Courses.objects.filter(pk__in=course_ids).values_list('posts_count', flat=True)), [1, 1, 1])
+
+    def test_cross_post_resets_gradebooks(self):
+        cache.clear()
+        self.assertEqual(get_gradebook(self.courses[1].pk)['tasks']['id'], [])
+        response = self.client.post(self.url, {'courses': [self.courses[1].pk]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(get_gradebook(self.courses[1].pk)['tasks']['id']), 1)
+
+    def test_cross_post_checks_all_courses(self):
+        response = self.client.post(
+            self.url, {'courses': [self.courses[1].pk, self.foreign.pk, 'missing']}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.data['denied'], [self.foreign.pk])
+        self.assertEqual(response.data['not_found'], ['missing'])
+        self.assertEqual(CoursePostThrough.objects.filter(post=self.post).count(), 1)
+
+
+class PostSchedulerTestCase(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.teacher = User.objects.create(email='teacher@example.com', role_id=1, is_verified=True)
+        self.student = User.objects.create(email='student@example.com', role_id=0, is_verified=True)
+        self.course = Courses.objects.create(title='Scheduled', creator=self.teacher)
+
+    def make_scheduler(self, offset=timedelta()):
+        return PostScheduler(horizon=timedelta(hours=1), clock=lambda: self.now + offset)
+
+    def test_publishes_due_posts(self):
+        post = Posts.objects.create(
+            name='Later', post_type=PostTypes.MATERIAL, author=self.teacher, publish_at=self.now + timedelta(minutes=10)
+        )
+        CoursePostThrough.objects.create(post=post, course=self.course)
+
+        scheduler = self.make_scheduler()
+        scheduler.load()
+        self.assertEqual(scheduler.next_event_at(), post.publish_at)
+        self.assertEqual(scheduler.run_pending(), (0, 0))
+
+        scheduler.clock = lambda: self.now + timedelta(minutes=11)
+        self.assertEqual(scheduler.run_pending(), (1, 0))
+        post.refresh_from_db()
+        self.course.refresh_from_db()
+        self.assertTrue(post.is_published)
+        self.assertEqual(self.course.posts_count, 1)
+        self.assertEqual(len(scheduler), 0)
+
+    def test_unpublished_post_stays_unpublished(self):
+        post = Posts.objects.create(
+            name='Due', post_type=PostTypes.MATERIAL, author=self.teacher, publish_at=self.now - timedelta(minutes=1)
+        )
+        scheduler = self.make_scheduler()
+        scheduler.load()
+        self.assertEqual(scheduler.run_pending(), (1, 0))
+
+        post.refresh_from_db()
+        self.assertIsNone(post.publish_at)
+        post.is_published = False
+        post.save()
+        scheduler.load()
+        self.assertEqual(scheduler.run_pending(), (0, 0))
+        post.refresh_from_db()
+        self.assertFalse(post.is_published)
+
+    def test_marks_overdue_after_restart(self):
+        post = Posts.objects.create(
+            name='Exercise', post_type=PostTypes.EXERCISE, author=self.teacher, max_score=5,
+            is_published=True, deadline=self.now - timedelta(minutes=5)
+        )
+        task = CoursePostThrough.objects.create(post=post, course=self.course)
+        pending = Answers.objects.create(student=self.student, task=task)
+        graded = Answers.objects.create(
+            student=User.objects.create(email='done@example.com', role_id=0, is_verified=True),
+            task=task, status=TaskStatuses.GRADED
+        )
+
+        # Пропущенный за время простоя дедлайн выполняется сразу после загрузки
+        scheduler = self.make_scheduler()
+        scheduler.load()
+        scheduler.load()
+        self.assertEqual(len(scheduler), 1)
+        self.assertEqual(scheduler.run_pending(), (0, 1))
+
+        pending.refresh_from_db()
+        graded.refresh_from_db()
+        self.assertEqual(pending.status, TaskStatuses.OVERDUE)
+        self.assertEqual(graded.status, TaskStatuses.GRADED)
+
+        scheduler.load()
+        self.assertEqual(len(scheduler), 0)
+
+    def test_rescheduled_post_is_not_published_early(self):
+        post = Posts.objects.create(name='Moved', post_type=PostTypes.MATERIAL, author=self.teacher, publish_at=self.now + timedelta(minutes=1))
+        scheduler = self.make_scheduler(timedelta(minutes=2))
+        scheduler.load()
+
+        Posts.objects.filter(pk=post.pk).update(publish_at=self.now + timedelta(days=1))
+        self.assertEqual(scheduler.run_pending(), (0, 0))
+
+    def test_run_forever_survives_failed_iteration(self):
+        Posts.objects.create(
+            name='Due', post_type=PostTypes.MATERIAL, author=self.teacher, publish_at=self.now - timedelta(minutes=1)
+        )
+        scheduler = self.make_scheduler()
+        load, calls = scheduler.load, []
+
+        def flaky_load():
+            calls.append(1)
+            if len(calls) == 1:
+                raise DatabaseError('connection lost')
+            load()
+
+        def sleep(wait):
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+
+        scheduler.load = flaky_load
+        with self.assertLogs('apps.course.scheduler', 'ERROR'), self.assertRaises(KeyboardInterrupt):
+            scheduler.run_forever(sleep=sleep)
+        self.assertTrue(Posts.objects.get(name='Due').is_published)
+
+    def test_command_once(self):
+        Posts.objects.create(name='Due', post_type=PostTypes.MATERIAL, author=self.teacher, publish_at=self.now - timedelta(minutes=1))
+        out = StringIO()
+        call_command('run_scheduler', '--once', stdout=out)
+        self.assertIn('Published 1 post(s)', out.getvalue())
+
+
+class SearchTestCase(APITestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create(email='teacher@example.com', role_id=1, is_verified=True)
+        self.student = User.objects.create(email='student@example.com', role_id=0, is_verified=True)
+        self.course = Courses.objects.create(title='Linear algebra', section='Matrices', creator=self.teacher)
+        self.foreign = Courses.objects.create(title='Algebra for others', creator=self.teacher)
+        CourseStudentsThrough(student=self.student, course=self.course).accept()
+
+        self.post = Posts.objects.create(
+            name='Eigenvalues', description='Find the eigenvalues of a symmetric matrix',
+            post_type=PostTypes.MATERIAL, author=self.teacher, is_published=True
+        )
+        self.draft = Posts.objects.create(
+            name='Draft eigenvalues quiz', post_type=PostTypes.MATERIAL, author=self.teacher
+        )
+        self.task = CoursePostThrough.objects.create(post=self.post, course=self.course)
+        CoursePostThrough.objects.create(post=self.draft, course=self.course)
+        self.comment = Comments.objects.create(
+            content='Is the matrix always diagonalizable?', author=self.student,
+            subject_type=SubjectTypes.COURSE_POST, subject_id=self.task.pk
+        )
+        self.url = reverse('courses-search')
+
+    def search(self, user, **params):
+        self.client.force_authenticate(user)
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(row['kind'], row['object_id']) for row in response.data['results']]
+
+    def test_search_is_scoped_to_member_courses(self):
+        self.assertEqual(self.search(self.student, q='algebra'), [('course', self.course.pk)])
+        self.assertEqual(len(self.search(self.teacher, q='algebra')), 2)
+
+    def test_students_do_not_see_drafts(self):
+        self.assertEqual(self.search(self.student, q='eigen'), [('post', self.post.pk)])
+        self.assertEqual(len(self.search(self.teacher, q='eigen')), 2)
+
+        Posts.objects.filter(pk=self.draft.pk).update(is_published=True)
+        self.assertEqual(len(self.search(self.student, q='eigen')), 2)
+
+    def test_index_follows_changes(self):
+        self.assertEqual(
+            self.search(self.student, q='diagonalizable', kind='comment'), [('comment', str(self.comment.pk))]
+        )
+        self.comment.content = 'Never mind'
+        self.comment.save()
+        self.assertEqual(self.search(self.student, q='diagonalizable'), [])
+
+        self.post.name = 'Determinants'
+        self.post.save()
+        self.assertEqual(self.search(self.student, q='determinants'), [('post', self.post.pk)])
+
+        self.task.delete()
+        self.assertEqual(self.search(self.student, q='determinants'), [])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(self.search(self.student, q='"matrix" OR NEAR('), [])
+        self.assertEqual(self.search(self.student, q='***'), [])
+
+    def test_new_index_is_filled_on_install(self):
+        # Так индекс создается после migrate (post_migrate) на базе с данными
+        uninstall_search_index()
+        self.assertTrue(install_search_index())
+        self.assertFalse(install_search_index())
+        self.assertEqual(len(self.search(self.teacher, q='eigenvalues')), 2)
+
+    def test_rebuild_command(self):
+        SearchEntries.objects.all().delete()
+        call_command('rebuild_search_index', '--chunk-size', '1', stdout=StringIO())
+        self.assertEqual(SearchEntries.objects.count(), 5)
+        self.assertEqual(len(self.search(self.teacher, q='eigenvalues')), 2)
+
+
+class AutoGradeTestCase(APITestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create(email='teacher@example.com', role_id=1, is_verified=True)
+        self.course = Courses.objects.create(title='Quiz', creator=self.teacher)
+        self.post = Posts.objects.create(
+            name='Primes', post_type=PostTypes.QUESTION, author=self.teacher,
+            max_score=10, question_type=QuestionTypes.MULTI_CHOICE
+        )
+        self.options = [
+            QuestionOptions.objects.create(post=self.post, title=title, is_right=is_right)
+            for title, is_right in [('2', True), ('3', True), ('4', False), ('9', False)]
+        ]
+        self.task = CoursePostThrough.objects.create(post=self.post, course=self.course)
+        self.url = reverse('tasks-auto-grade', args=[self.task.pk])
+
+    def add_answers(self, selections, status=TaskStatuses.SUBMITTED):
+        students = User.objects.bulk_create([
+            User(email=f'student{i}@example.com', role_id=0, is_verified=True) for i in range(len(selections))
+        ])
+        answers = Answers.objects.bulk_create([
+            Answers(student=student, task=self.task, status=status) for student in students
+        ])
+        AnswerOptionsThrough.objects.bulk_create([
+            AnswerOptionsThrough(answer=answer, option=self.options[index])
+            for answer, indexes in zip(answers, selections) for index in indexes
+        ])
+        return answers
+
+    def test_strategies(self):
+        answers = self.add_answers([(0, 1), (0,), (0, 2), (0, 1, 2, 3), ()])
+        expected = {
+            GradingStrategies.ALL_OR_NOTHING: [10, 0, 0, 0, 0],
+            GradingStrategies.PARTIAL: [10, 5, 0, 0, 0],
+            GradingStrategies.PER_OPTION: [10, 8, 5, 5, 5],
+        }
+        for strategy, scores in expected.items():
+            result = auto_grade(self.task, strategy=strategy, statuses=[TaskStatuses.SUBMITTED, TaskStatuses.GRADED])
+            self.assertEqual([result[answer.pk] for answer in answers], scores, strategy)
+
+        self.assertFalse(Answers.objects.exclude(status=TaskStatuses.GRADED).exists())
+
+    def test_endpoint(self):
+        self.add_answers([(0, 1), (2,)])
+        self.client.force_authenticate(self.teacher)
+
+        response = self.client.post(self.url, {'strategy': 'partial'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['graded'], 2)
+        self.assertEqual(sorted(Answers.objects.values_list('score', flat=True)), [0, 10])
+
+        response = self.client.post(self.url, {}, format='json')
+        self.assertEqual(response.data['graded'], 0)
+
+    def test_endpoint_requires_course_teacher(self):
+        other = User.objects.create(email='other@example.com', role_id=1, is_verified=True)
+        self.client.force_authenticate(other)
+        response = self.client.post(self.url, {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_grades_thousands_of_answers_quickly(self):
+        self.add_answers([(i % 4, (i + 1) % 4) for i in range(5000)])
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            scores = auto_grade(self.task, strategy=GradingStrategies.PARTIAL)
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertEqual(len(scores), 5000)
+        self.assertLess(len(queries), 20)
+
+
+class BulkGradeTestCase(APITestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create(email='teacher@example.com', role_id=1, is_verified=True)
+        self.course = Courses.objects.create(title='Essays', creator=self.teacher)
+        self.post = Posts.objects.create(
+            name='Essay', post_type=PostTypes.EXERCISE, author=self.teacher, max_score=10
+        )
+        self.task = CoursePostThrough.objects.create(post=self.post, course=self.course)
+        self.students = User.objects.bulk_create([
+            User(email=f'student{i}@example.com', role_id=0, is_verified=True) for i in range(50)
+        ])
+        Answers.objects.bulk_create([
+            Answers(student=student, task=self.task, status=TaskStatuses.SUBMITTED) for student in self.students[:-1]
+        ])
+        self.url = reverse('tasks-grade', args=[self.task.pk])
+        self.client.force_authenticate(self.teacher)
+
+    def test_bulk_grade(self):
+        grades = [{'student': student.pk, 'score': i % 10} for i, student in enumerate(self.students)]
+        grades.append({'student': self.students[0].pk, 'score': 11})
+
+        response = self.client.post(self.url, {'grades': grades}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['graded'], 48)
+        statuses = {row['student']: row['status'] for row in response.data['results']}
+        self.assertEqual(statuses[self.students[0].pk], 'invalid_score')
+        self.assertEqual(statuses[self.students[-1].pk], 'not_found')
+
+        answer = Answers.objects.get(task=self.task, student=self.students[3])
+        self.assertEqual((answer.score, answer.status), (3, TaskStatuses.GRADED))
+        self.assertIsNotNone(answer.graded_at)
+
+    def test_query_count_does_not_grow(self):
+        grades = [{'student': student.pk, 'score': 5} for student in self.students]
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url, {'grades': grades[:2]}, format='json')
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(self.url, {'grades': grades}, format='json')
+        self.assertEqual(len(small), len(large))
+
+    def test_rejects_negative_scores(self):
+        response = self.client.post(self.url, {'grades': [{'student': 1, 'score': -1}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class GradebookTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create(email='teacher@example.com', role_id=1, is_verified=True)
+        self.course = Courses.objects.create(title='Gradebook', creator=self.teacher)
+        self.students = []
+        for i in range(3):
+            student = User.objects.create(
+                email=f'student{i}@example.com', first_name=f'S{i}', last_name=f'L{i}', role_id=0, is_verified=True
+            )
+            CourseStudentsThrough(student=student, course=self.course).accept()
+            self.students.append(student)
+
+        self.tasks = []
+        for i in range(2):
+            post = Posts.objects.create(
+                name=f'Exercise {i}', post_type=PostTypes.EXERCISE, author=self.teacher, max_score=10
+            )
+            self.tasks.append(CoursePostThrough.objects.create(post=post, course=self.course))
+        material = Posts.objects.create(name='Notes', post_type=PostTypes.MATERIAL, author=self.teacher)
+        CoursePostThrough.objects.create(post=material, course=self.course)
+
+        self.url = reverse('courses-gradebook', args=[self.course.pk])
+        self.client.force_authenticate(self.teacher)
+
+    def answer(self, student, task, score=None):
+        answer = Answers.objects.create(student=student, task=task)
+        if score is None:
+            answer.submit()
+        else:
+            answer.grade(score)
+        return answer
+
+    def test_gradebook(self):
+        self.answer(self.students[0], self.tasks[0], 10)
+        self.answer(self.students[1], self.tasks[0], 6)
+        self.answer(self.students[0], self.tasks[1])
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
+        self.assertEqual(data['students']['id'], [student.pk for student in self.students])
+        self.assertEqual(data['tasks']['id'], [task.pk for task in self.tasks])
+        self.assertEqual(data['scores'], [[10, None], [6, None], [None, None]])
+        self.assertEqual(data['student_totals'], [10, 6, 0])
+        self.assertEqual(data['task_averages'], [8.0, None])
+        self.assertEqual(data['completion_rates'], [0.6667, 0.3333])
+
+    def test_cache_is_invalidated(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            get_gradebook(self.course.pk)
+
+        answer = self.answer(self.students[2], self.tasks[1], 4)
+        self.assertEqual(get_gradebook(self.course.pk)['scores'][2], [None, 4])
+
+        bulk_grade(self.tasks[1], [(self.students[2].pk, 7)])
+        self.assertEqual(get_gradebook(self.course.pk)['scores'][2], [None, 7])
+
+        answer.delete()
+        self.assertEqual(get_gradebook(self.course.pk)['scores'][2], [None, None])
+        CourseStudentsThrough.objects.get(student=self.students[2]).delete()
+        self.assertEqual(len(get_gradebook(self.course.pk)['scores']), 2)
+
+    def test_students_cannot_see_gradebook(self):
+        self.client.force_authenticate(self.students[0])
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class GradebookExportTestCase(APITestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create(email='teacher@example.com', role_id=1, is_verified=True)
+        self.course = Courses.objects.create(title='Export', creator=self.teacher)
+        self.post = Posts.objects.create(name='Essay', post_type=PostTypes.EXERCISE, author=self.teacher, max_score=10)
+        self.task = CoursePostThrough.objects.create(post=self.post, course=self.course)
+        self.other = CoursePostThrough.objects.create(
+            post=Posts.objects.create(name='Lab', post_type=PostTypes.EXERCISE, author=self.teacher, max_score=5),
+            course=self.course
+        )
+
+        students = User.objects.bulk_create([
+            User(email=f'student{i}@example.com', first_name=f'S{i}', role_id=0, is_verified=True) for i in range(30)
+        ])
+        for student in students:
+            CourseStudentsThrough(student=student, course=self.course).accept()
+        Answers.objects.bulk_create([
+            Answers(student=student, task=self.task, score=i % 11, status=TaskStatuses.GRADED)
+            for i, student in enumerate(students) if i % 3
+        ])
+        Answers.objects.bulk_create([
+            Answers(student=student, task=self.other, score=5, status=TaskStatuses.GRADED) for student in students[:5]
+        ])
+        self.students = students
+        self.url = reverse('courses-export-gradebook', args=[self.course.pk])
+        self.client.force_authenticate(self.teacher)
+
+    def test_csv_export(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = list(csv.reader(StringIO(b''.join(response.streaming_content).decode())))
+
+        self.assertEqual(
+            rows[0], ['student_id', 'email', 'first_name', 'second_name', 'last_name', 'Essay', 'Lab', 'total']
+        )
+        self.assertEqual(len(rows), 31)
+        by_student = {row[1]: row for row in rows[1:]}
+        self.assertEqual(by_student['student0@example.com'][5:], ['', '5', '5'])
+        self.assertEqual(by_student['student4@example.com'][5:], ['4', '5', '9'])
+        self.assertEqual(by_student['student7@example.com'][5:], ['7', '', '7'])
+
+    @skipUnless(XLSX_SUPPORTED, "openpyxl is not installed")
+    def test_xlsx_export(self):
+        from openpyxl import load_workbook
+
+        response = self.client.get(self.url, {'output': 'xlsx'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        workbook = load_workbook(BytesIO(b''.join(response.streaming_content)), read_only=True)
+        rows = list(workbook.active.iter_rows(values_only=True))
+        self.assertEqual(len(rows), 31)
+        self.assertEqual(rows[0][-1], 'total')
+
+
+class CourseFixtureMixin:
+    """Преподаватель teacher@example.com, его курс и принятые в курс студенты"""
+
+    def create_course(self, title, students=0, **fields):
+        self.teacher = User.objects.create(email='teacher@example.com', role_id=1, is_verified=True)
+        self.course = Courses.objects.create(title=title, creator=self.teacher, **fields)
+        self.students = [self.enroll(f'student{i}@example.com') for i in range(students)]
+        return self.course
+
+    def enroll(self, email, course=None, **fields):
+        student = User.objects.create(email=email, role_id=0, is_verified=True, **fields)
+        CourseStudentsThrough(student=student, course=course or self.course).accept()
+        return student
+
+
+class SubmitAnswerTestCase(CourseFixtureMixin, APITestCase):
+
+    def setUp(self):
+        self.create_course('Submit')
+        self.student = self.enroll('student@example.com')
+        self.client.force_authenticate(self.student)
+
+    def make_task(self, question_type=QuestionTypes.MULTI_CHOICE, options=4, **kwargs):
+        post = Posts.objects.create(
+            name='Question', post_type=PostTypes.QUESTION, author=self.teacher, max_score=5,
+            question_type=question_type, is_published=True, **kwargs
+        )
+        self.options = [
+            QuestionOptions.objects.create(post=post, title=str(i), is_right=i == 0) for i in range(options)
+        ]
+        task = CoursePostThrough.objects.create(post=post, course=self.course)
+        return reverse('tasks-submit', args=[task.pk])
+
+    def test_submit_multi_choice(self):
+        url = self.make_task(can_change=True)
+        option_ids = [option.pk for option in self.options]
+
+        response = self.client.post(url, {'options': option_ids[:3]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['status'], response.data['attempts']), (TaskStatuses.SUBMITTED, 1))
+
+        response = self.client.post(url, {'options': option_ids[2:]}, format='json')
+        self.assertEqual(response.data['attempts'], 2)
+        self.assertEqual(
+            sorted(AnswerOptionsThrough.objects.values_list('option_id', flat=True)), option_ids[2:]
+        )
+
+    def test_query_count_does_not_depend_on_selection(self):
+        url = self.make_task(options=20)
+        option_ids = [option.pk for option in self.options]
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(url, {'options': option_ids[:1]}, format='json')
+
+        url = self.make_task(options=20)
+        option_ids = [option.pk for option in self.options]
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(url, {'options': option_ids}, format='json')
+        self.assertEqual(len(small), len(large))
+
+    def test_validation(self):
+        url = self.make_task(QuestionTypes.ONE_CHOICE)
+        option_ids = [option.pk for option in self.options]
+
+        for payload in [{'options': option_ids[:2]}, {'options': [0]}, {'text': 'free text'}, {}]:
+            response = self.client.post(url, payload, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, payload)
+        self.assertFalse(Answers.objects.exists())
+
+        self.client.post(url, {'options': option_ids[:1]}, format='json')
+        response = self.client.post(url, {'options': option_ids[1:2]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_text_answer(self):
+        url = self.make_task(QuestionTypes.TEXT, options=0)
+        response = self.client.post(url, {'text': 'Forty two'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(AnswerOptionsThrough.objects.get().text, 'Forty two')
+
+    def test_only_students_of_course_can_submit(self):
+        url = self.make_task()
+        self.client.force_authenticate(self.teacher)
+        response = self.client.post(url, {'options': [self.options[0].pk]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class OptionVotesTestCase(CourseFixtureMixin, APITestCase):
+
+    def setUp(self):
+        self.create_course('Poll', students=3)
+        self.poll = Posts.objects.create(
+            name='Lunch', post_type=PostTypes.QUIZ, author=self.teacher, is_published=True, can_change=True
+        )
+        self.options = [QuestionOptions.objects.create(post=self.poll, title=title) for title in ('Soup', 'Salad')]
+        self.task = CoursePostThrough.objects.create(post=self.poll, course=self.course)
+        self.submit_url = reverse('tasks-submit', args=[self.task.pk])
+        self.results_url = reverse('posts-results', args=[self.poll.pk])
+
+    def vote(self, student, *options):
+        self.client.force_authenticate(student)
+        response = self.client.post(self.submit_url, {'options': [option.pk for option in options]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def votes(self):
+        return list(QuestionOptions.objects.filter(post=self.poll).order_by('id').values_list('votes_count', flat=True))
+
+    def test_counters_follow_votes(self):
+        soup, salad = self.options
+        self.vote(self.students[0], soup)
+        self.vote(self.students[1], soup, salad)
+        self.vote(self.students[2], salad)
+        self.assertEqual(self.votes(), [2, 2])
+
+        self.vote(self.students[1], salad)
+        self.assertEqual(self.votes(), [1, 2])
+
+        Answers.objects.get(student=self.students[2]).delete()
+        self.assertEqual(self.votes(), [1, 1])
+
+    def test_task_delete_does_not_update_per_selection(self):
+        other_course = Courses.objects.create(title='Poll 2', creator=self.teacher)
+        other_task = CoursePostThrough.objects.create(post=self.poll, course=other_course)
+        self.vote(self.students[0], *self.options)
+        for student in self.students:
+            CourseStudentsThrough(student=student, course=other_course).accept()
+            self.client.force_authenticate(student)
+            self.client.post(
+                reverse('tasks-submit', args=[other_task.pk]), {'options': [self.options[0].pk]}, format='json'
+            )
+        self.assertEqual(self.votes(), [4, 1])
+
+        with CaptureQueriesContext(connection) as few:
+            self.task.delete()
+        self.assertEqual(self.votes(), [3, 0])
+        with CaptureQueriesContext(connection) as many:
+            other_task.delete()
+        self.assertEqual(self.votes(), [0, 0])
+        self.assertEqual(len(few), len(many))
+
+    def test_results_read_only_counters(self):
+        self.vote(self.students[0], self.options[1])
+        with self.assertNumQueries(3):
+            response = self.client.get(self.results_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_votes'], 1)
+        self.assertEqual([option['votes'] for option in response.data['options']], [0, 1])
+
+    def test_results_require_membership(self):
+        outsider = User.objects.create(email='outsider@example.com', role_id=0, is_verified=True)
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.client.get(self.results_url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_reconcile_command(self):
+        self.vote(self.students[0], self.options[0])
+        QuestionOptions.objects.update(votes_count=10)
+        call_command('reconcile_option_votes', stdout=StringIO())
+        self.assertEqual(self.votes(), [1, 0])
+
+
+class ItemAnalysisTestCase(CourseFixtureMixin, APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.create_course('Analysis', students=4)
+
+        question = Posts.objects.create(
+            name='Question', post_type=PostTypes.QUESTION, author=self.teacher, max_score=5,
+            question_type=QuestionTypes.MULTI_CHOICE, is_published=True, can_change=True
+        )
+        self.options = [
+            QuestionOptions.objects.create(post=question, title=str(i), is_right=i == 0) for i in range(3)
+        ]
+        self.question = CoursePostThrough.objects.create(post=question, course=self.course)
+        exercise = Posts.objects.create(
+            name='Exercise', post_type=PostTypes.EXERCISE, author=self.teacher, max_score=10
+        )
+        self.exercise = CoursePostThrough.objects.create(post=exercise, course=self.course)
+
+        for student, option, score, rest in zip(self.students, (0, 0, 1, 1), (5, 5, 0, 0), (10, 8, 2, 4)):
+            submit_answer(self.question, student, [self.options[option].pk], '')
+            Answers.objects.create(student=student, task=self.exercise).grade(rest)
+        bulk_grade(self.question, [(student.pk, score) for student, score in zip(self.students, (5, 5, 0, 0))])
+
+        self.url = reverse('courses-item-analysis', args=[self.course.pk])
+        self.client.force_authenticate(self.teacher)
+
+    def test_item_analysis(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        [item] = response.data['results']
+        self.assertEqual((item['answered'], item['graded']), (4, 4))
+        self.assertEqual(item['difficulty'], 0.5)
+        self.assertEqual(item['discrimination'], 0.9487)
+        self.assertEqual([option['selection_rate'] for option in item['options']], [0.5, 0.5, 0.0])
+
+    def test_cache_is_invalidated(self):
+        get_item_analysis(self.course.pk)
+        with self.assertNumQueries(1):
+            get_item_analysis(self.course.pk)
+
+        submit_answer(self.question, self.students[3], [self.options[0].pk], '')
+        [item] = get_item_analysis(self.course.pk)
+        self.assertEqual((item['graded'], item['options'][0]['selection_rate']), (3, 0.75))
+
+        bulk_grade(self.question, [(self.students[3].pk, 5)])
+        self.assertEqual(get_item_analysis(self.course.pk)[0]['difficulty'], 0.75)
+
+    def test_post_linked_twice_has_separate_items(self):
+        again = CoursePostThrough.objects.create(post=self.question.post, course=self.course)
+        submit_answer(again, self.students[0], [self.options[1].pk], '')
+
+        first, second = get_item_analysis(self.course.pk)
+        self.assertEqual((first['task'], first['answered']), (self.question.pk, 4))
+        self.assertEqual((second['task'], second['answered']), (again.pk, 1))
+
+    def test_exercise_grades_invalidate_discrimination(self):
+        self.assertEqual(get_item_analysis(self.course.pk)[0]['discrimination'], 0.9487)
+        bulk_grade(self.exercise, [(student.pk, score) for student, score in zip(self.students, (2, 4, 10, 8))])
+        self.assertEqual(get_item_analysis(self.course.pk)[0]['discrimination'], -0.9487)
+
+        Answers.objects.get(student=self.students[0], task=self.exercise).grade(10)
+        self.assertEqual(get_item_analysis(self.course.pk)[0]['discrimination'], -0.4082)
+
+    def test_students_cannot_see_item_analysis(self):
+        self.client.force_authenticate(self.students[0])
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class AnswerSimilarityTestCase(CourseFixtureMixin, APITestCase):
+    ESSAY = (
+        'The french revolution began in 1789 when the estates general met at versailles and the third '
+        'estate declared itself a national assembly that demanded a constitution for the kingdom'
+    )
+
+    def setUp(self):
+        self.create_course('History', students=3)
+        self.post = Posts.objects.create(
+            name='Essay', post_type=PostTypes.QUESTION, author=self.teacher, max_score=10,
+            question_type=QuestionTypes.TEXT, is_published=True, can_change=True
+        )
+        self.task = CoursePostThrough.objects.create(post=self.post, course=self.course)
+
+        self.answers = [
+            submit_answer(self.task, self.students[0], text=self.ESSAY),
+            submit_answer(self.task, self.students[1], text=self.ESSAY.replace('1789', 'seventeen eighty nine')),
+            submit_answer(self.task, self.students[2], text='Photosynthesis converts light into chemical energy'),
+        ]
+        self.client.force_authenticate(self.teacher)
+
+    def similar(self, task, **params):
+        response = self.client.get(reverse('tasks-similar', args=[task.pk]), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [
+            (pair['similarity'], [answer['answer'] for answer in pair['answers']])
+            for pair in response.data['results']
+        ]
+
+    def test_finds_near_duplicates(self):
+        [(similarity, answer_ids)] = self.similar(self.task)
+        self.assertGreater(similarity, 0.6)
+        self.assertEqual(answer_ids, [self.answers[0].pk, self.answers[1].pk])
+        self.assertEqual(AnswerSignatures.objects.count(), 3)
+
+    def test_resubmission_updates_signature(self):
+        submit_answer(self.task, self.students[2], text=self.ESSAY)
+        pairs = self.similar(self.task, threshold=0.99)
+        self.assertEqual(pairs, [(1.0, [self.answers[0].pk, self.answers[2].pk])])
+        self.assertEqual(AnswerSignatures.objects.count(), 3)
+
+    def test_source_scope_covers_cloned_courses(self):
+        new_course = clone_course(self.course, self.teacher, title='Next semester')
+        new_task = CoursePostThrough.objects.select_related('post').get(course=new_course)
+        self.assertEqual(new_task.post.source_id, self.post.pk)
+        Posts.objects.filter(pk=new_task.post_id).update(is_published=True)
+        new_task.post.is_published = True
+
+        student = self.enroll('next@example.com', new_course)
+        answer = submit_answer(new_task, student, text=self.ESSAY)
+
+        self.assertEqual(self.similar(new_task), [])
+        pairs = self.similar(new_task, scope='source', threshold=0.99)
+        self.assertEqual(pairs, [(1.0, [self.answers[0].pk, answer.pk])])
+
+    def test_identical_answers_form_one_cluster(self):
+        submit_answer(self.task, self.students[2], text=self.ESSAY)
+        answer_ids = [answer.pk for answer in self.answers]
+        [(similarity, cluster), (_, pair)] = self.similar(self.task)
+        self.assertEqual((similarity, cluster), (1.0, [answer_ids[0], answer_ids[2]]))
+        self.assertEqual(pair, answer_ids)
+        self.assertEqual(self.similar(self.task, limit=1), [(1.0, [answer_ids[0], answer_ids[2]])])
+
+    def test_source_delete_keeps_clone_signatures(self):
+        new_course = clone_course(self.course, self.teacher, title='Next semester')
+        new_task = CoursePostThrough.objects.get(course=new_course)
+        Posts.objects.filter(pk=new_task.post_id).update(is_published=True)
+        student = self.enroll('next@example.com', new_course)
+        answer = submit_answer(new_task, student, text=self.ESSAY)
+
+        self.post.delete()
+        self.assertEqual(
+            list(AnswerSignatures.objects.values_list('answer_id', 'source_post_id')), [(answer.pk, new_task.post_id)]
+        )
+        CourseStudentsThrough(student=self.students[0], course=new_course).accept()
+        other = submit_answer(CoursePostThrough.objects.get(pk=new_task.pk), self.students[0], text=self.ESSAY)
+        self.assertEqual(self.similar(new_task, scope='source'), [(1.0, [answer.pk, other.pk])])
+
+    def test_source_scope_skips_pairs_without_task_answers(self):
+        new_course = clone_course(self.course, self.teacher, title='Next semester')
+        new_task = CoursePostThrough.objects.get(course=new_course)
+        Posts.objects.filter(pk=new_task.post_id).update(is_published=True)
+        for i in range(2):
+            submit_answer(new_task, self.enroll(f'next{i}@example.com', new_course), text='Mitochondria is the powerhouse of the cell')
+
+        self.assertEqual(len(self.similar(new_task, scope='source')), 1)
+        pairs = self.similar(self.task, scope='source')
+        self.assertEqual([answer_ids for _, answer_ids in pairs], [[self.answers[0].pk, self.answers[1].pk]])
+
+    def test_candidates_grow_linearly(self):
+        rng = random.Random(7)
+        words = [''.join(rng.choices(string.ascii_lowercase, k=6)) for _ in range(2000)]
+        signatures = {i: text_signature(' '.join(rng.choices(words, k=40))) for i in range(300)}
+        self.assertLess(len(candidate_pairs(signatures)), 300)
+
+    def test_rebuild_command(self):
+        AnswerSignatures.objects.all().delete()
+        call_command('rebuild_answer_signatures', stdout=StringIO())
+        self.assertEqual(AnswerSignatures.objects.count(), 3)
+
+    def test_students_cannot_see_similar_answers(self):
+        self.client.force_authenticate(self.students[0])
+        response = self.client.get(reverse('tasks-similar', args=[self.task.pk]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class DeadlinesTestCase(CourseFixtureMixin, APITestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.create_course('Course 0')
+        self.student = User.objects.create(email='student@example.com', role_id=0, is_verified=True)
+        self.courses = [self.course] + [Courses.objects.create(title=f'Course {i}', creator=self.teacher) for i in (1, 2)]
+        for course in self.courses[:2]:
+            CourseStudentsThrough(student=self.student, course=course).accept()
+        # Приглашение не принято - задания курса не показываются
+        CourseStudentsThrough.objects.create(student=self.student, course=self.courses[2])
+
+        self.url = reverse('me-deadlines')
+        self.client.force_authenticate(self.student)
+
+    def task(self, course, days, is_published=True):
+        post = Posts.objects.create(
+            name=f'Task {days}', post_type=PostTypes.EXERCISE, author=self.teacher, max_score=10,
+            deadline=self.now + timedelta(days=days), is_published=is_published
+        )
+        return CoursePostThrough.objects.create(post=post, course=course)
+
+    def deadlines(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_upcoming_unanswered_tasks(self):
+        soon = self.task(self.courses[1], 1)
+        later = self.task(self.courses[0], 3)
+        returned = self.task(self.courses[0], 5)
+        submitted = self.task(self.courses[1], 2)
+        self.task(self.courses[0], -1)
+        self.task(self.courses[0], 30)
+        self.task(self.courses[0], 2, is_published=False)
+        self.task(self.courses[2], 2)
+
+        Answers.objects.create(student=self.student, task=submitted).submit()
+        answer = Answers.objects.create(student=self.student, task=returned)
+        answer.status = TaskStatuses.RETURNED
+        answer.save()
+
+        with self.assertNumQueries(1):
+            data = self.deadlines()
+        self.assertEqual([row['task'] for row in data['results']], [soon.pk, later.pk, returned.pk])
+        self.assertEqual([row['status'] for row in data['results']], [None, None, TaskStatuses.RETURNED])
+        self.assertEqual(data['results'][0]['course'], self.courses[1].pk)
+        self.assertNotIn('count', data)
+
+    def test_window_and_keyset_pagination(self):
+        tasks = [self.task(self.courses[i % 2], days) for i, days in enumerate((1, 2, 3, 4, 5))]
+
+        data = self.deadlines(page_size=2)
+        self.assertEqual([row['task'] for row in data['results']], [tasks[0].pk, tasks[1].pk])
+        response = self.client.get(data['next'])
+        self.assertEqual([row['task'] for row in response.data['results']], [tasks[2].pk, tasks[3].pk])
+
+        data = self.deadlines(
+            after=(self.now + timedelta(days=2.5)).isoformat(), before=(self.now + timedelta(days=4.5)).isoformat()
+        )
+        self.assertEqual([row['task'] for row in data['results']], [tasks[2].pk, tasks[3].pk])
+
+    def test_invalid_window(self):
+        response = self.client.get(self.url, {'after': self.now.isoformat(), 'before': self.now.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class GradingQueueTestCase(CourseFixtureMixin, APITestCase):
+
+    def setUp(self):
+        self.create_course('Queue', students=3)
+        self.tasks = []
+        for i in range(2):
+            post = Posts.objects.create(
+                name=f'Exercise {i}', post_type=PostTypes.EXERCISE, author=self.teacher, max_score=10,
+                is_published=True, can_change=True
+            )
+            self.tasks.append(CoursePostThrough.objects.create(post=post, course=self.course))
+        self.client.force_authenticate(self.teacher)
+
+    def ungraded(self):
+        return list(
+            CoursePostThrough.objects.filter(course=self.course).order_by('id').values_list('ungraded_count', flat=True)
+        )
+
+    def test_counters_follow_statuses(self):
+        answer = Answers.objects.create(student=self.students[0], task=self.tasks[0])
+        answer.submit()
+        submit_answer(self.tasks[0], self.students[1])
+        submit_answer(self.tasks[0], self.students[1])
+        submit_answer(self.tasks[1], self.students[2])
+        self.assertEqual(self.ungraded(), [2, 1])
+
+        answer.grade(7)
+        bulk_grade(self.tasks[1], [(self.students[2].pk, 5)])
+        self.assertEqual(self.ungraded(), [1, 0])
+
+        Answers.objects.get(student=self.students[1], task=self.tasks[0]).delete()
+        self.assertEqual(self.ungraded(), [0, 0])
+
+        submit_answer(self.tasks[1], self.students[0])
+        CoursePostThrough.objects.update(ungraded_count=5)
+        call_command('rebuild_course_counters', stdout=StringIO())
+        self.assertEqual(self.ungraded(), [0, 1])
+
+    def test_task_delete_does_not_update_per_answer(self):
+        submit_answer(self.tasks[0], self.students[0])
+        for student in self.students:
+            submit_answer(self.tasks[1], student)
+
+        with CaptureQueriesContext(connection) as few:
+            self.tasks[0].delete()
+        with CaptureQueriesContext(connection) as many:
+            self.tasks[1].delete()
+        self.assertEqual(len(few), len(many))
+
+    def test_queue_reads_counters(self):
+        other_teacher = User.objects.create(email='other@example.com', role_id=1, is_verified=True)
+        other_course = Courses.objects.create(title='Other', creator=other_teacher)
+        post = Posts.objects.create(
+            name='Other', post_type=PostTypes.EXERCISE, author=other_teacher, max_score=10, is_published=True
+        )
+        CoursePostThrough.objects.create(post=post, course=other_course, ungraded_count=4)
+        for student in self.students:
+            submit_answer(self.tasks[1], student)
+        submit_answer(self.tasks[0], self.students[0])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('me-grading-queue'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total'], 4)
+        self.assertEqual(
+            [(row['task'], row['ungraded_count']) for row in response.data['results']],
+            [(self.tasks[1].pk, 3), (self.tasks[0].pk, 1)]
+        )
+
+    def test_pending_answers_keyset(self):
+        answers = [submit_answer(self.tasks[0], student) for student in self.students]
+        answers[1].grade(3)
+        self.assertEqual(self.ungraded(), [2, 0])
+        url = reverse('tasks-pending', args=[self.tasks[0].pk])
+
+        response = self.client.get(url, {'page_size': 1})
+        self.assertEqual([row['answer'] for row in response.data['results']], [answers[0].pk])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([row['answer'] for row in response.data['results']], [answers[2].pk])
+        self.assertIsNone(response.data['next'])
+
+    def test_students_cannot_see_queue(self):
+        self.client.force_authenticate(self.students[0])
+        self.assertEqual(self.client.get(reverse('me-grading-queue')).status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(reverse('tasks-pending', args=[self.tasks[0].pk]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -1,11 +1,14 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CourseViewSet
+from .views import CourseViewSet, MeViewSet, PostViewSet, TaskViewSet
 
 
 router = DefaultRouter()
 
 router.register(r'courses', CourseViewSet, basename='courses')
+router.register(r'posts', PostViewSet, basename='posts')
+router.register(r'tasks', TaskViewSet, basename='tasks')
+router.register(r'me', MeViewSet, basename='me')
 
 
 urlpatterns = [
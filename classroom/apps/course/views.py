@@ -1,14 +1,33 @@
-from django.db.models import Q
+import tempfile
+from datetime import timedelta
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
 from rest_framework.decorators import api_view, action
 from rest_framework import generics
 from rest_framework import viewsets
 from rest_framework import permissions
 from rest_framework import status
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from .serializers import CoursePreviewSerializer, CourseProfileSerializer
-from .models import Courses
+from apps.enums import InviteStatuses, MemberRoles, TaskStatuses
+from .serializers import CoursePreviewSerializer, CourseProfileSerializer, CourseSummarySerializer, \
+    JoinCourseSerializer, BulkEnrollSerializer, CloneCourseSerializer, RosterExportSerializer, \
+    CourseFeedSerializer, CourseFeedFilterSerializer, CrossPostSerializer, SearchQuerySerializer, \
+    AutoGradeSerializer, BulkGradeSerializer, GradebookExportSerializer, SubmitAnswerSerializer, \
+    SubmittedAnswerSerializer, SimilarityQuerySerializer, DeadlinesFilterSerializer, DeadlineSerializer, \
+    GradingQueueSerializer, PendingAnswerSerializer
+from .models import Courses, CourseMembers, CourseStudentsThrough, CoursePostThrough, Posts
+from .pagination import DeadlinePagination, KeysetPagination, PendingAnswersPagination, RosterPagination
+from .search import search_courses
+from .grading import auto_grade, bulk_grade
+from .gradebook import XLSX_SUPPORTED, get_gradebook, gradebook_export, write_gradebook_xlsx
+from .item_analysis import get_item_analysis
+from .similarity import similar_answers
+from .services import ROSTER_SOURCES, roster_queryset, roster_rows, stream_ndjson, bulk_enroll, \
+    clone_course, stream_csv, roster_export_rows, ROSTER_EXPORT_COLUMNS, course_feed_queryset, \
+    publish_to_courses, submit_answer, student_deadlines_queryset, grading_queue_queryset, pending_answers_queryset
 
 
 
@@ -19,9 +38,24 @@ class CourseViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['title', 'section', 'theme', 'is_archive']
 
+    keyset_pagination_class = KeysetPagination
+
+    @property
+    def paginator(self):
+        """Keyset пагинация включается клиентом (?pagination=cursor) для list и get_own_courses"""
+        if not hasattr(self, '_paginator'):
+            if self.action in ['list', 'get_own_courses'] and \
+                    self.keyset_pagination_class.is_requested(self.request):
+                self._paginator = self.keyset_pagination_class()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
+
     def get_serializer_class(self):
         if self.action in ['list', 'get_own_courses']:
             return CoursePreviewSerializer
+        if self.action == 'summary':
+            return CourseSummarySerializer
         return CourseProfileSerializer
 
     def get_queryset(self):
@@ -30,29 +64,231 @@ class CourseViewSet(viewsets.ModelViewSet):
 
         if self.action == "get_own_courses":
             return queryset.filter(creator_id=user.pk)
-        if self.action in ['list', 'retrieve']:
-            queryset = queryset.prefetch_related('teachers', 'students')
 
         if user.is_admin:
             return queryset
         elif user.is_student:
-            return queryset.filter(
-                student_invites__student=user,
-                student_invites__status='accepted'
-            )
+            return queryset.filter(members__user=user, members__role=MemberRoles.STUDENT)
         elif user.is_teacher:
-            print('here')
             return queryset.filter(
-                Q(teacher_invites__teacher=user) & Q(teacher_invites__status='accepted') | Q(creator=user),
+                members__user=user,
+                members__role__in=[MemberRoles.CREATOR, MemberRoles.TEACHER]
             )
         return queryset.none()
 
     @action(detail=False, methods=["get"])
     def get_own_courses(self, request):
+        queryset = self.get_queryset()
+        if isinstance(self.paginator, KeysetPagination):
+            page = self.paginate_queryset(queryset)
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
         return Response({
-            "courses": CoursePreviewSerializer(self.get_queryset(), many=True).data
+            "courses": CoursePreviewSerializer(queryset, many=True).data
         })
 
+    @action(detail=False, methods=["post"])
+    def join(self, request):
+        """Вступление студента в курс по коду приглашения"""
+        serializer = JoinCourseSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        course = Courses.objects.select_related("creator")\
+            .filter(inv_code=serializer.validated_data["code"], is_archive=False).first()
+        if course is None:
+            raise NotFound("Course with this invite code does not exist")
+        if not request.user.is_student:
+            raise PermissionDenied()
+
+        invite, created = CourseStudentsThrough.objects.get_or_create(
+            student=request.user,
+            course=course,
+            defaults={"status": InviteStatuses.ACCEPTED, "accepted_at": timezone.now()}
+        )
+        if invite.status != InviteStatuses.ACCEPTED:
+            invite.accept()
+
+        return Response(
+            CoursePreviewSerializer(course).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+    @action(detail=True, methods=["post"])
+    def enroll(self, request, pk=None):
+        """Массовое приглашение по списку email или id пользователей"""
+        course = self.get_object()
+        if not (request.user.is_admin or course.is_user_teacher(request.user)):
+            raise PermissionDenied()
+
+        serializer = BulkEnrollSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        lookup = "email" if data.get("emails") else "id"
+        results = bulk_enroll(
+            course, data.get("emails") or data["user_ids"],
+            role=data["role"], lookup=lookup, accept=data["accept"]
+        )
+        created = sum(row["status"] == "created" for row in results)
+        return Response({"created": created, "results": results}, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=["post"])
+    def clone(self, request, pk=None):
+        """Создает новый курс с темами и постами текущего (шаблон для следующего потока)"""
+        course = self.get_object()
+        if not (request.user.is_teacher and course.is_user_teacher(request.user)):
+            raise PermissionDenied()
+
+        serializer = CloneCourseSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        new_course = clone_course(course, request.user, **serializer.validated_data)
+        return Response(self.get_serializer(new_course).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=["get"])
+    def summary(self, request, pk=None):
+        return Response(self.get_serializer(self.get_object()).data)
+
+    @action(detail=True, methods=["get"])
+    def roster(self, request, pk=None):
+        """Участники курса: ?role=student|teacher, ?status=... (по умолчанию accepted),
+        keyset пагинация или потоковая выдача всего списка в NDJSON (?stream=ndjson)
+        """
+        course = self.get_object()
+        user = request.user
+
+        role = request.query_params.get("role", MemberRoles.STUDENT)
+        if role not in ROSTER_SOURCES:
+            raise ValidationError({"role": f"Expected one of: {', '.join(ROSTER_SOURCES)}"})
+
+        statuses = request.query_params.getlist("status") or [InviteStatuses.ACCEPTED]
+        if not set(statuses) <= set(InviteStatuses.values):
+            raise ValidationError({"status": f"Expected any of: {', '.join(InviteStatuses.values)}"})
+
+        is_manager = user.is_admin or course.is_user_teacher(user)
+        if set(statuses) != {InviteStatuses.ACCEPTED} and not is_manager:
+            raise PermissionDenied()
+        exclude_fields = () if is_manager else ("email",)
+
+        rows = roster_queryset(course.pk, role, statuses)
+        if request.query_params.get("stream") == "ndjson":
+            rows = rows.order_by(*RosterPagination.ordering).iterator(chunk_size=2000)
+            return StreamingHttpResponse(
+                stream_ndjson(roster_rows(rows, exclude_fields)),
+                content_type="application/x-ndjson"
+            )
+
+        paginator = RosterPagination()
+        page = paginator.paginate_queryset(rows, request, view=self)
+        return paginator.get_paginated_response(list(roster_rows(page, exclude_fields)))
+
+    @action(detail=True, methods=["get"])
+    def feed(self, request, pk=None):
+        """Лента постов курса (?theme, ?type, ?published) с keyset пагинацией по дате публикации"""
+        course = self.get_object()
+        is_manager = request.user.is_admin or course.is_user_teacher(request.user)
+
+        filters = CourseFeedFilterSerializer(data=request.query_params.dict())
+        filters.is_valid(raise_exception=True)
+        params = filters.validated_data
+
+        queryset = course_feed_queryset(
+            course.pk,
+            theme_id=params.get("theme"),
+            post_type=params.get("type"),
+            # Неопубликованные посты видят только преподаватели
+            is_published=params["published"] if is_manager else True,
+        )
+
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = CourseFeedSerializer(
+            page, many=True, context={**self.get_serializer_context(), "show_answers": is_manager}
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=["get"])
+    def gradebook(self, request, pk=None):
+        """Журнал оценок курса: матрица студенты x задания, итоги и средние"""
+        course = self.get_object()
+        if not (request.user.is_admin or course.is_user_teacher(request.user)):
+            raise PermissionDenied()
+        return Response(get_gradebook(course.pk))
+
+    @action(detail=True, methods=["get"], url_path="item-analysis")
+    def item_analysis(self, request, pk=None):
+        """Анализ вопросов курса: сложность, различительная способность и доли выбора вариантов"""
+        course = self.get_object()
+        if not (request.user.is_admin or course.is_user_teacher(request.user)):
+            raise PermissionDenied()
+        return Response({"results": get_item_analysis(course.pk)})
+
+    @action(detail=True, methods=["get"], url_path="gradebook/export")
+    def export_gradebook(self, request, pk=None):
+        """Потоковая выгрузка журнала оценок в CSV или XLSX (?output=csv|xlsx)"""
+        course = self.get_object()
+        if not (request.user.is_admin or course.is_user_teacher(request.user)):
+            raise PermissionDenied()
+
+        serializer = GradebookExportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        output = serializer.validated_data["output"]
+        if output == "xlsx" and not XLSX_SUPPORTED:
+            raise ValidationError({"output": "XLSX export is not available on this server"})
+
+        header, rows = gradebook_export(course.pk)
+        filename = f"gradebook_{course.pk}.{output}"
+        if output == "csv":
+            response = StreamingHttpResponse(stream_csv(header, rows), content_type="text/csv")
+            response["Content-Disposition"] = f'attachment; filename="{filename}"'
+            return response
+
+        # XLSX - zip архив, поэтому книга собирается во временном файле, который отдается по частям
+        stream = tempfile.TemporaryFile()
+        write_gradebook_xlsx(header, rows, stream)
+        stream.seek(0)
+        return FileResponse(
+            stream, as_attachment=True, filename=filename,
+            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+    @action(detail=True, methods=["get"], url_path="roster/export")
+    def export_roster(self, request, pk=None):
+        """Потоковая выгрузка приглашений курса в CSV или NDJSON (?output=csv|ndjson)"""
+        course = self.get_object()
+        if not (request.user.is_admin or course.is_user_teacher(request.user)):
+            raise PermissionDenied()
+
+        serializer = RosterExportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        output = params.pop("output")
+        params["course_ids"] = [course.pk]
+
+        rows = roster_export_rows(**params)
+        if output == "ndjson":
+            content = stream_ndjson(dict(zip(ROSTER_EXPORT_COLUMNS, row)) for row in rows)
+            response = StreamingHttpResponse(content, content_type="application/x-ndjson")
+        else:
+            response = StreamingHttpResponse(stream_csv(ROSTER_EXPORT_COLUMNS, rows), content_type="text/csv")
+        response["Content-Disposition"] = f'attachment; filename="roster_{course.pk}.{output}"'
+        return response
+
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        """Полнотекстовый поиск по курсам пользователя: ?q, ?kind=course|post|comment, ?course, ?limit"""
+        serializer = SearchQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        results = search_courses(
+            request.user, params["q"],
+            kinds=sorted(params.get("kind", [])),
+            course_id=params.get("course"),
+            limit=params["limit"],
+        )
+        return Response({"results": results})
+
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         if not instance.has_user_on_course(request.user):
@@ -65,3 +301,167 @@ class CourseViewSet(viewsets.ModelViewSet):
         if not instance.can_user_delete(self.request.user):
             raise PermissionDenied()
         super().perform_destroy(instance)
+
+
+class PostViewSet(viewsets.GenericViewSet):
+    queryset = Posts.objects.all()
+    permission_classes = [permissions.IsAuthenticated]
+
+    @action(detail=True, methods=["post"], url_path="cross-post")
+    def cross_post(self, request, pk=None):
+        """Публикация поста в несколько курсов одним запросом"""
+        post = self.get_object()
+        if not (request.user.is_admin or post.author_id == request.user.pk):
+            raise PermissionDenied()
+
+        serializer = CrossPostSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        created, skipped, answers_created = publish_to_courses(
+            post, request.user, serializer.validated_data["courses"],
+            create_answers=serializer.validated_data["create_answers"]
+        )
+        return Response({
+            "created": created,
+            "skipped": skipped,
+            "answers_created": answers_created,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+    @action(detail=True, methods=["get"])
+    def results(self, request, pk=None):
+        """Результаты опроса по счетчикам голосов вариантов, без агрегации выборов"""
+        post = self.get_object()
+        user = request.user
+        roles = set(
+            CourseMembers.objects.filter(course__course_connections__post=post, user=user)
+            .values_list("role", flat=True)
+        )
+        is_manager = user.is_admin or post.author_id == user.pk or \
+            bool(roles & {MemberRoles.CREATOR, MemberRoles.TEACHER})
+        # Распределение ответов на вопрос видят только преподаватели, результаты опроса - все участники
+        if not (is_manager or (post.is_quiz and roles)):
+            raise PermissionDenied()
+
+        rows = post.question_options.order_by("id").values_list("id", "title", "votes_count")
+        options = [{"id": option_id, "title": title, "votes": votes} for option_id, title, votes in rows]
+        return Response({
+            "post": post.pk,
+            "total_votes": sum(option["votes"] for option in options),
+            "options": options,
+        })
+
+
+class TaskViewSet(viewsets.GenericViewSet):
+    """Задания - посты, подключенные к курсу (CoursePostThrough)"""
+    queryset = CoursePostThrough.objects.select_related("post", "course")
+    permission_classes = [permissions.IsAuthenticated]
+
+    # Действия преподавателей курса, остальные доступны его студентам
+    teacher_actions = ("auto_grade", "grade", "similar", "pending")
+
+    def get_object(self):
+        task = super().get_object()
+        user = self.request.user
+        if self.action in self.teacher_actions:
+            allowed = user.is_admin or task.course.is_user_teacher(user)
+        else:
+            allowed = task.course.get_member_role(user) == MemberRoles.STUDENT
+        if not allowed:
+            raise PermissionDenied()
+        return task
+
+    @action(detail=True, methods=["post"])
+    def submit(self, request, pk=None):
+        """Сдача ответа студентом: {"options": [id, ...]} или {"text": "..."}"""
+        task = self.get_object()
+        serializer = SubmitAnswerSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        answer = submit_answer(
+            task, request.user,
+            option_ids=serializer.validated_data["options"],
+            text=serializer.validated_data.get("text"),
+        )
+        return Response(SubmittedAnswerSerializer(answer).data)
+
+    @action(detail=True, methods=["post"], url_path="auto-grade")
+    def auto_grade(self, request, pk=None):
+        """Автопроверка сданных ответов на вопрос с выбором (?regrade - и уже оцененных)"""
+        task = self.get_object()
+        serializer = AutoGradeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        statuses = [TaskStatuses.SUBMITTED]
+        if serializer.validated_data["regrade"]:
+            statuses.append(TaskStatuses.GRADED)
+
+        scores = auto_grade(task, strategy=serializer.validated_data["strategy"], statuses=statuses)
+        return Response({"graded": len(scores), "scores": scores})
+
+    @action(detail=True, methods=["post"])
+    def grade(self, request, pk=None):
+        """Массовое выставление баллов: {"grades": [{"student", "score"}]}"""
+        task = self.get_object()
+        serializer = BulkGradeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = bulk_grade(task, [(row["student"], row["score"]) for row in serializer.validated_data["grades"]])
+        graded = sum(row["status"] == "graded" for row in results)
+        return Response({"graded": graded, "results": results})
+
+    @action(detail=True, methods=["get"])
+    def pending(self, request, pk=None):
+        """Сданные ответы, ждущие оценки, в порядке сдачи (keyset пагинация)"""
+        task = self.get_object()
+        paginator = PendingAnswersPagination()
+        page = paginator.paginate_queryset(pending_answers_queryset(task), request, view=self)
+        return paginator.get_paginated_response(PendingAnswerSerializer(page, many=True).data)
+
+    @action(detail=True, methods=["get"])
+    def similar(self, request, pk=None):
+        """Похожие текстовые ответы: ?threshold, ?scope=task|source (копии вопроса в других курсах), ?limit"""
+        task = self.get_object()
+        serializer = SimilarityQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        results = similar_answers(
+            task, request.user,
+            threshold=params["threshold"],
+            scope=params["scope"],
+            limit=params["limit"],
+        )
+        return Response({"results": results})
+
+
+class MeViewSet(viewsets.GenericViewSet):
+    """Данные текущего пользователя по всем его курсам"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    # Окно по умолчанию, если ?before не передан
+    deadlines_window = timedelta(days=14)
+
+    @action(detail=False, methods=["get"])
+    def deadlines(self, request):
+        """Несданные задания с дедлайном в окне ?after (по умолчанию сейчас) - ?before, по возрастанию дедлайна"""
+        filters = DeadlinesFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        after = filters.validated_data.get("after") or timezone.now()
+        before = filters.validated_data.get("before") or after + self.deadlines_window
+
+        queryset = student_deadlines_queryset(request.user, after, before)
+        paginator = DeadlinePagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        return paginator.get_paginated_response(DeadlineSerializer(page, many=True).data)
+
+    @action(detail=False, methods=["get"], url_path="grading-queue")
+    def grading_queue(self, request):
+        """Задания курсов преподавателя с числом ответов, ждущих оценки (по убыванию)"""
+        if not (request.user.is_teacher or request.user.is_admin):
+            raise PermissionDenied()
+        rows = list(grading_queue_queryset(request.user))
+        return Response({
+            "total": sum(row["ungraded_count"] for row in rows),
+            "results": GradingQueueSerializer(rows, many=True).data,
+        })
@@ -53,8 +53,39 @@ class TaskStatuses(models.TextChoices):
     SUBMITTED = 'submitted', _('Submitted')
     GRADED = 'graded', _('Graded')
     RETURNED = 'returned', _('Returned')
+    OVERDUE = 'overdue', _('Overdue')
 
 
 class SubjectTypes(models.TextChoices):
     COURSE_POST = 'course_post', _('Course Post')
     STUDENT_ANSWER = 'student_answer', _('Student Answer')
+
+
+class MemberRoles(models.TextChoices):
+    CREATOR = 'creator', _('Creator')
+    TEACHER = 'teacher', _('Teacher')
+    STUDENT = 'student', _('Student')
+
+
+class JobStatuses(models.TextChoices):
+    PENDING = 'pending', _('Pending')
+    RUNNING = 'running', _('Running')
+    DONE = 'done', _('Done')
+    FAILED = 'failed', _('Failed')
+
+
+class SearchKinds(models.TextChoices):
+    COURSE = 'course', _('Course')
+    POST = 'post', _('Post')
+    COMMENT = 'comment', _('Comment')
+
+
+class GradingStrategies(models.TextChoices):
+    ALL_OR_NOTHING = 'all_or_nothing', _('All or nothing')
+    PARTIAL = 'partial', _('Partial credit')
+    PER_OPTION = 'per_option', _('Per option')
+
+
+class SimilarityScopes(models.TextChoices):
+    TASK = 'task', _('Task')
+    SOURCE = 'source', _('Source post')
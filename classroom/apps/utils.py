@@ -1,21 +1,51 @@
 import os
 import secrets
 import string
+from functools import lru_cache
 
 from django.core.exceptions import ValidationError
 
 from .enums import SubjectTypes
 
 
-def generate_random_string(length, use_upper_case=True, use_digits=True):
-    characters = ''
-    if use_upper_case:
-        characters += string.ascii_letters
-    else:
-        characters += string.ascii_lowercase
+@lru_cache(maxsize=None)
+def _alphabet_table(use_upper_case, use_digits):
+    """Таблица для bytes.translate: байт -> символ алфавита и набор отбрасываемых байтов.
+
+    Байты >= limit (limit кратен размеру алфавита) отбрасываются, поэтому
+    все символы равновероятны и нет смещения от взятия по модулю.
+    """
+    characters = string.ascii_letters if use_upper_case else string.ascii_lowercase
     if use_digits:
         characters += string.digits
-    return ''.join(secrets.choice(characters) for _ in range(length))
+
+    size = len(characters)
+    limit = 256 - 256 % size
+    table = bytes(ord(characters[byte % size]) for byte in range(256))
+    rejected = bytes(range(limit, 256))
+    return table, rejected, limit
+
+
+def generate_random_strings(count, length, use_upper_case=True, use_digits=True):
+    """Генерирует count случайных строк длины length из одного буфера secrets.token_bytes"""
+    table, rejected, limit = _alphabet_table(use_upper_case, use_digits)
+    needed = count * length
+
+    chunks = []
+    collected = 0
+    while collected < needed:
+        missing = needed - collected
+        # С запасом на отброшенные байты, чтобы почти всегда хватало одного вызова
+        chunk = secrets.token_bytes(missing * 256 // limit + 8).translate(table, rejected)
+        chunks.append(chunk)
+        collected += len(chunk)
+
+    data = b"".join(chunks)[:needed].decode("ascii")
+    return [data[start:start + length] for start in range(0, needed, length)]
+
+
+def generate_random_string(length, use_upper_case=True, use_digits=True):
+    return generate_random_strings(1, length, use_upper_case, use_digits)[0]
 
 def file_upload_path(prefix, instance, filename, directory=None):
     ext = filename.split('.')[-1]
@@ -0,0 +1,43 @@
+"""Микро-бенчмарк генерации случайных строк.
+
+Запуск из каталога classroom: python benchmarks/random_strings.py
+"""
+import secrets
+import string
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from apps.utils import generate_random_string, generate_random_strings  # noqa: E402
+
+
+def legacy_random_string(length, use_upper_case=True, use_digits=True):
+    """Прежняя реализация: secrets.choice на каждый символ"""
+    characters = string.ascii_letters if use_upper_case else string.ascii_lowercase
+    if use_digits:
+        characters += string.digits
+    return ''.join(secrets.choice(characters) for _ in range(length))
+
+
+def bench(label, stmt, number):
+    best = min(timeit.repeat(stmt, number=number, repeat=5))
+    print(f"{label:<45} {best / number * 1e6:10.2f} us/call")
+    return best / number
+
+
+def main():
+    print("single string, length 16")
+    legacy = bench("  legacy secrets.choice", lambda: legacy_random_string(16), 20000)
+    current = bench("  generate_random_string", lambda: generate_random_string(16), 20000)
+    print(f"  speedup: x{legacy / current:.1f}")
+
+    print("10 000 strings, length 16")
+    legacy = bench("  legacy secrets.choice in a loop", lambda: [legacy_random_string(16) for _ in range(10000)], 3)
+    current = bench("  generate_random_strings(10000, 16)", lambda: generate_random_strings(10000, 16), 3)
+    print(f"  speedup: x{legacy / current:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -163,6 +163,9 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',  # Требует аутентификации
     ],
 }
+
+GRADEBOOK_CACHE_TIMEOUT = 300 # секунд, 0 - не кэшировать журнал оценок
+
 #EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend' # для тестов
 
 # для готового приложения